@@ -0,0 +1,11 @@
+"""
+Воспроизводимые бенчмарки производительности.
+
+Каждый модуль запускается из корня проекта, например::
+
+    $ python -m benchmarks.bench_indexes
+
+По умолчанию используются настройки ``config.settings.test`` и временная база,
+созданная по моделям (без миграций); ``DATABASE_URL`` позволяет прогнать тот же
+бенчмарк на PostgreSQL.
+"""
@@ -0,0 +1,79 @@
+"""
+Стоимость запроса: HTML-страницы против соответствующих ресурсов JSON API.
+
+    $ python -m benchmarks.bench_api --orders 20000
+
+Для каждой пары печатает p50/p95 времени ответа, число SQL-запросов и размер тела.
+Запросы идут от имени курьера, у которого есть корзина, через тестовый клиент Django.
+"""
+import argparse
+
+from benchmarks.utils import measure, setup_django, summarize, temporary_database
+
+
+def pairs(data):
+    from django.urls import reverse
+
+    store = data["stores"][0]
+    category = data["categories"][0]
+    return {
+        "stores": (reverse("products:store_list"), reverse("products:api-stores")),
+        "store": (reverse("products:product_category", kwargs={"slug": store.slug}),
+                  reverse("products:api-store", kwargs={"slug": store.slug})),
+        "category": (reverse("products:cat_products", kwargs={"slug": category.slug}),
+                     reverse("products:api-category", kwargs={"slug": category.slug})),
+        "cart": (reverse("products:order-summary"), reverse("products:cart-api")),
+        "order board": (reverse("products:ordered"), reverse("products:api-order-board")),
+    }
+
+
+def run(client, url, repeat):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    client.get(url)
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200, (url, response.status_code)
+    # captured_queries читается из лога соединения, который сбрасывается каждым запросом
+    queries = len(context.captured_queries)
+    result = summarize(measure(lambda: client.get(url), repeat))
+    result["queries"] = queries
+    result["bytes"] = len(response.content)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import Permission
+    from django.test import Client
+
+    from benchmarks.seed import seed_dataset
+    from products.cart import get_cart_class
+
+    with temporary_database() as connection:
+        data = seed_dataset(orders=args.orders)
+        courier = data["couriers"][0].user
+        courier.user_permissions.add(*Permission.objects.filter(codename__in=["view_orders_page", "take_orders"]))
+        cart = get_cart_class()(courier)
+        for product in data["products"][:5]:
+            cart.add(product)
+        client = Client()
+        client.force_login(courier)
+        results = {name: [run(client, url, args.repeat) for url in urls] for name, urls in pairs(data).items()}
+
+    print(f"{connection.vendor}: {args.orders} заказов\n")
+    for name, (html, api) in results.items():
+        print(f"== {name}")
+        for label, result in (("html", html), ("api ", api)):
+            print(f"   {label}: p50 {result['p50_ms']} мс, p95 {result['p95_ms']} мс, "
+                  f"{result['queries']} запросов, {result['bytes']} байт")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Время оформления заказа в зависимости от размера корзины.
+
+    $ python -m benchmarks.bench_checkout --sizes 1 5 10 20 40 80
+
+Для каждого хранилища корзины и размера печатает p50/p95 времени products.checkout.checkout
+и число SQL-запросов. Каждое оформление — новый пользователь с заполненной корзиной.
+"""
+import argparse
+import time
+
+from benchmarks.utils import setup_django, summarize, temporary_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 5, 10, 20, 40, 80])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.db import transaction
+    from django.test.utils import CaptureQueriesContext
+
+    from benchmarks.seed import seed_dataset
+    from products.cart import CacheCart, DatabaseCart
+    from products.checkout import checkout
+
+    User = get_user_model()
+    with temporary_database() as connection:
+        products = seed_dataset(users=1, couriers=0, stores=1, categories_per_store=1,
+                                products_per_store=max(args.sizes), orders=0)["products"]
+        print(f"{connection.vendor}: p50/p95 оформления, SQL-запросов\n")
+        for cart_class in (DatabaseCart, CacheCart):
+            print(f"== {cart_class.__name__}")
+            for size in args.sizes:
+                timings, queries = [], 0
+                for i in range(args.repeat):
+                    user = User.objects.create(username=f"bench-{cart_class.__name__}-{size}-{i}")
+                    cart_class(user).set_quantities({product: 2 for product in products[:size]})
+                    cart = cart_class(user)
+                    with CaptureQueriesContext(connection) as context:
+                        started = time.perf_counter()
+                        # как в запросе с ATOMIC_REQUESTS
+                        with transaction.atomic():
+                            order, created = checkout(cart, "Покупатель", "0555000000", "ул. Токтогула",
+                                                      idempotency_key=f"{size}-{i}")
+                        timings.append((time.perf_counter() - started) * 1000)
+                    queries = len(context.captured_queries)
+                    assert created and order.item_count == size
+                result = summarize(timings)
+                print(f"   {size:>3} позиций: p50 {result['p50_ms']} мс, p95 {result['p95_ms']} мс, {queries} запросов")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Симуляция автоматического распределения заказов: задержка назначения и пропускная способность.
+
+    $ python -m benchmarks.bench_dispatch --orders-per-hour 3000 --couriers 600 --hours 2
+
+Часть "политики" гоняет только products.dispatch в памяти с модельным временем:
+заказы приходят пуассоновским потоком, диспетчер срабатывает раз в --interval секунд,
+курьер выполняет заказ за --delivery-minutes. Задержка — время от оформления заказа
+до назначения курьера. Часть "база" (--db) измеряет реальный такт Dispatcher.run_once
+на временной базе: два запроса на состояние и по одному условному UPDATE на заказ.
+"""
+import argparse
+import heapq
+import random
+import time
+
+from benchmarks.utils import measure, percentile, setup_django, summarize, temporary_database
+
+
+def simulate(policy, args, rng):
+    from products.dispatch import Courier, PendingOrder
+
+    horizon = args.hours * 3600
+    couriers = [Courier(pk, -pk, 0, args.capacity) for pk in range(1, args.couriers + 1)]
+    by_pk = {courier.pk: courier for courier in couriers}
+    arrivals, clock = [], 0.0
+    while True:
+        clock += rng.expovariate(args.orders_per_hour / 3600)
+        if clock >= horizon:
+            break
+        arrivals.append(PendingOrder(len(arrivals) + 1, rng.randint(1, 10 ** 6), clock, rng.randint(1, args.stores)))
+
+    queue, deliveries, latencies, tick_ms = [], [], [], []
+    next_arrival = 0
+    now = 0.0
+    while now < horizon or queue:
+        while next_arrival < len(arrivals) and arrivals[next_arrival].created_date <= now:
+            queue.append(arrivals[next_arrival])
+            next_arrival += 1
+        while deliveries and deliveries[0][0] <= now:
+            by_pk[heapq.heappop(deliveries)[1]].load -= 1
+
+        started = time.perf_counter()
+        assignments = policy.assign(queue[:args.batch_size], couriers)
+        tick_ms.append((time.perf_counter() - started) * 1000)
+
+        done = {order.pk for order, _ in assignments}
+        for order, courier in assignments:
+            latencies.append(now - order.created_date)
+            heapq.heappush(deliveries, (now + args.delivery_minutes * 60, courier.pk))
+        queue = [order for order in queue if order.pk not in done]
+        now += args.interval
+        if now > horizon * 3:
+            break
+
+    return {
+        "orders": len(arrivals),
+        "assigned": len(latencies),
+        "latency_p50_s": round(percentile(latencies, 50), 1) if latencies else None,
+        "latency_p95_s": round(percentile(latencies, 95), 1) if latencies else None,
+        "tick": summarize(tick_ms),
+        "policy_orders_per_s": round(len(latencies) / (sum(tick_ms) / 1000)) if sum(tick_ms) else None,
+    }
+
+
+def bench_database(policy_name, args):
+    from django.db import transaction
+
+    from benchmarks.seed import seed_dataset
+    from products.dispatch import Dispatcher, get_policy
+
+    with temporary_database():
+        seed_dataset(users=args.couriers * 10, couriers=args.couriers, orders=args.db_orders)
+        dispatcher = Dispatcher(policy=get_policy(policy_name), batch_size=args.batch_size,
+                                capacity=args.capacity)
+        assigned = []
+
+        def tick():
+            # откатываем каждый такт, чтобы все прогоны видели одну и ту же очередь
+            with transaction.atomic():
+                assigned.append(len(dispatcher.run_once()))
+                transaction.set_rollback(True)
+
+        timings = measure(tick, args.repeat)
+    result = summarize(timings)
+    result["assigned_per_tick"] = max(assigned)
+    result["orders_per_s"] = round(result["assigned_per_tick"] / (result["p50_ms"] / 1000))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders-per-hour", type=int, default=3000)
+    parser.add_argument("--hours", type=float, default=2)
+    parser.add_argument("--couriers", type=int, default=600)
+    parser.add_argument("--stores", type=int, default=20)
+    parser.add_argument("--capacity", type=int, default=3)
+    parser.add_argument("--delivery-minutes", type=float, default=30)
+    parser.add_argument("--interval", type=float, default=2, help="Пауза между тактами диспетчера, секунды.")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--db", action="store_true", help="Также измерить такт на временной базе.")
+    parser.add_argument("--db-orders", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    setup_django()
+    from products.dispatch import POLICIES, get_policy
+
+    print(f"{args.orders_per_hour} заказов/ч, {args.couriers} курьеров по {args.capacity} заказа, "
+          f"доставка {args.delivery_minutes} мин, такт {args.interval} с\n")
+    for name in POLICIES:
+        result = simulate(get_policy(name), args, random.Random(args.seed))
+        print(f"== {name}: назначено {result['assigned']}/{result['orders']}, "
+              f"задержка p50 {result['latency_p50_s']} с, p95 {result['latency_p95_s']} с; "
+              f"такт политики p50 {result['tick']['p50_ms']} мс, p95 {result['tick']['p95_ms']} мс, "
+              f"~{result['policy_orders_per_s']} заказов/с")
+        if args.db:
+            db = bench_database(name, args)
+            print(f"   база: такт p50 {db['p50_ms']} мс, p95 {db['p95_ms']} мс, "
+                  f"{db['assigned_per_tick']} заказов за такт, ~{db['orders_per_s']} заказов/с")
+
+
+if __name__ == "__main__":
+    main()
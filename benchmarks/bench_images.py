@@ -0,0 +1,159 @@
+"""
+Сколько байт картинок скачивает браузер на странице магазина и в корзине.
+
+    $ python -m benchmarks.bench_images --products 24 --cart 10
+
+"до" — прежняя миниатюра 600x600 JPEG с качеством 100 для каждой картинки. "после" —
+вариант, который браузер выберет из srcset по атрибуту sizes на экране шириной
+--viewport при плотности пикселей 1 и 2, в WebP и в JPEG для браузеров без WebP.
+Исходники — синтетические фотографии 1200x1200.
+"""
+import argparse
+import re
+import shutil
+import tempfile
+
+from benchmarks.utils import setup_django, temporary_database
+
+PICTURE_RE = re.compile(r"<picture>(.*?)</picture>", re.S)
+SOURCE_RE = re.compile(r'<source type="image/webp" sizes="([^"]+)"\s+srcset="([^"]+)"')
+IMG_RE = re.compile(r'<img[^>]*?sizes="([^"]+)"\s+srcset="([^"]+)"')
+
+
+def make_sources(storage, count, size=1200):
+    """
+    Картинки, похожие на фото: плавные градиенты, пятна и шум, чтобы сжатие было реалистичным.
+    """
+    import io
+    import random
+
+    from PIL import Image, ImageDraw, ImageFilter
+
+    rng = random.Random(0)
+    names = []
+    for i in range(count):
+        image = Image.linear_gradient("L").resize((size, size)).convert("RGB")
+        image = Image.merge("RGB", [channel.point(lambda v, k=rng.random(): int(v * k + 255 * (1 - k) * rng.random()))
+                                    for channel in image.split()])
+        draw = ImageDraw.Draw(image)
+        for _ in range(30):
+            x, y, r = rng.randrange(size), rng.randrange(size), rng.randrange(40, 300)
+            draw.ellipse((x - r, y - r, x + r, y + r), fill=tuple(rng.randrange(256) for _ in range(3)))
+        image = image.filter(ImageFilter.GaussianBlur(6))
+        noise = Image.effect_noise((size, size), 12).convert("RGB")
+        image = Image.blend(image, noise, 0.05)
+        content = io.BytesIO()
+        image.save(content, "JPEG", quality=92)
+        names.append(storage.save(f"products_pic/bench-{i}.jpg", content))
+    return names
+
+
+def slot_width(sizes, viewport):
+    """
+    Ширина слота по атрибуту sizes, как её считает браузер (поддерживаются только min-width и px).
+    """
+    for entry in sizes.split(","):
+        entry = entry.strip()
+        match = re.match(r"\(min-width: (\d+)px\) (.+)", entry)
+        if match:
+            if viewport < int(match.group(1)):
+                continue
+            entry = match.group(2)
+        if entry.endswith("vw"):
+            return viewport * int(entry[:-2]) / 100
+        return int(entry[:-2])
+    return viewport
+
+
+def pick(srcset, width):
+    """
+    Кандидат из srcset: самый узкий не уже нужной ширины, иначе самый широкий.
+    """
+    candidates = sorted((int(descriptor[:-1]), url) for url, descriptor in
+                        (candidate.split() for candidate in srcset.split(",")))
+    return next((url for candidate_width, url in candidates if candidate_width >= width), candidates[-1][1])
+
+
+def page_bytes(html, viewport, dpr, storage, media_url):
+    """
+    Байты картинок страницы: (WebP, JPEG) для заданной плотности пикселей.
+    """
+    totals = [0, 0]
+    for picture in PICTURE_RE.findall(html):
+        for i, pattern in enumerate((SOURCE_RE, IMG_RE)):
+            sizes, srcset = pattern.search(picture).groups()
+            url = pick(srcset, slot_width(sizes, viewport) * dpr)
+            totals[i] += storage.size(url[len(media_url):])
+    return totals
+
+
+def legacy_bytes(products):
+    from imagekit import ImageSpec
+    from imagekit.processors import ResizeToFill
+
+    class LegacyThumbnail(ImageSpec):
+        processors = [ResizeToFill(600, 600)]
+        format = "JPEG"
+        options = {"quality": 100}
+
+    return sum(len(LegacyThumbnail(source=product.picture).generate().read()) for product in products)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=24, help="Продуктов на странице магазина.")
+    parser.add_argument("--cart", type=int, default=10, help="Позиций в корзине.")
+    parser.add_argument("--viewport", type=int, default=1280)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.core.files.storage import default_storage
+    from django.test import Client
+    from django.urls import reverse
+
+    from benchmarks.seed import seed_dataset
+    from products.cart import get_cart_class
+    from products.models import Product, Store
+    from products.thumbnails import warm_all
+
+    media_root = settings.MEDIA_ROOT = tempfile.mkdtemp()
+    try:
+        with temporary_database():
+            data = seed_dataset(users=1, couriers=0, stores=1, categories_per_store=1,
+                                products_per_store=args.products, orders=0)
+            names = make_sources(default_storage, min(args.products, 12))
+            for i, product in enumerate(data["products"]):
+                Product.objects.filter(pk=product.pk).update(picture=names[i % len(names)])
+            Store.objects.update(avatar=names[0])
+            warm_all(workers=1)
+            products = list(Product.objects.order_by("pk"))
+
+            user = data["users"][0]
+            cart = get_cart_class()(user)
+            for product in products[:args.cart]:
+                cart.add(product)
+            client = Client()
+            client.force_login(user)
+            pages = {
+                "product_list.html": (reverse("products:product_category", kwargs={"slug": data["stores"][0].slug}),
+                                      products),
+                "order_summary.html": (reverse("products:order-summary"), products[:args.cart]),
+            }
+            for name, (url, shown) in pages.items():
+                response = client.get(url)
+                assert response.status_code == 200, (url, response.status_code)
+                html = response.content.decode()
+                before = legacy_bytes(shown)
+                print(f"== {name}: {len(PICTURE_RE.findall(html))} картинок, HTML {len(response.content)} байт")
+                print(f"   до:            {before:>9} байт (JPEG 600px, q100)")
+                for dpr in (1, 2):
+                    webp, jpeg = page_bytes(html, args.viewport, dpr, default_storage, settings.MEDIA_URL)
+                    print(f"   после, {dpr}x:     {webp:>9} байт WebP ({before / webp:.1f}x меньше), "
+                          f"{jpeg} байт JPEG ({before / jpeg:.1f}x меньше)")
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
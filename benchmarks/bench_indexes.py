@@ -0,0 +1,95 @@
+"""
+Планы и время горячих запросов до и после составных/частичных индексов.
+
+    $ python -m benchmarks.bench_indexes --orders 50000
+
+"До" — схема только с индексами внешних ключей и slug (индексы из Meta.indexes
+удаляются), "после" — схема с ними.
+"""
+import argparse
+
+from benchmarks.utils import measure, setup_django, summarize, temporary_database
+
+
+def hot_queries(data):
+    from products.models import ApplicationForm, Order, OrderProduct, Product
+
+    user = data["users"][-1]
+    courier = data["couriers"][0]
+    product = data["products"][0]
+    cart = next((order for order in data["orders"] if not order.ordered), data["orders"][0])
+    return {
+        # products/actions.py, OrderSummaryView, cart_item_count
+        "open cart": Order.objects.filter(user=user, ordered=False),
+        "open cart line": OrderProduct.objects.filter(order=cart, product=product),
+        # OrderedList и счётчик новых заказов
+        "unassigned board": Order.objects.filter(ordered=True, deliveryman=None).order_by("created_date", "id")[:20],
+        "unassigned count": Order.objects.filter(ordered=True, deliveryman=None).values("pk"),
+        # DeliveryRunningOrderList, OrderCustomerList
+        "courier orders": Order.objects.filter(deliveryman=courier).order_by("created_date", "id")[:20],
+        "customer orders": Order.objects.filter(user=user, ordered=True).order_by("-created_date", "-id")[:20],
+        # DeliveryAppList и счётчик заявок
+        "pending apps": ApplicationForm.objects.filter(status="В ожидании"),
+        # ProductCategory, StoreProduct
+        "store products": Product.objects.filter(store=product.store_id),
+        "category products": Product.objects.filter(category=product.category_id),
+    }
+
+
+def custom_indexes():
+    from products.models import ApplicationForm, Order, OrderProduct
+
+    return [(model, index) for model in (Order, OrderProduct, ApplicationForm) for index in model._meta.indexes]
+
+
+def run(queries, repeat):
+    from django.db import connection
+
+    results = {}
+    for name, queryset in queries.items():
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(connection.ops.explain_query_prefix() + " " + sql, params)
+            plan = "\n".join(" | ".join(str(col) for col in row) for row in cursor.fetchall())
+        results[name] = {"plan": plan, **summarize(measure(lambda: list(queryset.all()), repeat))}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from benchmarks.seed import seed_dataset
+
+    with temporary_database() as connection:
+        data = seed_dataset(users=args.users, orders=args.orders)
+        queries = hot_queries(data)
+
+        indexes = custom_indexes()
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                editor.remove_index(model, index)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        before = run(queries, args.repeat)
+
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                editor.add_index(model, index)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        after = run(queries, args.repeat)
+
+    print(f"{connection.vendor}: {args.orders} заказов, {args.users} пользователей\n")
+    for name in queries:
+        print(f"== {name}: p50 {before[name]['p50_ms']} -> {after[name]['p50_ms']} мс")
+        print("   до:    " + before[name]["plan"].replace("\n", "\n          "))
+        print("   после: " + after[name]["plan"].replace("\n", "\n          "))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Полный путь заказа через тестовый клиент Django: просмотр каталога, добавление в
+корзину, оформление, взятие заказа курьером и подтверждение выполнения.
+
+    $ python -m benchmarks.bench_lifecycle --stores 5 --products 40 --users 50 --items 3
+    $ python -m benchmarks.bench_lifecycle --compare benchmarks/results/lifecycle-1a2b3c4.json
+
+Данные создаются фабриками из тестов. Для каждого шага печатает p50/p95 времени ответа
+и число SQL-запросов и сохраняет результат в JSON (по умолчанию
+benchmarks/results/lifecycle-<коммит>.json), чтобы сравнивать прогоны разных коммитов.
+"""
+import argparse
+import json
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+from benchmarks.utils import percentile, setup_django, summarize, temporary_database
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+# исходники картинок фабрик: их миниатюры генерируются при сохранении продуктов и магазинов
+SOURCE_IMAGES = ["products_pic/no-image.jpg", "store_avatars/no-image.jpg"]
+STEPS = ["stores", "store", "product", "add_to_cart", "order_form", "checkout", "take_order", "confirm_execution"]
+
+
+def current_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+@contextmanager
+def temporary_media():
+    """
+    MEDIA_ROOT во временном каталоге с копиями исходников картинок, чтобы миниатюры
+    прогона не попадали в inel_delivery/media.
+    """
+    from django.conf import settings
+    from django.test.utils import override_settings
+
+    media_root = Path(tempfile.mkdtemp())
+    try:
+        for name in SOURCE_IMAGES:
+            (media_root / name).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(Path(settings.MEDIA_ROOT) / name, media_root / name)
+        with override_settings(MEDIA_ROOT=str(media_root)):
+            yield media_root
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+def seed(stores, products, users, couriers):
+    """
+    Магазины, продукты, покупатели и курьеры с правом брать заказы, через фабрики тестов.
+    """
+    from django.contrib.auth.models import Permission
+
+    from inel_delivery.users.tests.factories import UserFactory
+    from products.tests.factories import CategoryFactory, DeliverymanFactory, ProductFactory, StoreFactory
+
+    # картинки по умолчанию, чтобы не тратить время на генерацию файлов
+    store_objs = [StoreFactory(slug=f"bench-store-{i}", avatar="store_avatars/no-image.jpg") for i in range(stores)]
+    product_objs = []
+    for store in store_objs:
+        category = CategoryFactory(store=store)
+        product_objs += [ProductFactory(store=store, category=category, picture="products_pic/no-image.jpg")
+                         for _ in range(products)]
+    customers = [UserFactory(username=f"bench-customer-{i}") for i in range(users)]
+    permissions = list(Permission.objects.filter(codename__in=["view_orders_page", "take_orders"]))
+    courier_objs = [DeliverymanFactory(user=UserFactory(username=f"bench-courier-{i}")) for i in range(couriers)]
+    for courier in courier_objs:
+        courier.user.user_permissions.add(*permissions)
+    return store_objs, product_objs, customers, courier_objs
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def __call__(self, step, request, expected_status=(200, 302)):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = request()
+            elapsed = (time.perf_counter() - started) * 1000
+        queries = len(context.captured_queries)
+        assert response.status_code in expected_status, (step, response.status_code)
+        self.samples[step].append((elapsed, queries))
+        return response
+
+    def results(self):
+        results = {}
+        for step in STEPS:
+            timings = [elapsed for elapsed, _ in self.samples[step]]
+            queries = [count for _, count in self.samples[step]]
+            results[step] = {**summarize(timings), "queries_p50": percentile(queries, 50),
+                             "queries_max": max(queries)}
+        return results
+
+
+def lifecycle(record, customer, user, courier, store, products, items, rng):
+    """
+    Один заказ от просмотра каталога до подтверждения выполнения.
+    """
+    from django.urls import reverse
+
+    from products.models import Order
+
+    record("stores", lambda: customer.get(reverse("products:store_list")))
+    record("store", lambda: customer.get(reverse("products:product_category", kwargs={"slug": store.slug})))
+    chosen = rng.sample(products, items)
+    for product in chosen:
+        record("product", lambda: customer.get(reverse("products:product_detail", kwargs={"pk": product.pk})))
+        record("add_to_cart", lambda: customer.get(reverse("products:add-to-cart", kwargs={"slug": product.slug})))
+    record("order_form", lambda: customer.get(reverse("products:order")))
+    record("checkout", lambda: customer.post(reverse("products:order"),
+                                             {"name": "Покупатель", "phone": "0555000000", "address": "ул. Токтогула"}))
+    order = Order.objects.filter(user=user, ordered=True).latest("pk")
+    record("take_order", lambda: courier.get(reverse("products:take-order", kwargs={"pk": order.pk})))
+    record("confirm_execution", lambda: customer.get(reverse("products:confirm_execution", kwargs={"pk": order.pk})))
+    order.refresh_from_db()
+    assert order.status == "Выполнен" and order.item_count == items, (order.status, order.item_count)
+
+
+def compare(results, baseline):
+    print(f"\nсравнение с {baseline['commit']}:")
+    for step, result in results.items():
+        old = baseline["steps"].get(step)
+        if old is None:
+            continue
+        change = (result["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100 if old["p50_ms"] else 0
+        print(f"   {step:<18} p50 {old['p50_ms']} → {result['p50_ms']} мс ({change:+.0f}%), "
+              f"запросов {old['queries_p50']} → {result['queries_p50']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stores", type=int, default=5)
+    parser.add_argument("--products", type=int, default=40, help="Продуктов в каждом магазине.")
+    parser.add_argument("--users", type=int, default=50, help="Покупателей, каждый оформляет один заказ.")
+    parser.add_argument("--couriers", type=int, default=5)
+    parser.add_argument("--items", type=int, default=3, help="Продуктов в каждом заказе.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Файл результата JSON.")
+    parser.add_argument("--compare", type=Path, help="JSON прошлого прогона для сравнения.")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import Client
+
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    with temporary_media(), temporary_database() as connection:
+        stores, products, customers, couriers = seed(args.stores, args.products, args.users, args.couriers)
+        courier_clients = []
+        for courier in couriers:
+            client = Client()
+            client.force_login(courier.user)
+            courier_clients.append(client)
+        for i, user in enumerate(customers):
+            client = Client()
+            client.force_login(user)
+            store = rng.choice(stores)
+            lifecycle(recorder, client, user, courier_clients[i % len(courier_clients)], store,
+                      [product for product in products if product.store_id == store.pk], args.items, rng)
+        vendor = connection.vendor
+
+    results = recorder.results()
+    commit = current_commit()
+    report = {"commit": commit, "vendor": vendor, "params": {key: value for key, value in vars(args).items()
+                                                             if key not in ("output", "compare")},
+              "steps": results}
+    output = args.output or RESULTS_DIR / f"lifecycle-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+
+    print(f"{vendor}, коммит {commit}: {args.users} заказов по {args.items} продукта\n")
+    for step, result in results.items():
+        print(f"   {step:<18} p50 {result['p50_ms']} мс, p95 {result['p95_ms']} мс, "
+              f"запросов {result['queries_p50']} (макс. {result['queries_max']}), {result['runs']} запросов")
+    print(f"\nрезультат: {output}")
+    if args.compare:
+        compare(results, json.loads(args.compare.read_text()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Время поиска продуктов: прежний icontains против полнотекстового индекса на растущем каталоге.
+
+    $ python -m benchmarks.bench_search --sizes 10000 100000 300000
+
+Продукты вставляются через bulk_create в обход сигналов, после чего индекс
+перестраивается так же, как это делает manage.py rebuild_search_index.
+"""
+import argparse
+import random
+
+from benchmarks.utils import measure, setup_django, summarize, temporary_database
+
+SYLLABLES = ["ко", "ма", "ро", "са", "ли", "не", "то", "ва", "ры", "пе", "да", "ку", "мо", "ло", "чи", "хл"]
+
+
+def make_words(rng, count):
+    return ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(count)]
+
+
+def seed_products(size, rng, words):
+    from django.db import connection
+
+    from products.models import Category, Product, Store
+    from products.search import get_backend
+
+    store = Store.objects.create(name="Магазин", slug="bench-store", desc="-")
+    category = Category.objects.create(name="Категория", slug="bench-category", store=store)
+    batch = []
+    for i in range(size):
+        batch.append(Product(
+            name=" ".join(rng.sample(words, 3)), slug=f"bench-product-{i}", store=store, category=category,
+            price=rng.randint(20, 2000), desc=" ".join(rng.sample(words, 6)),
+        ))
+        if len(batch) == 5000:
+            Product.objects.bulk_create(batch)
+            batch = []
+    Product.objects.bulk_create(batch)
+    backend = get_backend()
+    backend.install(connection)
+    backend.rebuild(connection)
+
+
+def run(queries, repeat):
+    from django.db.models import Q
+
+    from products.models import Product
+    from products.search import search_products
+
+    def old(query):
+        # прежний SearchProductsView выводил всю выдачу без пагинации
+        return list(Product.objects.filter(Q(name__icontains=query) | Q(price__icontains=query)))
+
+    def new(query):
+        return list(search_products(query)[:24])
+
+    return {
+        "icontains": summarize([t for query in queries for t in measure(lambda: old(query), repeat)]),
+        "index": summarize([t for query in queries for t in measure(lambda: new(query), repeat)]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 100000])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    setup_django()
+    rng = random.Random(args.seed)
+    words = make_words(rng, 2000)
+    # редкое слово, частое слово и префикс, как при наборе на клавиатуре
+    queries = [words[0], words[1][:3], f"{words[2]} {words[3]}"]
+
+    for size in args.sizes:
+        with temporary_database() as connection:
+            seed_products(size, random.Random(args.seed), words)
+            result = run(queries, args.repeat)
+        print(f"{connection.vendor}, {size} продуктов: "
+              f"icontains p50 {result['icontains']['p50_ms']} мс, p95 {result['icontains']['p95_ms']} мс; "
+              f"индекс p50 {result['index']['p50_ms']} мс, p95 {result['index']['p95_ms']} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Служебные обращения к базе ради транзакций: ATOMIC_REQUESTS на каждый запрос против
+страниц без транзакции запроса и коротких atomic() вокруг записей.
+
+    $ python -m benchmarks.bench_transactions --orders 2000 --repeat 50
+
+"до" — как раньше, каждое представление обёрнуто в транзакцию запроса (отметки
+non_atomic_requests не действуют). "после" — текущий код. Для каждой страницы и
+действия печатает p50 времени ответа и число BEGIN/COMMIT/SAVEPOINT на запрос: в
+PostgreSQL каждое из них — отдельный сетевой round trip, а открытая транзакция держит
+снимок базы, пока рендерится шаблон.
+"""
+import argparse
+from contextlib import contextmanager
+
+from benchmarks.utils import measure, setup_django, summarize, temporary_database
+
+
+class TransactionCounter:
+    """
+    Считает служебные команды транзакций на соединении: BEGIN (у PostgreSQL его неявно
+    отправляет драйвер), COMMIT, ROLLBACK и команды точек сохранения.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.count = 0
+
+    def execute(self, execute, sql, params, many, context):
+        # BEGIN у SQLite тоже идёт через курсор, но он уже посчитан в set_autocommit
+        if sql.startswith(("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")):
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def __call__(self):
+        connection = self.connection
+        set_autocommit, commit, rollback = connection.set_autocommit, connection.commit, connection.rollback
+
+        def counting(method, when=lambda *args, **kwargs: True):
+            def wrapper(*args, **kwargs):
+                if when(*args, **kwargs):
+                    self.count += 1
+                return method(*args, **kwargs)
+            return wrapper
+
+        connection.set_autocommit = counting(set_autocommit, lambda autocommit, *args, **kwargs: not autocommit)
+        connection.commit = counting(commit)
+        connection.rollback = counting(rollback)
+        try:
+            with connection.execute_wrapper(self.execute):
+                yield self
+        finally:
+            del connection.set_autocommit, connection.commit, connection.rollback
+
+
+@contextmanager
+def request_transactions():
+    """
+    Поведение до изменения: ATOMIC_REQUESTS оборачивает каждое представление.
+    """
+    from django.core.handlers.base import BaseHandler
+    from django.db import connections, transaction
+
+    original = BaseHandler.make_view_atomic
+
+    def make_view_atomic(self, view):
+        for db in connections.all():
+            if db.settings_dict["ATOMIC_REQUESTS"]:
+                view = transaction.atomic(using=db.alias)(view)
+        return view
+
+    BaseHandler.make_view_atomic = make_view_atomic
+    try:
+        yield
+    finally:
+        BaseHandler.make_view_atomic = original
+
+
+def without_messages(client, response):
+    # сообщения копятся в cookie, пока редирект не прочитан, и раздували бы следующие запросы
+    client.cookies.pop("messages", None)
+    return response
+
+
+def requests(data):
+    from django.urls import reverse
+
+    store, category, product = data["stores"][0], data["categories"][0], data["products"][0]
+    return {
+        "stores": lambda client: client.get(reverse("products:store_list")),
+        "store": lambda client: client.get(reverse("products:product_category", kwargs={"slug": store.slug})),
+        "category": lambda client: client.get(reverse("products:cat_products", kwargs={"slug": category.slug})),
+        "product": lambda client: client.get(reverse("products:product_detail", kwargs={"pk": product.pk})),
+        "search": lambda client: client.get(reverse("products:search_products"), {"q": product.name.split()[0]}),
+        "cart": lambda client: client.get(reverse("products:order-summary")),
+        "order board": lambda client: client.get(reverse("products:ordered")),
+        "api stores": lambda client: client.get(reverse("products:api-stores")),
+        "add to cart": lambda client: without_messages(
+            client, client.get(reverse("products:add-to-cart", kwargs={"slug": product.slug}))),
+    }
+
+
+def run(client, request, counter, repeat):
+    request(client)  # прогрев кэшей каталога, счётчиков и миниатюр
+    with counter() as counted:
+        before = counted.count
+        request(client)
+        per_request = counted.count - before
+    return {"transaction_commands": per_request, **summarize(measure(lambda: request(client), repeat))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import Permission
+    from django.test import Client
+    from django.test.utils import override_settings
+
+    from benchmarks.seed import seed_dataset
+
+    with override_settings(CART_BACKEND="products.cart.DatabaseCart"), temporary_database() as connection:
+        data = seed_dataset(users=args.users, couriers=10, stores=5, categories_per_store=5, products_per_store=50,
+                            orders=args.orders)
+        courier = data["couriers"][0].user
+        courier.user_permissions.add(*Permission.objects.filter(codename__in=["view_orders_page", "take_orders"]))
+        client = Client()
+        client.force_login(courier)
+        counter = TransactionCounter(connection)
+
+        print(f"{connection.vendor}: p50 времени ответа и BEGIN/COMMIT/SAVEPOINT на запрос\n")
+        for name, request in requests(data).items():
+            with request_transactions():
+                before = run(client, request, counter, args.repeat)
+            after = run(client, request, counter, args.repeat)
+            print(f"   {name:<12} до: {before['p50_ms']:>7} мс, {before['transaction_commands']} команд   "
+                  f"после: {after['p50_ms']:>7} мс, {after['transaction_commands']} команд")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from products.models import ApplicationForm, Category, Deliveryman, Order, OrderProduct, Product, Store
+
+
+def _bulk_create(model, objs):
+    # SQLite в Django 3.0 не возвращает pk из bulk_create, поэтому перечитываем строки;
+    # база бенчмарка свежая, так что порядок pk совпадает с порядком вставки
+    model.objects.bulk_create(objs)
+    return list(model.objects.order_by("pk"))
+
+
+def seed_dataset(users=1000, couriers=50, stores=20, categories_per_store=5, products_per_store=200,
+                 orders=20000, lines_per_order=3, seed=0):
+    """
+    Быстро наполняет пустую базу через bulk_create. Распределение похоже на рабочее:
+    у пользователя не больше одной открытой корзины, большая часть заказов уже
+    выполнена, около десятой части ждёт курьера.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    User = get_user_model()
+
+    user_objs = _bulk_create(User, [
+        User(username=f"bench-user-{i}", email=f"bench-{i}@example.com", password="!") for i in range(users)
+    ])
+    courier_objs = _bulk_create(Deliveryman, [
+        Deliveryman(user=user, name=user.username, phone="0") for user in user_objs[:couriers]
+    ])
+    _bulk_create(ApplicationForm, [
+        ApplicationForm(user=user, name=user.username, phone="0", reason="-",
+                        status=rng.choice(["В ожидании", "Принято", "Отказано", "Отказано"]))
+        for user in user_objs[couriers:couriers * 2]
+    ])
+
+    store_objs = _bulk_create(Store, [
+        Store(name=f"Магазин {i}", slug=f"bench-store-{i}", desc="-") for i in range(stores)
+    ])
+    category_objs = _bulk_create(Category, [
+        Category(name=f"Категория {i}-{j}", slug=f"bench-category-{i}-{j}", store=store)
+        for i, store in enumerate(store_objs) for j in range(categories_per_store)
+    ])
+    product_objs = _bulk_create(Product, [
+        Product(
+            name=f"Продукт {i}-{j}", slug=f"bench-product-{i}-{j}", store=store,
+            category=category_objs[i * categories_per_store + j % categories_per_store],
+            price=Decimal(rng.randint(20, 2000)), desc="-",
+        )
+        for i, store in enumerate(store_objs) for j in range(products_per_store)
+    ])
+
+    order_objs, order_lines = [], []
+    open_carts = set()
+    for i in range(orders):
+        user = rng.choice(user_objs)
+        state = rng.random()
+        if state < 0.05 and user.pk not in open_carts:
+            open_carts.add(user.pk)
+            ordered, deliveryman, status = False, None, "Новый"
+        elif state < 0.15:
+            ordered, deliveryman, status = True, None, "Новый"
+        elif state < 0.25:
+            ordered, deliveryman, status = True, rng.choice(courier_objs), "В ожидании"
+        else:
+            ordered, deliveryman, status = True, rng.choice(courier_objs), "Выполнен"
+        lines = [
+            OrderProduct(
+                product=product, amount=rng.randint(1, 5),
+                unit_price=product.price if ordered else None, product_name=product.name if ordered else "",
+            )
+            for product in rng.sample(product_objs, lines_per_order)
+        ]
+        order_lines.extend(lines)
+        order_objs.append(Order(
+            user_id=user.pk, ordered=ordered, deliveryman=deliveryman, status=status,
+            created_date=now - timedelta(minutes=orders - i), name=user.username, phone="0", address="-",
+            total=sum(line.amount * line.product.price for line in lines), item_count=len(lines),
+        ))
+    order_objs = _bulk_create(Order, order_objs)
+    for index, line in enumerate(order_lines):
+        line.order = order_objs[index // lines_per_order]
+    OrderProduct.objects.bulk_create(order_lines)
+
+    return {
+        "users": user_objs,
+        "couriers": courier_objs,
+        "stores": store_objs,
+        "categories": category_objs,
+        "products": product_objs,
+        "orders": order_objs,
+    }
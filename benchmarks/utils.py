@@ -0,0 +1,66 @@
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+
+def setup_django(settings_module="config.settings.test"):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    import django
+
+    django.setup()
+
+
+class _DisableMigrations:
+    # как pytest --nomigrations: схема строится прямо по моделям, включая Meta.indexes
+    def __contains__(self, item):
+        return True
+
+    def __getitem__(self, item):
+        return None
+
+
+@contextmanager
+def temporary_database():
+    """
+    Создаёт временную базу для бенчмарка и удаляет её по завершении.
+    """
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    settings.MIGRATION_MODULES = _DisableMigrations()
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def measure(func, repeat=20):
+    """
+    Вызывает func repeat раз и возвращает длительности в миллисекундах.
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(timings):
+    return {
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "runs": len(timings),
+    }
@@ -0,0 +1,40 @@
+"""
+ASGI config for InEl Delivery project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Run it with an ASGI server, for example::
+
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
+
+Pages are served by the standard Django ASGI application. The couriers' order
+board event stream (products/events.py) is answered here directly: Django 3.0 has
+no async views, and a streaming response would hold a worker thread per courier.
+
+"""
+import os
+import sys
+from pathlib import Path
+
+from django.core.asgi import get_asgi_application
+
+# This allows easy placement of apps within the interior
+# inel_delivery directory.
+ROOT_DIR = Path(__file__).resolve(strict=True).parent.parent
+sys.path.append(str(ROOT_DIR / "inel_delivery"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
+
+# get_asgi_application() sets Django up, so app modules are imported after it.
+django_application = get_asgi_application()
+
+from django.urls import reverse  # noqa E402
+
+from products.events import order_board_stream  # noqa E402
+
+ORDER_EVENTS_PATH = reverse("products:order_events")
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http" and scope["path"] == ORDER_EVENTS_PATH:
+        await order_board_stream(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
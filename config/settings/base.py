@@ -81,7 +81,7 @@ THIRD_PARTY_APPS = [
 LOCAL_APPS = [
     "inel_delivery.users.apps.UsersConfig",
     # Your stuff: custom apps go here
-    "products"
+    "products.apps.ProductsConfig",
 ]
 # https://docs.djangoproject.com/en/dev/ref/settings/#installed-apps
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -129,6 +129,7 @@ AUTH_PASSWORD_VALIDATORS = [
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#middleware
 MIDDLEWARE = [
+    "products.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -136,6 +137,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "products.roles.RoleProfileMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.common.BrokenLinkEmailsMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
@@ -168,7 +170,8 @@ MEDIA_URL = "/media/"
 TEMPLATES = [
     {
         # https://docs.djangoproject.com/en/dev/ref/settings/#std:setting-TEMPLATES-BACKEND
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates, который замеряет время рендеринга для метрик (products/metrics.py)
+        "BACKEND": "products.metrics.DjangoTemplates",
         # https://docs.djangoproject.com/en/dev/ref/settings/#template-dirs
         "DIRS": [str(APPS_DIR / "templates")],
         "OPTIONS": {
@@ -189,6 +192,7 @@ TEMPLATES = [
                 "django.template.context_processors.tz",
                 "django.contrib.messages.context_processors.messages",
                 "inel_delivery.utils.context_processors.settings_context",
+                "inel_delivery.utils.context_processors.badge_counters",
             ],
         },
     }
@@ -281,3 +285,52 @@ GRAPH_MODELS = {
     "group_models": True,
 }
 os.environ["PATH"] += os.pathsep + 'C:/Program Files/Graphviz/bin/'
+
+# Автоматическое распределение заказов (products/dispatch.py, manage.py run_dispatcher)
+DISPATCH_POLICY = env("DISPATCH_POLICY", default="least-loaded")
+DISPATCH_BATCH_SIZE = env.int("DISPATCH_BATCH_SIZE", default=200)
+DISPATCH_MAX_ACTIVE_ORDERS = env.int("DISPATCH_MAX_ACTIVE_ORDERS", default=3)
+
+# Кэш каталога (products/catalog.py): записей в памяти процесса и время жизни в общем кэше, секунды
+CATALOG_LOCAL_CACHE_SIZE = env.int("CATALOG_LOCAL_CACHE_SIZE", default=256)
+CATALOG_CACHE_TIMEOUT = env.int("CATALOG_CACHE_TIMEOUT", default=60 * 60 * 24)
+# Кэш HTML карточек продуктов и магазинов (products/fragments.py), секунды
+FRAGMENT_CACHE_TIMEOUT = env.int("FRAGMENT_CACHE_TIMEOUT", default=60 * 60 * 24 * 7)
+
+# Миниатюры (products/thumbnails.py): генерируются очередью при загрузке картинки, а не при рендеринге
+IMAGEKIT_DEFAULT_CACHEFILE_STRATEGY = "products.thumbnails.QueuedStrategy"
+THUMBNAIL_QUEUE = env("THUMBNAIL_QUEUE", default="products.thumbnails.ThreadQueue")
+THUMBNAIL_WORKERS = env.int("THUMBNAIL_WORKERS", default=2)
+# неудачная генерация в ThreadQueue повторяется: число попыток и пауза между ними, секунды
+THUMBNAIL_RETRIES = env.int("THUMBNAIL_RETRIES", default=3)
+THUMBNAIL_RETRY_DELAY = env.int("THUMBNAIL_RETRY_DELAY", default=5)
+
+# Метрики запросов (products/metrics.py, /metrics/): бюджет SQL-запросов на запрос по умолчанию
+# и по именам URL, период выгрузки счётчиков процесса в общий кэш и токен для Prometheus
+METRICS_DEFAULT_QUERY_BUDGET = env.int("METRICS_DEFAULT_QUERY_BUDGET", default=20)
+# (число запросов курьера с корзиной при пустом кэше, см. test_budgeted_views_fit_with_empty_cache)
+METRICS_QUERY_BUDGETS = {
+    "products:store_list": 9,
+    "products:product_category": 11,
+    "products:cat_products": 11,
+    "products:order-summary": 9,
+    "products:ordered": 8,
+}
+METRICS_FLUSH_INTERVAL = env.int("METRICS_FLUSH_INTERVAL", default=10)
+METRICS_LOG_REQUESTS = env.bool("METRICS_LOG_REQUESTS", default=False)
+METRICS_TOKEN = env("METRICS_TOKEN", default="")
+
+# Хранилище корзины (products/cart.py): DatabaseCart — строками в базе, CacheCart — в кэше до оформления заказа.
+# CacheCart не видит уже открытые в базе корзины и требует общего для всех процессов кэша (Redis), см. README
+CART_BACKEND = env("CART_BACKEND", default="products.cart.DatabaseCart")
+CART_CACHE_TIMEOUT = env.int("CART_CACHE_TIMEOUT", default=60 * 60 * 24 * 30)
+
+# Профили ролей (products/roles.py): время жизни профиля в общем кэше, секунды. Профили сбрасываются
+# сигналами при изменении групп, прав и курьеров; таймаут ограничивает устаревание при гонках
+ROLES_CACHE_TIMEOUT = env.int("ROLES_CACHE_TIMEOUT", default=60 * 60)
+
+# События доски заказов (products/events.py, поток SSE в config/asgi.py): шина между процессами
+# (LocalBus — в памяти одного процесса), пульс соединения в секундах и очередь событий на соединение
+EVENTS_BUS = env("EVENTS_BUS", default="products.events.LocalBus")
+EVENTS_HEARTBEAT = env.int("EVENTS_HEARTBEAT", default=25)
+EVENTS_QUEUE_SIZE = env.int("EVENTS_QUEUE_SIZE", default=100)
@@ -28,6 +28,9 @@ CACHES = {
         },
     }
 }
+# События доски заказов расходятся по всем процессам через Redis pub/sub
+EVENTS_BUS = env("EVENTS_BUS", default="products.events.RedisBus")
+EVENTS_REDIS_URL = env("REDIS_URL")
 
 # SECURITY
 # ------------------------------------------------------------------------------
@@ -1 +1,80 @@
 /* Project specific Javascript goes here. */
+
+// Подгрузка следующей страницы списков заказов без перезагрузки (см. includes/load_more.html)
+$(document).on('click', '.js-load-more', function (event) {
+  event.preventDefault();
+  var $link = $(this);
+  $.get($link.attr('href'), function (html) {
+    var $page = $('<div>').html(html);
+    $('[data-keyset-list]').append($page.find('[data-keyset-list]').children());
+    $link.closest('.blog_details').replaceWith($page.find('.js-load-more').closest('.blog_details'));
+  });
+});
+
+// Живая доска заказов: события из потока SSE (products/events.py) вместо обновления страницы
+$(function () {
+  var $board = $('[data-order-events]');
+  var template = document.getElementById('order-card-template');
+  if (!$board.length || !template || !window.EventSource) {
+    return;
+  }
+  var source = new EventSource($board.data('order-events'));
+  var connected = false;
+
+  function removeCard(id) {
+    $board.children('[data-order="' + id + '"]').remove();
+  }
+
+  // порядок доски — ключ (created_date, id), как у постраничного вывода на сервере
+  function isAfter($card, order) {
+    var created = $card.attr('data-created');
+    if (created !== order.created_date) {
+      return created > order.created_date;
+    }
+    return Number($card.attr('data-order')) > order.id;
+  }
+
+  function addCard(order) {
+    removeCard(order.id);
+    var $next = $board.children('[data-order]').filter(function () {
+      return isAfter($(this), order);
+    }).first();
+    // заказ дальше подгруженных страниц появится при подгрузке
+    if (!$next.length && $('.js-load-more').length) {
+      return;
+    }
+    var $card = $($.parseHTML(template.innerHTML.trim()))
+      .attr({'data-order': order.id, 'data-created': order.created_date});
+    $card.find('[data-field]').each(function () {
+      $(this).text(order[$(this).attr('data-field')]);
+    });
+    $card.find('a[href]').each(function () {
+      $(this).attr('href', $(this).attr('href').replace('/0/', '/' + order.id + '/'));
+    });
+    if ($next.length) {
+      $card.insertBefore($next);
+    } else {
+      $board.append($card);
+    }
+  }
+
+  source.addEventListener('order_placed', function (event) {
+    addCard(JSON.parse(event.data));
+  });
+  source.addEventListener('order_released', function (event) {
+    addCard(JSON.parse(event.data));
+  });
+  source.addEventListener('order_claimed', function (event) {
+    removeCard(JSON.parse(event.data).id);
+  });
+  // пропущенные события (переполненная очередь, обрыв соединения) восстанавливаем перезагрузкой
+  source.addEventListener('resync', function () {
+    window.location.reload();
+  });
+  source.addEventListener('open', function () {
+    if (connected) {
+      window.location.reload();
+    }
+    connected = true;
+  });
+});
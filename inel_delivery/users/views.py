@@ -1,13 +1,16 @@
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import transaction
 from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.utils.translation import gettext_lazy as _
 from django.views.generic import DetailView, RedirectView, UpdateView
 
 User = get_user_model()
 
 
+@method_decorator(transaction.non_atomic_requests, name="dispatch")
 class UserDetailView(LoginRequiredMixin, DetailView):
 
     model = User
@@ -39,6 +42,7 @@ class UserUpdateView(LoginRequiredMixin, UpdateView):
 user_update_view = UserUpdateView.as_view()
 
 
+@method_decorator(transaction.non_atomic_requests, name="dispatch")
 class UserRedirectView(LoginRequiredMixin, RedirectView):
 
     permanent = False
@@ -1,4 +1,7 @@
 from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from products.counters import get_badge_counters
 
 
 def settings_context(_request):
@@ -6,3 +9,8 @@ def settings_context(_request):
     # Note: we intentionally do NOT expose the entire settings
     # to prevent accidental leaking of sensitive information
     return {"DEBUG": settings.DEBUG}
+
+
+def badge_counters(request):
+    """Navbar badge counters, computed lazily in a single query per request."""
+    return {"badge_counters": SimpleLazyObject(lambda: get_badge_counters(request))}
@@ -19,10 +19,29 @@ class ProductAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('name',)}
 
 
+class OrderProductInline(admin.TabularInline):
+    model = OrderProduct
+    fields = ['product', 'amount', 'unit_price', 'product_name']
+    raw_id_fields = ['product']
+    extra = 0
+
+
 class OrderAdmin(admin.ModelAdmin):
     list_display = ['created_date', 'status']
     list_filter = ['created_date', 'status']
     search_fields = ['user__username', 'ref_code']
+    inlines = [OrderProductInline]
+
+    def save_formset(self, request, form, formset, change):
+        # итоги заказа хранятся в нём самом и должны следовать за строками
+        super().save_formset(request, form, formset, change)
+        form.instance.recalculate_totals()
+
+
+class OrderProductAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'order', 'amount']
+    list_select_related = ['order__user', 'product']
+    raw_id_fields = ['order', 'product']
 
 
 admin.site.register(Deliveryman)
@@ -31,5 +50,5 @@ admin.site.register(Store, StoreAdmin)
 admin.site.register(Category, CategoryAdmin)
 admin.site.register(Product, ProductAdmin)
 admin.site.register(Order, OrderAdmin)
-admin.site.register(OrderProduct)
+admin.site.register(OrderProduct, OrderProductAdmin)
 
@@ -0,0 +1,252 @@
+"""
+JSON API для мобильного приложения: каталог, корзина, оформление и доска заказов курьеров.
+
+Ответы не рендерят шаблоны и не считают счётчики навигационной панели. Каталог
+читается из кэша каталога, заказы — узкими запросами values(). GET-ответы несут
+ETag и отвечают 304 на If-None-Match; для каталога ETag строится из версий кэша,
+поэтому повторный запрос не выполняет ни одного запроса к базе.
+Авторизация — сессия сайта (cookie и CSRF-токен, как у форм). GET каталога и доски заказов
+только читают базу и идут без транзакции запроса.
+"""
+import json
+from functools import wraps
+
+from django.db import transaction
+from django.http import Http404, JsonResponse
+from django.utils.cache import get_conditional_response, set_response_etag
+from django.views.decorators.http import condition, require_GET, require_http_methods, require_POST
+
+from . import catalog
+from .cart import get_cart
+from .checkout import checkout as place_order
+from .forms import OrderForm
+from .models import Order, Product
+from .orders import claim_order, confirm_delivery
+from .pagination import keyset_page
+from .serializers import (
+    ORDER_BOARD_FIELDS,
+    money,
+    serialize_cart,
+    serialize_category,
+    serialize_product,
+    serialize_order_row,
+    serialize_product_detail,
+    serialize_store,
+)
+
+MAX_CART_ENTRIES = 100
+BOARD_PAGE_SIZE = 50
+
+
+def _error(message, status, **extra):
+    return JsonResponse({"error": message, **extra}, status=status)
+
+
+def _json(request, data, status=200, etag=True):
+    """
+    JsonResponse с ETag по содержимому: клиент с актуальной копией получает 304 без тела.
+    Каталог передаёт etag=False — его ETag ставит @condition по версиям кэша.
+    """
+    response = JsonResponse(data, status=status, json_dumps_params={"ensure_ascii": False})
+    if request.method != "GET" or not etag:
+        return response
+    set_response_etag(response)
+    return get_conditional_response(request, etag=response["ETag"], response=response)
+
+
+def _load_json(request):
+    try:
+        return json.loads(request.body or b"null")
+    except ValueError:
+        return None
+
+
+def api_login_required(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _error("Требуется вход в систему.", 401)
+        return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def api_permission_required(perm):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not request.user.has_perm(perm):
+                return _error("У вас недостаточно прав для этого.", 403)
+            return view(request, *args, **kwargs)
+
+        return api_login_required(wrapper)
+
+    return decorator
+
+
+# каталог
+
+def _store_etag(request, slug):
+    store = catalog.get_store(slug)
+    return catalog.store_version(store.pk) if store is not None else None
+
+
+def _category_etag(request, slug):
+    category, store_catalog = catalog.get_category(slug)
+    return catalog.store_version(category.store_id) if category is not None else None
+
+
+def _product_last_modified(request, pk):
+    return Product.objects.filter(pk=pk).values_list("updated", flat=True).first()
+
+
+@transaction.non_atomic_requests
+@require_GET
+@condition(etag_func=lambda request: catalog.catalog_version())
+def store_list(request):
+    return _json(request, {"stores": [serialize_store(store) for store in catalog.get_stores()]}, etag=False)
+
+
+@transaction.non_atomic_requests
+@require_GET
+@condition(etag_func=_store_etag)
+def store_detail(request, slug):
+    store = catalog.get_store(slug)
+    if store is None:
+        return _error("Магазин не найден.", 404)
+    store_catalog = catalog.get_store_catalog(store)
+    return _json(request, {
+        "store": serialize_store(store),
+        "categories": [serialize_category(category) for category in store_catalog["categories"]],
+        "products": [serialize_product(product) for product in store_catalog["products"]],
+    }, etag=False)
+
+
+@transaction.non_atomic_requests
+@require_GET
+@condition(etag_func=_category_etag)
+def category_products(request, slug):
+    category, store_catalog = catalog.get_category(slug)
+    if category is None:
+        return _error("Категория не найдена.", 404)
+    return _json(request, {
+        "category": serialize_category(category),
+        "products": [
+            serialize_product(product) for product in store_catalog["products"] if product.category_id == category.pk
+        ],
+    }, etag=False)
+
+
+@transaction.non_atomic_requests
+@require_GET
+@condition(last_modified_func=_product_last_modified)
+def product_detail(request, pk):
+    product = Product.objects.filter(pk=pk).first()
+    if product is None:
+        return _error("Продукт не найден.", 404)
+    return _json(request, {"product": serialize_product_detail(product)})
+
+
+# корзина и оформление
+
+def _parse_cart_entries(data):
+    """
+    Разбирает [{"slug": ..., "quantity": ...}, ...] (или {"items": [...]}) в словарь
+    {slug: количество}. Возвращает (entries, ошибка).
+    """
+    if isinstance(data, dict):
+        data = data.get("items")
+    if not isinstance(data, list) or len(data) > MAX_CART_ENTRIES:
+        return None, f"Ожидается список из не более чем {MAX_CART_ENTRIES} позиций."
+    entries = {}
+    for entry in data:
+        slug = entry.get("slug") if isinstance(entry, dict) else None
+        quantity = entry.get("quantity") if isinstance(entry, dict) else None
+        if not isinstance(slug, str) or isinstance(quantity, bool) or not isinstance(quantity, int) \
+                or not 0 <= quantity <= 1000:
+            return None, "Каждая позиция — {\"slug\": строка, \"quantity\": целое от 0 до 1000}."
+        entries[slug] = quantity
+    return entries, None
+
+
+@require_http_methods(["GET", "POST"])
+@api_login_required
+def cart_api(request):
+    """
+    GET возвращает корзину, POST выставляет количества многих продуктов за один
+    запрос (0 убирает продукт) и возвращает пересчитанную корзину.
+    """
+    cart = get_cart(request)
+    if request.method == "POST":
+        entries, error = _parse_cart_entries(_load_json(request))
+        if error:
+            return _error(error, 400)
+        products = {}
+        for product in Product.objects.filter(slug__in=list(entries)).order_by("pk"):
+            products.setdefault(product.slug, product)
+        missing = sorted(set(entries) - set(products))
+        if missing:
+            return _error("Продукты не найдены.", 400, slugs=missing)
+        cart.set_quantities({products[slug]: quantity for slug, quantity in entries.items()})
+    return _json(request, serialize_cart(cart))
+
+
+@require_POST
+@api_login_required
+def checkout(request):
+    data = _load_json(request)
+    form = OrderForm(data if isinstance(data, dict) else None)
+    if not form.is_valid():
+        return _error("Удостоверьтесь что вы заполнили всё правильно.", 400, fields=form.errors.get_json_data())
+    idempotency_key = request.headers.get("Idempotency-Key") or form.cleaned_data["idempotency_key"] or None
+    if idempotency_key is not None and len(idempotency_key) > 64:
+        return _error("Ключ идемпотентности длиннее 64 символов.", 400)
+    order, created = place_order(get_cart(request), form.cleaned_data["name"], form.cleaned_data["phone"],
+                                 form.cleaned_data["address"], idempotency_key)
+    if order is None:
+        return _error("У вас нет активного заказа.", 409)
+    # повтор с тем же ключом получает тот же заказ с кодом 200
+    return _json(request, {"order": {"id": order.pk, "total": money(order.total), "item_count": order.item_count}},
+                 status=201 if created else 200)
+
+
+# доска заказов курьеров
+
+@transaction.non_atomic_requests
+@require_GET
+@api_permission_required("products.view_orders_page")
+def order_board(request):
+    """
+    Новые заказы без курьера, старые первыми, страницами по ключу: ?after=<next>.
+    """
+    orders = Order.objects.filter(ordered=True, deliveryman=None)
+    if request.roles.is_courier:
+        orders = orders.exclude(user=request.user)
+    try:
+        rows, next_cursor = keyset_page(orders.values(*ORDER_BOARD_FIELDS), request.GET.get("after"), BOARD_PAGE_SIZE)
+    except Http404:
+        return _error("Неверный курсор страницы.", 400)
+    return _json(request, {"orders": [serialize_order_row(row) for row in rows], "next": next_cursor})
+
+
+@require_POST
+@api_permission_required("products.take_orders")
+def take_order(request, pk):
+    deliveryman = request.roles.deliveryman
+    if deliveryman is None:
+        return _error("У вас недостаточно прав для этого.", 403)
+    if not claim_order(pk, deliveryman):
+        if not Order.objects.filter(pk=pk).exists():
+            return _error("Заказ не найден.", 404)
+        return _error("Вы не можете взять этот заказ.", 409)
+    return _json(request, {"order": pk, "status": "В ожидании"})
+
+
+@require_POST
+@api_login_required
+def confirm_execution(request, pk):
+    if not confirm_delivery(pk, request.user):
+        if not Order.objects.filter(pk=pk, user=request.user).exists():
+            return _error("Заказ не найден.", 404)
+        return _error("Заказ нельзя подтвердить: у него нет курьера или он уже выполнен.", 409)
+    return _json(request, {"order": pk, "status": "Выполнен"})
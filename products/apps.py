@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ProductsConfig(AppConfig):
     name = 'products'
+
+    def ready(self):
+        import products.signals
+
+        post_migrate.connect(products.signals.install_search_index, sender=self)
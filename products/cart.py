@@ -0,0 +1,271 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+
+from .checkout import create_order, finalize_order
+from .models import Order, OrderProduct, Product
+
+
+class BaseCart:
+    """
+    Корзина пользователя. Строки корзины — экземпляры OrderProduct (у кэш-корзины
+    несохранённые), поэтому шаблоны работают с ними одинаково для любого хранилища.
+    """
+    # True, если корзина — строки в базе и её размер можно посчитать в запросе счётчиков
+    in_database = False
+
+    def __init__(self, user):
+        self.user = user
+
+    def exists(self):
+        raise NotImplementedError
+
+    def add(self, product):
+        """
+        Кладёт единицу продукта в корзину и возвращает его новое количество.
+        """
+        raise NotImplementedError
+
+    def remove(self, product):
+        """
+        Убирает продукт целиком. Возвращает False, если его не было в корзине.
+        """
+        raise NotImplementedError
+
+    def remove_one(self, product):
+        """
+        Убирает единицу продукта. Возвращает False, если его не было в корзине.
+        """
+        raise NotImplementedError
+
+    def set_quantities(self, quantities):
+        """
+        Выставляет количества сразу для многих продуктов: {product: количество}, 0 убирает продукт.
+        """
+        raise NotImplementedError
+
+    @cached_property
+    def lines(self):
+        raise NotImplementedError
+
+    @property
+    def total(self):
+        return sum((line.get_total_item_price() for line in self.lines), 0)
+
+    @property
+    def item_count(self):
+        return len(self.lines)
+
+    def checkout(self, name, phone, address, idempotency_key=None):
+        """
+        Оформляет корзину в заказ с ценами на момент оформления и возвращает его
+        (None, если оформлять нечего). Вызывается через products.checkout.checkout.
+        """
+        raise NotImplementedError
+
+
+class DatabaseCart(BaseCart):
+    """
+    Корзина как открытый Order (ordered=False) со строками OrderProduct.
+    """
+    in_database = True
+
+    @cached_property
+    def order(self):
+        return Order.objects.filter(user=self.user, ordered=False).first()
+
+    def exists(self):
+        return self.order is not None
+
+    def _line(self, product):
+        if self.order is None:
+            return None
+        return OrderProduct.objects.filter(order=self.order, product=product).first()
+
+    def add(self, product):
+        order = self.order
+        # строка и итоги заказа меняются вместе; представления корзины не открывают транзакцию запроса
+        with transaction.atomic():
+            if order is None:
+                self.order = Order.objects.create(user=self.user, created_date=timezone.now(),
+                                                  total=product.price, item_count=1)
+                order_product = OrderProduct.objects.create(order=self.order, product=product)
+            else:
+                order_product, created = OrderProduct.objects.get_or_create(order=order, product=product)
+                # если продукт уже есть в заказе
+                if not created:
+                    order_product.amount += 1
+                    order_product.save(update_fields=["amount"])
+                order.adjust_totals(product.price, int(created))
+        self.__dict__.pop("lines", None)
+        return order_product.amount
+
+    def remove(self, product):
+        order_product = self._line(product)
+        if order_product is None:
+            return False
+        with transaction.atomic():
+            order_product.delete()
+            self.order.adjust_totals(-order_product.amount * product.price, -1)
+        self.__dict__.pop("lines", None)
+        return True
+
+    def remove_one(self, product):
+        order_product = self._line(product)
+        if order_product is None:
+            return False
+        with transaction.atomic():
+            if order_product.amount > 1:
+                order_product.amount -= 1
+                order_product.save(update_fields=["amount"])
+                self.order.adjust_totals(-product.price)
+            else:
+                order_product.delete()
+                self.order.adjust_totals(-product.price, -1)
+        self.__dict__.pop("lines", None)
+        return True
+
+    def set_quantities(self, quantities):
+        if self.order is None and not any(quantity > 0 for quantity in quantities.values()):
+            # корзины нет и добавлять нечего: пустой открытый заказ выглядел бы как корзина
+            return
+        with transaction.atomic():
+            if self.order is None:
+                self.order = Order.objects.create(user=self.user, created_date=timezone.now())
+            order = self.order
+            existing = {line.product_id: line for line in order.lines.all()}
+            to_create, to_update, to_delete = [], [], []
+            for product, quantity in quantities.items():
+                line = existing.get(product.pk)
+                if line is None:
+                    if quantity > 0:
+                        to_create.append(OrderProduct(order=order, product=product, amount=quantity))
+                elif quantity <= 0:
+                    to_delete.append(line.pk)
+                elif line.amount != quantity:
+                    line.amount = quantity
+                    to_update.append(line)
+            if to_create:
+                OrderProduct.objects.bulk_create(to_create)
+            if to_update:
+                OrderProduct.objects.bulk_update(to_update, ["amount"])
+            if to_delete:
+                OrderProduct.objects.filter(pk__in=to_delete).delete()
+            order.recalculate_totals()
+        self.__dict__.pop("lines", None)
+
+    @cached_property
+    def lines(self):
+        if self.order is None:
+            return []
+        return list(self.order.lines.select_related("product"))
+
+    @property
+    def total(self):
+        return self.order.get_total() if self.order is not None else 0
+
+    @property
+    def item_count(self):
+        return self.order.item_count if self.order is not None else 0
+
+    def checkout(self, name, phone, address, idempotency_key=None):
+        order = self.order
+        if order is None or not finalize_order(order, name, phone, address, idempotency_key):
+            return None
+        self.__dict__.pop("lines", None)
+        return order
+
+
+class CacheCart(BaseCart):
+    """
+    Корзина как словарь {pk продукта: количество} в кэше (Redis в продакшене).
+    Клики "+"/"-" не пишут в базу; строки Order/OrderProduct появляются только при оформлении.
+    Корзина живёт CART_CACHE_TIMEOUT секунд с последнего изменения и теряется при очистке кэша.
+    """
+
+    @property
+    def key(self):
+        return f"cart:{self.user.pk}"
+
+    @cached_property
+    def items(self):
+        return cache.get(self.key) or {}
+
+    def _save(self):
+        # чтение-изменение-запись: два одновременных клика одного пользователя могут
+        # потерять одно изменение, для корзины это допустимо
+        if self.items:
+            cache.set(self.key, self.items, settings.CART_CACHE_TIMEOUT)
+        else:
+            cache.delete(self.key)
+        self.__dict__.pop("lines", None)
+
+    def exists(self):
+        return bool(self.items)
+
+    def add(self, product):
+        self.items[product.pk] = self.items.get(product.pk, 0) + 1
+        self._save()
+        return self.items[product.pk]
+
+    def remove(self, product):
+        if product.pk not in self.items:
+            return False
+        del self.items[product.pk]
+        self._save()
+        return True
+
+    def remove_one(self, product):
+        if product.pk not in self.items:
+            return False
+        if self.items[product.pk] > 1:
+            self.items[product.pk] -= 1
+        else:
+            del self.items[product.pk]
+        self._save()
+        return True
+
+    def set_quantities(self, quantities):
+        for product, quantity in quantities.items():
+            if quantity > 0:
+                self.items[product.pk] = quantity
+            else:
+                self.items.pop(product.pk, None)
+        self._save()
+
+    @cached_property
+    def lines(self):
+        products = Product.objects.in_bulk(list(self.items)) if self.items else {}
+        # удалённые из каталога продукты просто пропадают из корзины
+        return [
+            OrderProduct(product=products[pk], amount=amount)
+            for pk, amount in self.items.items() if pk in products
+        ]
+
+    @property
+    def item_count(self):
+        return len(self.items)
+
+    def checkout(self, name, phone, address, idempotency_key=None):
+        if not self.lines:
+            return None
+        order = create_order(self.user, self.lines, name, phone, address, idempotency_key)
+        # корзину очищаем, только если заказ действительно сохранён
+        transaction.on_commit(lambda: cache.delete(self.key))
+        return order
+
+
+def get_cart_class():
+    return import_string(settings.CART_BACKEND)
+
+
+def get_cart(request):
+    """
+    Корзина текущего пользователя, одна на запрос.
+    """
+    if not hasattr(request, "_cart"):
+        request._cart = get_cart_class()(request.user)
+    return request._cart
@@ -0,0 +1,195 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import metrics
+from .models import Category, Product, Store
+
+# Версия каталога целиком (список магазинов и указатель slug категорий) и версии отдельных магазинов.
+# Данные лежат под ключами с версией внутри, поэтому сброс — это просто новая версия:
+# старые записи никто больше не прочитает, а в Redis они истекут по таймауту.
+CATALOG_VERSION_KEY = "catalog:version"
+STORE_VERSION_KEY = "catalog:version:store:{pk}"
+# Версия карточек магазина: меняется только при изменении самого магазина, а не его продуктов
+CARDS_VERSION_KEY = "catalog:version:cards:{pk}"
+
+
+class LRUCache:
+    """
+    Небольшой потокобезопасный LRU в памяти процесса. Хранит уже распакованные
+    объекты, чтобы горячие страницы не ходили за ними в Redis и не распаковывали pickle.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_cache = LRUCache(settings.CATALOG_LOCAL_CACHE_SIZE)
+
+
+def _new_version():
+    # время создания в начале версии даёт Last-Modified без отдельного хранения max(updated)
+    return f"{time.time():.6f}_{uuid.uuid4().hex[:12]}"
+
+
+def version_timestamp(version):
+    """
+    Время самого позднего изменения для версии или склейки версий через "-".
+    """
+    return max(float(part.split("_", 1)[0]) for part in version.split("-"))
+
+
+def _versions(*keys):
+    """
+    Текущие версии одним обращением к кэшу; недостающие создаются.
+    """
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def _bump(*keys):
+    def bump():
+        cache.set_many({key: _new_version() for key in keys}, None)
+
+    transaction.on_commit(bump)
+
+
+def _get(key, version, build):
+    versioned_key = f"{key}:{version}"
+    value = local_cache.get(versioned_key)
+    if value is None:
+        value = cache.get(versioned_key)
+        if value is None:
+            value = build()
+            cache.set(versioned_key, value, settings.CATALOG_CACHE_TIMEOUT)
+            metrics.record_cache(misses=1)
+        else:
+            metrics.record_cache(hits=1)
+        local_cache.set(versioned_key, value)
+    else:
+        metrics.record_cache(hits=1)
+    return value
+
+
+def _build_index():
+    stores = list(Store.objects.order_by("pk"))
+    categories = {}
+    for category in Category.objects.order_by("pk"):
+        # у разных магазинов slug категорий может совпасть, как и раньше, берётся первая
+        categories.setdefault(category.slug, (category.pk, category.store_id))
+    return {
+        "stores": stores,
+        "stores_by_pk": {store.pk: store for store in stores},
+        "stores_by_slug": {store.slug: store for store in reversed(stores)},
+        "categories_by_slug": categories,
+    }
+
+
+def _build_store(store):
+    categories = list(Category.objects.filter(store=store).order_by("pk"))
+    products = list(Product.objects.filter(store=store).order_by("pk"))
+    for product in products:
+        product.store = store
+    return {"categories": categories, "products": products}
+
+
+def _index():
+    version, = _versions(CATALOG_VERSION_KEY)
+    return _get("catalog:index", version, _build_index)
+
+
+def get_stores():
+    return _index()["stores"]
+
+
+def get_store(slug):
+    return _index()["stores_by_slug"].get(slug)
+
+
+def get_store_catalog(store):
+    """
+    Категории и продукты магазина: {"categories": [...], "products": [...]}.
+    """
+    version, = _versions(STORE_VERSION_KEY.format(pk=store.pk))
+    return _get(f"catalog:store:{store.pk}", version, lambda: _build_store(store))
+
+
+def get_category(slug):
+    """
+    Категория по slug и каталог её магазина: (category, store_catalog) или (None, None).
+    """
+    index = _index()
+    entry = index["categories_by_slug"].get(slug)
+    if entry is None:
+        return None, None
+    category_pk, store_pk = entry
+    store = index["stores_by_pk"].get(store_pk)
+    if store is None:
+        return None, None
+    catalog = get_store_catalog(store)
+    category = next((category for category in catalog["categories"] if category.pk == category_pk), None)
+    return category, catalog
+
+
+def catalog_version():
+    """
+    Версия списка магазинов: меняется при любом изменении магазинов или категорий.
+    """
+    return _versions(CATALOG_VERSION_KEY)[0]
+
+
+def store_version(store_pk):
+    """
+    Версия каталога магазина вместе с версией списка магазинов.
+    """
+    return "-".join(_versions(CATALOG_VERSION_KEY, STORE_VERSION_KEY.format(pk=store_pk)))
+
+
+def cards_versions(store_pks):
+    """
+    Версии карточек для нескольких магазинов одним обращением к кэшу: {pk магазина: версия}.
+    """
+    store_pks = sorted(set(store_pks))
+    return dict(zip(store_pks, _versions(*[CARDS_VERSION_KEY.format(pk=pk) for pk in store_pks])))
+
+
+def invalidate_catalog():
+    _bump(CATALOG_VERSION_KEY)
+
+
+def invalidate_store(*store_pks):
+    _bump(*{STORE_VERSION_KEY.format(pk=pk) for pk in store_pks if pk is not None})
+
+
+def invalidate_cards(*store_pks):
+    _bump(*{CARDS_VERSION_KEY.format(pk=pk) for pk in store_pks if pk is not None})
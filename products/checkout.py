@@ -0,0 +1,95 @@
+"""
+Оформление заказа фиксированным числом SQL-запросов, независимо от размера корзины.
+
+Ключ идемпотентности (скрытое поле формы или заголовок Idempotency-Key в API)
+сохраняется в заказе с уникальностью по пользователю: повторная отправка формы
+или повтор запроса клиентом возвращает уже оформленный заказ, а не оформляет его снова.
+"""
+from django.db import IntegrityError, models, transaction
+from django.db.models import Exists, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import events
+from .counters import NEW_ORDERS_KEY, adjust_counter
+from .models import Order, OrderProduct, Product
+
+MONEY = models.DecimalField(decimal_places=2, max_digits=19)
+
+
+def _line_totals(field, expression):
+    # агрегат по строкам заказа как подзапрос для UPDATE заказа
+    lines = OrderProduct.objects.filter(order_id=OuterRef("pk")).order_by().values("order_id")
+    return Coalesce(Subquery(lines.annotate(**{field: expression}).values(field)[:1]), 0)
+
+
+def finalize_order(order, name, phone, address, idempotency_key=None):
+    """
+    Оформляет открытый заказ (корзину в базе) двумя UPDATE: заказ получает статус,
+    контакты и итоги по текущим ценам, строки — снимок цены и названия.
+    Возвращает False, если заказ уже оформлен параллельным запросом или в нём нет строк.
+    """
+    has_lines = Exists(OrderProduct.objects.filter(order_id=OuterRef("pk")))
+    claimed = Order.objects.filter(has_lines, pk=order.pk, ordered=False).update(
+        ordered=True, name=name, phone=phone, address=address, idempotency_key=idempotency_key,
+        total=_line_totals("line_total", models.Sum(F("amount") * F("product__price"), output_field=MONEY)),
+        item_count=_line_totals("line_count", models.Count("pk")),
+    )
+    if not claimed:
+        return False
+    # update() обходит post_save, поэтому счётчик новых заказов сдвигаем сами, как claim_order
+    adjust_counter(NEW_ORDERS_KEY, claimed)
+    product = Product.objects.filter(pk=OuterRef("product_id"))
+    OrderProduct.objects.filter(order=order).update(
+        unit_price=Subquery(product.values("price")[:1]),
+        product_name=Subquery(product.values("name")[:1]),
+    )
+    order.refresh_from_db(fields=["ordered", "name", "phone", "address", "idempotency_key", "total", "item_count"])
+    return True
+
+
+def create_order(user, lines, name, phone, address, idempotency_key=None):
+    """
+    Создаёт оформленный заказ из несохранённых строк с загруженными продуктами:
+    INSERT заказа и INSERT всех его строк.
+    """
+    for line in lines:
+        line.snapshot_product()
+    order = Order.objects.create(
+        user=user, created_date=timezone.now(), ordered=True, name=name, phone=phone, address=address,
+        total=sum(line.get_total_item_price() for line in lines), item_count=len(lines),
+        idempotency_key=idempotency_key,
+    )
+    for line in lines:
+        line.order = order
+    OrderProduct.objects.bulk_create(lines)
+    return order
+
+
+def find_order(user, idempotency_key):
+    if not idempotency_key:
+        return None
+    return Order.objects.filter(user=user, idempotency_key=idempotency_key, ordered=True).first()
+
+
+def checkout(cart, name, phone, address, idempotency_key=None):
+    """
+    Оформляет корзину в заказ. Возвращает (заказ, создан ли он сейчас); (None, False),
+    если оформлять нечего.
+    """
+    existing = find_order(cart.user, idempotency_key)
+    if existing is not None:
+        return existing, False
+    try:
+        with transaction.atomic():
+            order = cart.checkout(name, phone, address, idempotency_key=idempotency_key)
+    except IntegrityError:
+        # тот же ключ только что оформил параллельный запрос
+        existing = find_order(cart.user, idempotency_key)
+        if existing is None:
+            raise
+        return existing, False
+    if order is None:
+        return find_order(cart.user, idempotency_key), False
+    events.order_placed(order)
+    return order, True
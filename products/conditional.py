@@ -0,0 +1,55 @@
+import hashlib
+
+from django.contrib.messages import get_messages
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from . import catalog
+from .counters import get_badge_counters
+
+
+class ConditionalPageMixin:
+    """
+    Отвечает 304 на If-None-Match/If-Modified-Since до выборки данных и рендеринга.
+
+    Валидатор страницы — версия каталога из кэша (get_catalog_version), которую
+    сигналы меняют при любом изменении магазина, категории или продукта, включая
+    удаление, поэтому max(updated) сканировать не нужно. Страница персональна
+    (имя пользователя и счётчики в навигационной панели), поэтому в ETag входят
+    пользователь, язык и счётчики, а Last-Modified отдаётся только анонимам.
+    Если в запросе есть непоказанные сообщения, страница рендерится всегда.
+    """
+
+    def get_catalog_version(self):
+        raise NotImplementedError
+
+    def get_validators(self):
+        version = self.get_catalog_version()
+        if version is None:
+            return None, None
+        request = self.request
+        parts = [version, str(request.user.pk), getattr(request, "LANGUAGE_CODE", "")]
+        parts += [f"{name}={value}" for name, value in sorted(get_badge_counters(request).items())]
+        etag = '"%s"' % hashlib.md5("|".join(parts).encode()).hexdigest()
+        last_modified = None if request.user.is_authenticated else int(catalog.version_timestamp(version))
+        return etag, last_modified
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD") or get_messages(request):
+            return super().dispatch(request, *args, **kwargs)
+        etag, last_modified = self.get_validators()
+        if etag is None:
+            return super().dispatch(request, *args, **kwargs)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        # без no-cache браузер мог бы сам решить, что страница свежая, и не спрашивать сервер
+        patch_cache_control(response, no_cache=True)
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True)
+        return response
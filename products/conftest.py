@@ -0,0 +1,35 @@
+import pytest
+from django.core.cache import cache
+
+from inel_delivery.users.models import User
+from inel_delivery.users.tests.factories import UserFactory
+from products.catalog import local_cache
+
+
+@pytest.fixture(autouse=True)
+def media_storage(settings, tmpdir):
+    settings.MEDIA_ROOT = tmpdir.strpath
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    local_cache.clear()
+    yield
+    cache.clear()
+    local_cache.clear()
+
+
+@pytest.fixture
+def user() -> User:
+    return UserFactory()
+
+
+@pytest.fixture
+def database_cart(settings):
+    settings.CART_BACKEND = "products.cart.DatabaseCart"
+
+
+@pytest.fixture
+def cache_cart(settings):
+    settings.CART_BACKEND = "products.cart.CacheCart"
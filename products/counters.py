@@ -0,0 +1,128 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Func, IntegerField, Subquery
+
+from .models import Order, OrderProduct, ApplicationForm
+from .roles import get_role_profile
+
+EMPTY_COUNTERS = {
+    "cart": 0,
+    "my_orders": 0,
+    "ordered": 0,
+    "orders_taken": 0,
+    "delivery_apps": 0,
+}
+
+# Глобальные счётчики одинаковы для всех курьеров и админов, поэтому хранятся в кэше
+# и поддерживаются сигналами, а не пересчитываются COUNT(*) на каждой странице.
+NEW_ORDERS_KEY = "badge-counters:new-orders"
+PENDING_APPS_KEY = "badge-counters:pending-apps"
+COUNTER_TIMEOUT = 60 * 60 * 24
+
+
+def new_orders_queryset():
+    return Order.objects.filter(ordered=True, deliveryman=None)
+
+
+def pending_apps_queryset():
+    return ApplicationForm.objects.filter(status="В ожидании")
+
+
+GLOBAL_COUNTERS = {
+    NEW_ORDERS_KEY: new_orders_queryset,
+    PENDING_APPS_KEY: pending_apps_queryset,
+}
+
+
+def get_global_counter(key):
+    """
+    Берёт глобальный счётчик из кэша, при промахе считает его по базе.
+    """
+    value = cache.get(key)
+    if value is None:
+        value = GLOBAL_COUNTERS[key]().count()
+        # add, а не set: не затираем значение, которое успел выставить параллельный запрос
+        cache.add(key, value, COUNTER_TIMEOUT)
+    return value
+
+
+def _incr(key, delta):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # ключа нет в кэше — его пересчитает следующее чтение
+        pass
+
+
+def adjust_counter(key, delta):
+    """
+    Меняет глобальный счётчик на delta после фиксации текущей транзакции.
+    """
+    if delta:
+        transaction.on_commit(lambda: _incr(key, delta))
+
+
+def reconcile_counters():
+    """
+    Пересчитывает глобальные счётчики по базе и возвращает {ключ: (было, стало)}.
+    """
+    result = {}
+    for key, queryset in GLOBAL_COUNTERS.items():
+        actual = queryset().count()
+        result[key] = (cache.get(key), actual)
+        cache.set(key, actual, COUNTER_TIMEOUT)
+    return result
+
+
+def _count(queryset):
+    """
+    Оборачивает queryset в скалярный подзапрос SELECT COUNT(*).
+    """
+    return Subquery(
+        queryset.order_by().values(count=Func(F("pk"), function="COUNT")),
+        output_field=IntegerField(),
+    )
+
+
+def compute_badge_counters(user):
+    """
+    Считает персональные счётчики навигационной панели одним запросом,
+    глобальные берёт из кэша.
+    """
+    if not user.is_authenticated:
+        return dict(EMPTY_COUNTERS)
+    roles = get_role_profile(user)
+    columns = dict(my_orders=_count(Order.objects.filter(user=user, ordered=True)))
+    if roles.is_courier:
+        columns["ordered_own"] = _count(new_orders_queryset().filter(user=user))
+        columns["orders_taken"] = _count(Order.objects.filter(deliveryman_id=roles.deliveryman_id))
+    # cart импортирует checkout, а тот — этот модуль
+    from .cart import get_cart_class
+
+    cart = get_cart_class()(user)
+    if cart.in_database:
+        columns["cart"] = _count(OrderProduct.objects.filter(order__user=user, order__ordered=False))
+    row = get_user_model().objects.filter(pk=user.pk).values(**columns).first()
+    if row is None:
+        return dict(EMPTY_COUNTERS)
+    ordered = get_global_counter(NEW_ORDERS_KEY)
+    # курьер не видит в счётчике новых заказов свои собственные
+    if roles.is_courier:
+        ordered -= row["ordered_own"]
+    return {
+        "cart": row["cart"] if cart.in_database else cart.item_count,
+        "my_orders": row["my_orders"],
+        "ordered": max(ordered, 0),
+        "orders_taken": row.get("orders_taken", 0),
+        "delivery_apps": get_global_counter(PENDING_APPS_KEY),
+    }
+
+
+def get_badge_counters(request):
+    """
+    Возвращает счётчики для текущего запроса, вычисляя их не более одного раза.
+    """
+    if not hasattr(request, "_badge_counters"):
+        request._badge_counters = compute_badge_counters(request.user)
+    return request._badge_counters
@@ -0,0 +1,174 @@
+import heapq
+from collections import OrderedDict, namedtuple
+from itertools import cycle
+
+from django.conf import settings
+from django.db.models import Count, OuterRef, Q, Subquery
+
+from .models import Deliveryman, Order, OrderProduct
+from .orders import claim_order
+
+PendingOrder = namedtuple("PendingOrder", ["pk", "user_id", "created_date", "store_id"])
+
+
+class Courier:
+    """
+    Курьер в пуле диспетчера: load — число его невыполненных заказов.
+    """
+
+    def __init__(self, pk, user_id, load, capacity):
+        self.pk = pk
+        self.user_id = user_id
+        self.load = load
+        self.capacity = capacity
+
+    @property
+    def free_slots(self):
+        return max(self.capacity - self.load, 0)
+
+    def can_take(self, order):
+        return self.free_slots > 0 and order.user_id != self.user_id
+
+    def __repr__(self):
+        return f"Courier(pk={self.pk}, load={self.load}/{self.capacity})"
+
+
+class FifoPolicy:
+    """
+    Самые старые заказы раздаются курьерам по кругу.
+    """
+
+    def assign(self, orders, couriers):
+        assignments = []
+        available = [courier for courier in couriers if courier.free_slots]
+        if not available:
+            return assignments
+        ring = cycle(available)
+        for order in orders:
+            for _ in range(len(available)):
+                courier = next(ring)
+                if courier.can_take(order):
+                    courier.load += 1
+                    assignments.append((order, courier))
+                    break
+        return assignments
+
+
+class LeastLoadedPolicy:
+    """
+    Каждый следующий по возрасту заказ получает наименее загруженный курьер.
+    """
+
+    def assign(self, orders, couriers):
+        assignments = []
+        heap = [(courier.load, courier.pk, courier) for courier in couriers if courier.free_slots]
+        heapq.heapify(heap)
+        for order in orders:
+            skipped = []
+            while heap:
+                load, pk, courier = heapq.heappop(heap)
+                if courier.can_take(order):
+                    courier.load += 1
+                    assignments.append((order, courier))
+                    if courier.free_slots:
+                        heapq.heappush(heap, (courier.load, pk, courier))
+                    break
+                skipped.append((load, pk, courier))
+            for item in skipped:
+                heapq.heappush(heap, item)
+            if not heap:
+                break
+        return assignments
+
+
+class StoreGroupedPolicy:
+    """
+    Заказы из одного магазина отдаются одному курьеру пачкой, чтобы он забрал их за один заход.
+    Магазины обслуживаются в порядке самого старого заказа, пачку берёт наименее загруженный курьер.
+    """
+
+    def assign(self, orders, couriers):
+        groups = OrderedDict()
+        for order in orders:
+            groups.setdefault(order.store_id, []).append(order)
+        assignments = []
+        available = [courier for courier in couriers if courier.free_slots]
+        for group in groups.values():
+            available.sort(key=lambda courier: (courier.load, courier.pk))
+            for courier in available:
+                taken = [order for order in group if order.user_id != courier.user_id][:courier.free_slots]
+                for order in taken:
+                    courier.load += 1
+                    assignments.append((order, courier))
+                if taken:
+                    taken_pks = {order.pk for order in taken}
+                    group = [order for order in group if order.pk not in taken_pks]
+                if not group:
+                    break
+            available = [courier for courier in available if courier.free_slots]
+            if not available:
+                break
+        return assignments
+
+
+POLICIES = {
+    "fifo": FifoPolicy,
+    "least-loaded": LeastLoadedPolicy,
+    "store-grouped": StoreGroupedPolicy,
+}
+
+
+def get_policy(name):
+    try:
+        return POLICIES[name]()
+    except KeyError:
+        raise ValueError(f"Неизвестная политика распределения: {name}. Доступны: {', '.join(POLICIES)}")
+
+
+class Dispatcher:
+    """
+    Держит в памяти очередь не назначенных заказов и пул курьеров, пачками
+    распределяет заказы по выбранной политике и закрепляет их через claim_order.
+    Состояние перечитывается двумя запросами за такт, независимо от размера очереди.
+    """
+
+    def __init__(self, policy=None, batch_size=None, capacity=None):
+        self.policy = policy or get_policy(settings.DISPATCH_POLICY)
+        self.batch_size = batch_size or settings.DISPATCH_BATCH_SIZE
+        self.capacity = capacity or settings.DISPATCH_MAX_ACTIVE_ORDERS
+        self.queue = []
+        self.couriers = []
+
+    def refresh(self):
+        first_line_store = OrderProduct.objects.filter(order=OuterRef("pk")).order_by("pk").values("product__store")
+        self.queue = [
+            PendingOrder(*row)
+            for row in Order.objects.filter(ordered=True, deliveryman__isnull=True)
+            .annotate(store_id=Subquery(first_line_store[:1]))
+            .order_by("created_date", "id")
+            .values_list("pk", "user_id", "created_date", "store_id")[:self.batch_size]
+        ]
+        self.couriers = [
+            Courier(pk, user_id, load, self.capacity)
+            for pk, user_id, load in Deliveryman.objects.annotate(
+                load=Count("order", filter=~Q(order__status="Выполнен"))
+            ).values_list("pk", "user_id", "load")
+        ]
+
+    def plan(self):
+        return self.policy.assign(self.queue, self.couriers)
+
+    def run_once(self):
+        """
+        Один такт: перечитать состояние, распределить пачку и закрепить заказы.
+        Возвращает список (pk заказа, pk курьера) успешно закреплённых заказов.
+        """
+        self.refresh()
+        assigned = []
+        for order, courier in self.plan():
+            # заказ мог успеть взять курьер со страницы — claim_order это учтёт
+            if claim_order(order.pk, Deliveryman(pk=courier.pk, user_id=courier.user_id)):
+                assigned.append((order.pk, courier.pk))
+            else:
+                courier.load -= 1
+        return assigned
@@ -0,0 +1,291 @@
+"""
+События доски заказов для курьеров вместо обновления страницы /ordered/: заказ
+оформлен, заказ взят, заказ освобождён.
+
+Представления публикуют событие после коммита в шину (EVENTS_BUS): LocalBus раздаёт
+его подписчикам своего процесса, RedisBus — через PUBLISH всем процессам. Курьеры
+слушают поток Server-Sent Events, который отдаёт order_board_stream в config/asgi.py.
+Соединение курьера — это одна asyncio.Queue и пульс раз в EVENTS_HEARTBEAT секунд:
+ни потока, ни соединения с базой на ожидающего курьера. Права проверяются один раз,
+при подключении.
+"""
+import asyncio
+import io
+import json
+import logging
+import threading
+import time
+from collections import namedtuple
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.http import HttpResponse
+from django.utils import formats, timezone
+from django.utils.module_loading import import_string
+
+from .roles import get_role_profile, prime_permissions
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "orders:board"
+
+ORDER_PLACED = "order_placed"
+ORDER_CLAIMED = "order_claimed"
+ORDER_RELEASED = "order_released"
+# подписчик пропустил события (переполнил очередь, шина теряла соединение) — доску нужно перезагрузить
+RESYNC = "resync"
+
+# Событие, готовое к отправке: owner — pk заказчика (курьер не видит свои заказы), chunk — байты SSE
+Event = namedtuple("Event", ["owner", "chunk"])
+
+
+def encode(event, data, owner=None):
+    return json.dumps({"event": event, "data": data, "owner": owner}, cls=DjangoJSONEncoder)
+
+
+def decode(message):
+    """
+    Сообщение шины в Event. Разбирается один раз на процесс, а не на каждого подписчика.
+    """
+    message = json.loads(message)
+    chunk = f"event: {message['event']}\ndata: {json.dumps(message['data'], ensure_ascii=False)}\n\n".encode()
+    return Event(message["owner"], chunk)
+
+
+def publish(event, data, owner=None):
+    """
+    Публикует событие после фиксации транзакции: откаченный заказ не должен мелькнуть на доске.
+    Недоступная шина не ломает запрос — курьеры увидят заказ при следующем открытии доски.
+    """
+    message = encode(event, data, owner)
+
+    def send():
+        try:
+            get_bus().publish(message)
+        except Exception:
+            logger.exception("Не удалось опубликовать событие %s", event)
+
+    transaction.on_commit(send)
+
+
+# created_date в UTC с микросекундами, как data-created карточек: строки сравниваются в порядке времени
+SORT_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+def _card(order):
+    # поля карточки заказа на доске (products/includes/ordered_card.html); место карточки
+    # определяет ключ (created_date, id), как у постраничного вывода доски
+    return {
+        "id": order.pk,
+        "name": order.name,
+        "created_date": order.created_date.astimezone(timezone.utc).strftime(SORT_DATE_FORMAT),
+        "created_date_display": formats.localize(timezone.template_localtime(order.created_date)),
+        "status": order.status,
+    }
+
+
+def order_placed(order):
+    publish(ORDER_PLACED, _card(order), owner=order.user_id)
+
+
+def order_claimed(pk):
+    publish(ORDER_CLAIMED, {"id": pk})
+
+
+def order_released(order):
+    publish(ORDER_RELEASED, _card(order), owner=order.user_id)
+
+
+def _put(queue, event):
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        # клиент не успевает читать: вместо накопленного хвоста — команда перезагрузить доску
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(decode(encode(RESYNC, {})))
+
+
+class BaseBus:
+    """
+    Шина событий. Подписчики — очереди SSE-соединений этого процесса, каждая в своём
+    цикле событий; deliver можно вызывать из любого потока.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, message):
+        raise NotImplementedError
+
+    def subscribe(self):
+        """
+        Вызывается из цикла событий соединения и возвращает его очередь.
+        """
+        queue = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def deliver(self, message):
+        if not self._subscribers:
+            return
+        event = decode(message)
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(_put, queue, event)
+            except RuntimeError:
+                # цикл событий соединения уже закрыт
+                self.unsubscribe(queue)
+
+
+class LocalBus(BaseBus):
+    """
+    Шина в памяти процесса. Для тестов, runserver и одного процесса ASGI-сервера:
+    другие процессы события не увидят.
+    """
+
+    def publish(self, message):
+        self.deliver(message)
+
+
+class RedisBus(BaseBus):
+    """
+    Шина через Redis pub/sub. Публикация — один PUBLISH; на процесс одна подписка
+    в фоновом потоке, который раздаёт сообщения очередям своих соединений.
+    """
+    reconnect_delay = 1
+
+    def __init__(self):
+        super().__init__()
+        import redis
+
+        self.client = redis.Redis.from_url(settings.EVENTS_REDIS_URL)
+        self._listener = None
+
+    def publish(self, message):
+        self.client.publish(CHANNEL, message)
+
+    def subscribe(self):
+        queue = super().subscribe()
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name="order-events", daemon=True)
+                self._listener.start()
+        return queue
+
+    def _listen(self):
+        import redis
+
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CHANNEL)
+                for item in pubsub.listen():
+                    self.deliver(item["data"])
+            except redis.RedisError:
+                logger.warning("Потеряна подписка на события доски заказов, переподключение", exc_info=True)
+                # события за время обрыва потеряны
+                self.deliver(encode(RESYNC, {}))
+                time.sleep(self.reconnect_delay)
+
+
+_buses = {}
+
+
+def get_bus():
+    path = settings.EVENTS_BUS
+    if path not in _buses:
+        _buses[path] = import_string(path)()
+    return _buses[path]
+
+
+def authorize(scope):
+    """
+    Профиль ролей пользователя из сессии соединения или None, если доска ему недоступна.
+    Соединения с базой закрываются, как в конце обычного запроса.
+    """
+    close_old_connections()
+    try:
+        request = ASGIRequest(scope, io.BytesIO())
+        engine = import_module(settings.SESSION_ENGINE)
+        request.session = engine.SessionStore(request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+        user = prime_permissions(get_user(request))
+        if not user.has_perm("products.view_orders_page"):
+            return None
+        return get_role_profile(user)
+    finally:
+        close_old_connections()
+
+
+async def _send_events(queue, roles, send):
+    while True:
+        try:
+            event = await asyncio.wait_for(queue.get(), settings.EVENTS_HEARTBEAT)
+        except asyncio.TimeoutError:
+            # комментарий SSE: держит соединение открытым через прокси
+            chunk = b": ping\n\n"
+        else:
+            # курьер не видит на доске свои собственные заказы
+            if roles.is_courier and event.owner == roles.user_id:
+                continue
+            chunk = event.chunk
+        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+
+async def _wait_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+@transaction.non_atomic_requests
+def order_events(request):
+    """
+    Тот же адрес под WSGI и runserver: поток отдаёт только config/asgi.py, а ответ 204
+    говорит EventSource не переподключаться — доска остаётся обычной страницей.
+    """
+    return HttpResponse(status=204)
+
+
+async def order_board_stream(scope, receive, send):
+    """
+    ASGI-приложение потока событий доски заказов.
+    """
+    roles = await sync_to_async(authorize)(scope)
+    if roles is None:
+        await send({"type": "http.response.start", "status": 403,
+                    "headers": [(b"content-type", b"text/plain; charset=utf-8")]})
+        await send({"type": "http.response.body", "body": "Доска заказов недоступна.".encode()})
+        return
+    bus = get_bus()
+    queue = bus.subscribe()
+    tasks = []
+    try:
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"text/event-stream; charset=utf-8"),
+            (b"cache-control", b"no-cache"),
+            # nginx не должен копить поток в буфере
+            (b"x-accel-buffering", b"no"),
+        ]})
+        await send({"type": "http.response.body", "body": b"retry: 3000\n\n", "more_body": True})
+        tasks = [asyncio.ensure_future(_send_events(queue, roles, send)),
+                 asyncio.ensure_future(_wait_disconnect(receive))]
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    finally:
+        bus.unsubscribe(queue)
+        for task in tasks:
+            task.cancel()
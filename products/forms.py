@@ -7,6 +7,8 @@ class OrderForm(forms.Form):
     address = forms.CharField(widget=forms.Textarea(attrs={
         'rows': 8
     }), required=True)
+    # выдаётся вместе с формой, повторная отправка той же формы не оформит второй заказ
+    idempotency_key = forms.CharField(max_length=64, required=False, widget=forms.HiddenInput)
 
     # def is_valid(values):
     #     valid = True
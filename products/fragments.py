@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import catalog, metrics
+
+PRODUCT_CARD_TEMPLATE = "products/includes/product_card.html"
+STORE_CARD_TEMPLATE = "products/includes/store_card.html"
+# Увеличивается при изменении шаблонов карточек, чтобы старый HTML не достался из кэша
+CARDS_TEMPLATE_VERSION = 2
+
+
+def product_card_key(product, cards_version, show_store):
+    # updated меняется при любом save() продукта, версия карточек — при изменении его магазина
+    return (f"fragment:product_card:v{CARDS_TEMPLATE_VERSION}:{int(show_store)}:{product.pk}:"
+            f"{product.updated.timestamp():.6f}:{cards_version}")
+
+
+def store_card_key(store, cards_version):
+    return f"fragment:store_card:v{CARDS_TEMPLATE_VERSION}:{store.pk}:{cards_version}"
+
+
+def _render_cached(objects, key_func, template_name, context_name, extra_context):
+    """
+    Рендерит карточки, беря готовые из кэша одним get_many и сохраняя недостающие одним set_many.
+    """
+    objects = list(objects)
+    if not objects:
+        return ""
+    keys = [key_func(obj) for obj in objects]
+    cached = cache.get_many(keys)
+    missing = {}
+    cards = []
+    for key, obj in zip(keys, objects):
+        card = cached.get(key)
+        if card is None:
+            card = missing[key] = render_to_string(template_name, {context_name: obj, **extra_context})
+        cards.append(card)
+    metrics.record_cache(hits=len(objects) - len(missing), misses=len(missing))
+    if missing:
+        cache.set_many(missing, settings.FRAGMENT_CACHE_TIMEOUT)
+    return mark_safe("".join(cards))
+
+
+def render_product_cards(products, show_store=False):
+    """
+    HTML карточек продуктов. Карточка не зависит от пользователя: в ней нет ни
+    счётчиков, ни CSRF-токена, поэтому одна запись в кэше годится для всех.
+    """
+    products = list(products)
+    versions = catalog.cards_versions(product.store_id for product in products)
+    return _render_cached(
+        products, lambda product: product_card_key(product, versions[product.store_id], show_store),
+        PRODUCT_CARD_TEMPLATE, "product", {"show_store": show_store},
+    )
+
+
+def render_store_cards(stores):
+    stores = list(stores)
+    versions = catalog.cards_versions(store.pk for store in stores)
+    return _render_cached(stores, lambda store: store_card_key(store, versions[store.pk]),
+                          STORE_CARD_TEMPLATE, "store", {})
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from products.totals import backfill_totals
+
+
+class Command(BaseCommand):
+    help = "Заполняет сохранённые итоги заказов (total, item_count) по их строкам."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        fixed = backfill_totals(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Исправлено заказов: {fixed}"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.totals import inconsistent_orders
+
+
+class Command(BaseCommand):
+    help = "Проверяет, что сохранённые итоги заказов совпадают с посчитанными по строкам."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=50, help="Сколько расхождений вывести.")
+
+    def handle(self, *args, **options):
+        broken = inconsistent_orders().order_by("pk")
+        count = broken.count()
+        if not count:
+            self.stdout.write(self.style.SUCCESS("Итоги всех заказов согласованы."))
+            return
+        for order in broken[:options["limit"]]:
+            self.stdout.write(
+                f"Заказ №{order.pk}: total {order.total} != {order.computed_total}, "
+                f"item_count {order.item_count} != {order.computed_item_count}"
+            )
+        raise CommandError(f"Расхождений: {count}. Запустите backfill_order_totals.")
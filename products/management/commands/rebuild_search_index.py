@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from products.search import get_backend
+
+
+class Command(BaseCommand):
+    help = (
+        "Создаёт поисковый индекс продуктов, если его нет, и заполняет его заново. "
+        "Нужен после массовых изменений продуктов в обход save() (bulk_create, update)."
+    )
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        backend.install(connection)
+        backend.rebuild(connection)
+        self.stdout.write(f"Поисковый индекс перестроен ({connection.vendor}).")
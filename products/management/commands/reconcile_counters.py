@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from products.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает по базе кэшированные счётчики новых заказов и заявок. "
+        "Запускается периодически (cron), чтобы исправить возможный дрейф."
+    )
+
+    def handle(self, *args, **options):
+        for key, (cached, actual) in reconcile_counters().items():
+            if cached == actual:
+                self.stdout.write(f"{key}: {actual}")
+            else:
+                self.stdout.write(self.style.WARNING(f"{key}: {cached} -> {actual}"))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from products.dispatch import POLICIES, Dispatcher, get_policy
+
+
+class Command(BaseCommand):
+    help = "Воркер, который пачками распределяет новые заказы между курьерами."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--policy", choices=sorted(POLICIES), help="Политика распределения.")
+        parser.add_argument("--batch-size", type=int, help="Сколько заказов распределять за такт.")
+        parser.add_argument("--capacity", type=int, help="Максимум активных заказов на курьера.")
+        parser.add_argument("--interval", type=float, default=2.0, help="Пауза между тактами, секунды.")
+        parser.add_argument("--once", action="store_true", help="Выполнить один такт и выйти.")
+
+    def handle(self, *args, **options):
+        try:
+            policy = get_policy(options["policy"]) if options["policy"] else None
+        except ValueError as error:
+            raise CommandError(error)
+        dispatcher = Dispatcher(policy=policy, batch_size=options["batch_size"], capacity=options["capacity"])
+        while True:
+            close_old_connections()
+            started = time.perf_counter()
+            assigned = dispatcher.run_once()
+            if assigned or options["once"]:
+                elapsed = (time.perf_counter() - started) * 1000
+                self.stdout.write(f"Назначено заказов: {len(assigned)} за {elapsed:.1f} мс")
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
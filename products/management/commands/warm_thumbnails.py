@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from products.thumbnails import warm_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерирует миниатюры магазинов и продуктов в пуле процессов. Миниатюры, которые уже "
+        "есть в хранилище, пропускаются, если не указан --force."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=None, help="Число процессов, по умолчанию — по числу ядер.")
+        parser.add_argument("--chunk-size", type=int, default=100)
+        parser.add_argument("--force", action="store_true", help="Перегенерировать и существующие миниатюры.")
+
+    def handle(self, *args, **options):
+        stats = warm_all(workers=options["workers"], chunk_size=options["chunk_size"], force=options["force"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Сгенерировано: {stats['generated']}, пропущено: {stats['skipped']}, ошибок: {stats['failed']}"
+        ))
@@ -0,0 +1,263 @@
+"""
+Метрики запросов по имени URL: время ответа, число и время SQL-запросов, время
+рендеринга шаблонов, попадания и промахи кэшей каталога и карточек.
+
+MetricsMiddleware считает их для каждого запроса и пишет предупреждение в лог,
+если представление вышло за бюджет запросов к базе. Процесс копит суммы в памяти
+и раз в METRICS_FLUSH_INTERVAL секунд прибавляет их к счётчикам в общем кэше
+(Redis в продакшене), поэтому /metrics/ отдаёт в формате Prometheus данные всех
+процессов сразу.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db import connections
+from django.http import HttpResponse
+from django.template.backends.django import DjangoTemplates as BaseDjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+# Верхние границы корзин гистограммы времени ответа, секунды
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+COUNTERS = ("requests", "latency_us", "queries", "db_us", "template_us", "cache_hits", "cache_misses", "over_budget")
+VIEWS_KEY = "metrics:views"
+
+_current = ContextVar("request_stats", default=None)
+
+
+class RequestStats:
+    """
+    Замеры одного запроса.
+    """
+    __slots__ = ("queries", "db_time", "template_time", "template_depth", "cache_hits", "cache_misses")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def execute(self, execute, sql, params, many, context):
+        # обёртка connection.execute_wrapper
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+def record_cache(hits=0, misses=0):
+    """
+    Учитывает обращения к кэшу в метриках текущего запроса, если он измеряется.
+    """
+    stats = _current.get()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+class _TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return self.template.render(context, request)
+        # карточки рендерятся внутри страницы, поэтому считаем только внешний рендеринг
+        stats.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            stats.template_depth -= 1
+            if not stats.template_depth:
+                stats.template_time += time.perf_counter() - start
+
+
+class DjangoTemplates(BaseDjangoTemplates):
+    """
+    Обычный шаблонизатор Django, который замеряет время рендеринга для метрик запроса.
+    """
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
+
+
+def _bucket(latency):
+    return next((i for i, le in enumerate(LATENCY_BUCKETS) if latency <= le), len(LATENCY_BUCKETS))
+
+
+class Registry:
+    """
+    Суммы метрик процесса по именам URL до ближайшей выгрузки в общий кэш.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._last_flush = time.monotonic()
+
+    def observe(self, view, stats, latency, over_budget):
+        values = {
+            "requests": 1,
+            "latency_us": int(latency * 1e6),
+            "queries": stats.queries,
+            "db_us": int(stats.db_time * 1e6),
+            "template_us": int(stats.template_time * 1e6),
+            "cache_hits": stats.cache_hits,
+            "cache_misses": stats.cache_misses,
+            "over_budget": int(over_budget),
+            f"bucket_{_bucket(latency)}": 1,
+        }
+        with self._lock:
+            pending = self._pending.setdefault(view, {})
+            for name, value in values.items():
+                pending[name] = pending.get(name, 0) + value
+            due = time.monotonic() - self._last_flush >= settings.METRICS_FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        views = set(cache.get(VIEWS_KEY, []))
+        if not set(pending) <= views:
+            # чтение-изменение-запись: имя, потерянное в гонке, вернёт следующая выгрузка
+            cache.set(VIEWS_KEY, sorted(views | set(pending)), None)
+        for view, values in pending.items():
+            for name, value in values.items():
+                if value:
+                    _incr(f"metrics:{view}:{name}", value)
+
+
+def _incr(key, delta):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, None):
+            cache.incr(key, delta)
+
+
+registry = Registry()
+
+
+def get_query_budget(view):
+    return settings.METRICS_QUERY_BUDGETS.get(view, settings.METRICS_DEFAULT_QUERY_BUDGET)
+
+
+class MetricsMiddleware:
+    """
+    Должен стоять первым в MIDDLEWARE, чтобы замер включал остальные middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats.execute))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        latency = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = match.view_name if match is not None else "<unresolved>"
+        budget = get_query_budget(view)
+        over_budget = stats.queries > budget
+        registry.observe(view, stats, latency, over_budget)
+        record = {
+            "view": view, "method": request.method, "status": response.status_code,
+            "latency_ms": round(latency * 1000, 1), "queries": stats.queries,
+            "db_ms": round(stats.db_time * 1000, 1), "template_ms": round(stats.template_time * 1000, 1),
+            "cache_hits": stats.cache_hits, "cache_misses": stats.cache_misses,
+        }
+        if over_budget:
+            logger.warning("Превышен бюджет запросов к базе (%s): %s", budget, json.dumps(record, ensure_ascii=False))
+        elif settings.METRICS_LOG_REQUESTS:
+            logger.info(json.dumps(record, ensure_ascii=False))
+        return response
+
+
+def render_prometheus():
+    """
+    Счётчики из общего кэша в текстовом формате Prometheus.
+    """
+    views = cache.get(VIEWS_KEY, [])
+    values = cache.get_many([f"metrics:{view}:{name}" for view in views
+                             for name in COUNTERS + tuple(f"bucket_{i}" for i in range(len(LATENCY_BUCKETS) + 1))])
+
+    def get(view, name):
+        return values.get(f"metrics:{view}:{name}", 0)
+
+    lines = []
+
+    def family(name, kind, help_text, samples, suffix=""):
+        lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"])
+        lines.extend(f"{name}{suffix}{labels} {value}" for labels, value in samples)
+
+    def label(view, **extra):
+        pairs = {"view": view, **extra}
+        return "{" + ",".join(f'{key}="{value}"' for key, value in pairs.items()) + "}"
+
+    family("delivery_requests_total", "counter", "Запросы по имени URL.",
+           [(label(view), get(view, "requests")) for view in views])
+    histogram = []
+    for view in views:
+        cumulative = 0
+        for i, le in enumerate(LATENCY_BUCKETS + ("+Inf",)):
+            cumulative += get(view, f"bucket_{i}")
+            histogram.append((label(view, le=le), cumulative))
+    family("delivery_request_duration_seconds", "histogram", "Время ответа.", histogram, suffix="_bucket")
+    lines.extend(f"delivery_request_duration_seconds_sum{label(view)} {get(view, 'latency_us') / 1e6}"
+                 for view in views)
+    lines.extend(f"delivery_request_duration_seconds_count{label(view)} {get(view, 'requests')}" for view in views)
+    family("delivery_db_queries_total", "counter", "SQL-запросы.",
+           [(label(view), get(view, "queries")) for view in views])
+    family("delivery_db_seconds_total", "counter", "Время SQL-запросов.",
+           [(label(view), get(view, "db_us") / 1e6) for view in views])
+    family("delivery_template_seconds_total", "counter", "Время рендеринга шаблонов.",
+           [(label(view), get(view, "template_us") / 1e6) for view in views])
+    family("delivery_cache_hits_total", "counter", "Попадания в кэш каталога и карточек.",
+           [(label(view), get(view, "cache_hits")) for view in views])
+    family("delivery_cache_misses_total", "counter", "Промахи кэша каталога и карточек.",
+           [(label(view), get(view, "cache_misses")) for view in views])
+    family("delivery_query_budget_exceeded_total", "counter", "Запросы сверх бюджета SQL-запросов.",
+           [(label(view), get(view, "over_budget")) for view in views])
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    """
+    Метрики для Prometheus. Доступны персоналу и по заголовку Authorization: Bearer <METRICS_TOKEN>.
+    """
+    token = settings.METRICS_TOKEN
+    if not request.user.is_staff and not (token and request.headers.get("Authorization") == f"Bearer {token}"):
+        raise PermissionDenied
+    registry.flush()
+    return HttpResponse(render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
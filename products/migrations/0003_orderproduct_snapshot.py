@@ -0,0 +1,36 @@
+# Generated by Django 3.0.11 on 2026-10-18 17:55
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def snapshot_ordered_lines(apps, schema_editor):
+    # для уже оформленных строк лучшая доступная оценка — текущие цена и название продукта
+    OrderProduct = apps.get_model('products', 'OrderProduct')
+    Product = apps.get_model('products', 'Product')
+    product = Product.objects.filter(pk=OuterRef('product_id'))
+    OrderProduct.objects.filter(ordered=True, unit_price__isnull=True).update(
+        unit_price=Subquery(product.values('price')[:1]),
+        product_name=Subquery(product.values('name')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_order_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderproduct',
+            name='product_name',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Название на момент заказа'),
+        ),
+        migrations.AddField(
+            model_name='orderproduct',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=19, null=True, verbose_name='Цена на момент заказа'),
+        ),
+        migrations.RunPython(snapshot_ordered_lines, migrations.RunPython.noop),
+    ]
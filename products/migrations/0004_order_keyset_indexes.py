@@ -0,0 +1,25 @@
+# Generated by Django 3.0.11 on 2026-10-18 17:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_orderproduct_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['ordered', 'deliveryman', 'created_date', 'id'], name='order_board_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['deliveryman', 'created_date', 'id'], name='order_courier_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'ordered', 'created_date', 'id'], name='order_customer_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.0.11 on 2026-10-18 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_order_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='applicationform',
+            index=models.Index(fields=['status'], name='app_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(ordered=False), fields=['user'], name='order_open_cart_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('deliveryman__isnull', True), ('ordered', True)), fields=['created_date', 'id'], name='order_unassigned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderproduct',
+            index=models.Index(condition=models.Q(ordered=False), fields=['user', 'product'], name='orderproduct_open_line_idx'),
+        ),
+    ]
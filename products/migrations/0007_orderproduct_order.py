@@ -0,0 +1,50 @@
+# Generated by Django 3.0.11 on 2026-10-18 19:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Min, OuterRef, Subquery, Sum
+
+
+def lines_to_foreign_key(apps, schema_editor):
+    OrderProduct = apps.get_model('products', 'OrderProduct')
+    Through = apps.get_model('products', 'Order').products.through
+    order = Through.objects.filter(orderproduct_id=OuterRef('pk')).order_by('order_id').values('order_id')[:1]
+    OrderProduct.objects.update(order_id=Subquery(order))
+    # строки вне заказов недостижимы ни из корзины, ни из истории заказов
+    OrderProduct.objects.filter(order__isnull=True).delete()
+    # один продукт в заказе должен стать одной строкой: сливаем повторы в первую
+    duplicates = (OrderProduct.objects.values('order_id', 'product_id').annotate(lines=Count('pk'))
+                  .filter(lines__gt=1).annotate(first=Min('pk'), amount=Sum('amount')))
+    for duplicate in duplicates:
+        OrderProduct.objects.filter(pk=duplicate['first']).update(amount=duplicate['amount'])
+        OrderProduct.objects.filter(order_id=duplicate['order_id'], product_id=duplicate['product_id']).exclude(
+            pk=duplicate['first']).delete()
+
+
+def lines_to_many_to_many(apps, schema_editor):
+    OrderProduct = apps.get_model('products', 'OrderProduct')
+    Through = apps.get_model('products', 'Order').products.through
+    Through.objects.bulk_create([
+        Through(order_id=order_id, orderproduct_id=pk)
+        for pk, order_id in OrderProduct.objects.filter(order__isnull=False).values_list('pk', 'order_id')
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_order_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='orderproduct',
+            name='orderproduct_open_line_idx',
+        ),
+        migrations.AddField(
+            model_name='orderproduct',
+            name='order',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='products.Order', verbose_name='Заказ'),
+        ),
+        migrations.RunPython(lines_to_foreign_key, lines_to_many_to_many),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.0.11 on 2026-10-18 19:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    # схема меняется отдельно от переноса данных: PostgreSQL не даёт изменить таблицу
+    # в транзакции, где остались отложенные проверки внешних ключей
+    dependencies = [
+        ('products', '0007_orderproduct_order'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='order',
+            name='products',
+        ),
+        migrations.AlterField(
+            model_name='orderproduct',
+            name='order',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='products.Order', verbose_name='Заказ'),
+        ),
+        migrations.AddConstraint(
+            model_name='orderproduct',
+            constraint=models.UniqueConstraint(fields=('order', 'product'), name='orderproduct_order_product_uniq'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.0.11 on 2026-10-19 10:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    # отдельный шаг, чтобы при откате 0010 NOT NULL возвращался уже после заполнения
+    # колонки, в другой транзакции (отложенные проверки внешних ключей в PostgreSQL)
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('products', '0008_remove_order_products'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='orderproduct',
+            name='user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+    ]
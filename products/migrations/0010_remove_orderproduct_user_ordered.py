@@ -0,0 +1,33 @@
+# Generated by Django 3.0.11 on 2026-10-19 10:14
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def lines_from_orders(apps, schema_editor):
+    # при откате пользователь и отметка оформления строк снова копируются из заказа
+    Order = apps.get_model('products', 'Order')
+    OrderProduct = apps.get_model('products', 'OrderProduct')
+    order = Order.objects.filter(pk=OuterRef('order_id'))
+    OrderProduct.objects.update(user_id=Subquery(order.values('user_id')[:1]),
+                                ordered=Subquery(order.values('ordered')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    # строка заказа берёт пользователя и статус из order.user и order.ordered
+    dependencies = [
+        ('products', '0009_orderproduct_user_nullable'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, lines_from_orders),
+        migrations.RemoveField(
+            model_name='orderproduct',
+            name='ordered',
+        ),
+        migrations.RemoveField(
+            model_name='orderproduct',
+            name='user',
+        ),
+    ]
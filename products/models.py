@@ -1,6 +1,8 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from imagekit.models import ImageSpecField
 from imagekit.processors import ResizeToFill
+from model_utils import FieldTracker
 from django.conf import settings
 from django.shortcuts import reverse
 
@@ -31,6 +33,8 @@ class ApplicationForm(models.Model):
     reason = models.TextField(verbose_name='Причина')
     status = models.CharField(max_length=16, default='В ожидании', choices=STATUS, verbose_name="Статус")
 
+    tracker = FieldTracker(fields=["status"])
+
     def get_accept_app_url(self):
         return reverse("products:accept_app", kwargs={
             'pk': self.pk
@@ -48,6 +52,9 @@ class ApplicationForm(models.Model):
     class Meta:
         verbose_name = "Заявка"
         verbose_name_plural = "Заявки"
+        indexes = [
+            models.Index(fields=["status"], name="app_status_idx"),
+        ]
         permissions = (("view_app_page", "Can view the applications page"),
                        ("accept_app", "Can accept applications"),)
 
@@ -74,6 +81,8 @@ class Category(models.Model):
     slug = models.SlugField(max_length=255, db_index=True)
     store = models.ForeignKey(Store, on_delete=models.CASCADE, verbose_name="Магазин")
 
+    tracker = FieldTracker(fields=["store"])
+
     def __str__(self):
         return self.name
 
@@ -94,8 +103,22 @@ class Product(models.Model):
     updated = models.DateTimeField(auto_now=True)
     picture = models.ImageField(upload_to="products_pic/", verbose_name="Картинка", blank=True,
                                 default="products_pic/no-image.jpg")
+    # Адаптивные варианты для srcset: WebP и JPEG для браузеров без WebP. Качество выше 85
+    # почти не заметно на глаз, а файл растёт в разы.
     mini_picture = ImageSpecField(source="picture", processors=[ResizeToFill(600, 600)],
-                                 format="JPEG", options={"quality": 100})
+                                 format="JPEG", options={"quality": 80, "progressive": True})
+    picture_300 = ImageSpecField(source="picture", processors=[ResizeToFill(300, 300)],
+                                 format="JPEG", options={"quality": 80, "progressive": True})
+    picture_100 = ImageSpecField(source="picture", processors=[ResizeToFill(100, 100)],
+                                 format="JPEG", options={"quality": 80})
+    picture_600_webp = ImageSpecField(source="picture", processors=[ResizeToFill(600, 600)],
+                                      format="WEBP", options={"quality": 75})
+    picture_300_webp = ImageSpecField(source="picture", processors=[ResizeToFill(300, 300)],
+                                      format="WEBP", options={"quality": 75})
+    picture_100_webp = ImageSpecField(source="picture", processors=[ResizeToFill(100, 100)],
+                                      format="WEBP", options={"quality": 75})
+
+    tracker = FieldTracker(fields=["price", "store"])
 
     def get_add_to_cart_url(self):
         return reverse("products:add-to-cart", kwargs={
@@ -116,23 +139,79 @@ class Product(models.Model):
 
 #Создание модели (таблицы) для хранения заказанных продуктов(корзина)
 class OrderProduct(models.Model):
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name="Пользователь")
+    order = models.ForeignKey("Order", on_delete=models.CASCADE, related_name="lines", verbose_name="Заказ")
     product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name="Продукт")
     amount = models.IntegerField(default=1, verbose_name="Количество")
-    ordered = models.BooleanField(default=False, verbose_name="Заказ оформлен")
+    # цена и название фиксируются при оформлении заказа, чтобы история не зависела от каталога
+    unit_price = models.DecimalField(decimal_places=2, max_digits=19, null=True, blank=True,
+                                     verbose_name="Цена на момент заказа")
+    product_name = models.CharField(max_length=255, blank=True, verbose_name="Название на момент заказа")
+
+    @property
+    def price(self):
+        return self.unit_price if self.unit_price is not None else self.product.price
+
+    @property
+    def name(self):
+        return self.product_name or self.product.name
+
+    def snapshot_product(self):
+        """
+        Запоминает текущие цену и название продукта в строке заказа.
+        """
+        self.unit_price = self.product.price
+        self.product_name = self.product.name
 
     def get_total_item_price(self):
-        return self.amount * self.product.price
+        return self.amount * self.price
 
     def get_final_price(self):
         return self.get_total_item_price()
 
     def __str__(self):
-        return self.product.name
+        return self.name
 
     class Meta:
         verbose_name = "Заказанный продукт"
         verbose_name_plural = "Заказанные продукты"
+        constraints = [
+            # продукт встречается в заказе одной строкой; индекс ограничения обслуживает
+            # и поиск строки корзины по (order, product)
+            models.UniqueConstraint(fields=["order", "product"], name="orderproduct_order_product_uniq"),
+        ]
+
+class OrderQuerySet(models.QuerySet):
+    def with_lines(self, select_product=True):
+        """
+        Подгружает строки заказа (и, если нужно, их продукты) одним запросом на весь список.
+        Оформленным заказам продукт не нужен: цена и название зафиксированы в строке.
+        """
+        lines = OrderProduct.objects.all()
+        if select_product:
+            lines = lines.select_related("product")
+        return self.prefetch_related(models.Prefetch("lines", queryset=lines))
+
+    def with_courier(self):
+        """
+        Подтягивает заказчика и курьера в том же запросе.
+        """
+        return self.select_related("user", "deliveryman")
+
+    def with_totals(self):
+        """
+        Добавляет итоги, посчитанные по строкам: computed_total и computed_item_count.
+        """
+        money = models.DecimalField(decimal_places=2, max_digits=19)
+        return self.annotate(
+            computed_total=Coalesce(
+                models.Sum(models.F("lines__amount") * Coalesce("lines__unit_price", "lines__product__price"),
+                           output_field=money),
+                models.Value(0),
+                output_field=money,
+            ),
+            computed_item_count=models.Count("lines"),
+        )
+
 
 #Создание модели(таблицы) Заказов
 class Order(models.Model):
@@ -142,7 +221,6 @@ class Order(models.Model):
         ('Выполнен', 'Выполненный заказ')
     )
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name="Пользователь")
-    products = models.ManyToManyField(OrderProduct, verbose_name="Продукты")
     created_date = models.DateTimeField(verbose_name="Дата")
     status = models.CharField(max_length=16, default='Новый', choices=STATUS, verbose_name="Статус")
     ordered = models.BooleanField(default=False, verbose_name="Заказ оформлен")
@@ -150,12 +228,41 @@ class Order(models.Model):
     phone = models.CharField(max_length=255, null=True, verbose_name='Номер телефона')
     address = models.TextField(null=True, verbose_name="Адрес")
     deliveryman = models.ForeignKey(Deliveryman, blank=True, null=True, on_delete=models.CASCADE, verbose_name="Курьер")
+    # денормализованные итоги заказа, поддерживаются действиями корзины и фиксируются при оформлении
+    total = models.DecimalField(decimal_places=2, max_digits=19, default=0, verbose_name="Сумма")
+    item_count = models.PositiveIntegerField(default=0, verbose_name="Количество позиций")
+    # ключ из формы оформления или заголовка Idempotency-Key: повторная отправка не создаёт второй заказ
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True, editable=False,
+                                       verbose_name="Ключ идемпотентности")
+
+    objects = OrderQuerySet.as_manager()
+    tracker = FieldTracker(fields=["ordered", "deliveryman"])
 
     def get_total(self):
-        total = 0
-        for product in self.products.all():
-            total += product.get_final_price()
-        return total
+        return self.total
+
+    def adjust_totals(self, total_delta=0, item_count_delta=0):
+        """
+        Атомарно сдвигает итоги заказа в базе одним UPDATE, без чтения строк заказа.
+        """
+        Order.objects.filter(pk=self.pk).update(
+            total=models.F("total") + total_delta,
+            item_count=models.F("item_count") + item_count_delta,
+        )
+
+    def recalculate_totals(self, commit=True):
+        """
+        Пересчитывает итоги по строкам заказа одним агрегирующим запросом.
+        """
+        totals = self.lines.aggregate(
+            total=models.Sum(models.F("amount") * Coalesce("unit_price", "product__price"),
+                             output_field=models.DecimalField(decimal_places=2, max_digits=19)),
+            item_count=models.Count("pk"),
+        )
+        self.total = totals["total"] or 0
+        self.item_count = totals["item_count"]
+        if commit:
+            Order.objects.filter(pk=self.pk).update(total=self.total, item_count=self.item_count)
 
     def get_take_order_url(self):
         return reverse("products:take-order", kwargs={
@@ -173,6 +280,20 @@ class Order(models.Model):
     class Meta:
         verbose_name = "Заказ"
         verbose_name_plural = "Заказы"
+        # индексы под постраничный вывод по ключу (created_date, id) на страницах заказов
+        indexes = [
+            models.Index(fields=["ordered", "deliveryman", "created_date", "id"], name="order_board_keyset_idx"),
+            models.Index(fields=["deliveryman", "created_date", "id"], name="order_courier_keyset_idx"),
+            models.Index(fields=["user", "ordered", "created_date", "id"], name="order_customer_keyset_idx"),
+            # открытая корзина пользователя: filter(user=..., ordered=False)
+            models.Index(fields=["user"], condition=models.Q(ordered=False), name="order_open_cart_idx"),
+            # новые заказы для курьеров: filter(ordered=True, deliveryman=None)
+            models.Index(fields=["created_date", "id"], condition=models.Q(ordered=True, deliveryman__isnull=True),
+                         name="order_unassigned_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "idempotency_key"], name="order_idempotency_key_uniq"),
+        ]
         permissions = (("view_orders_page", "Can view the orders page"),
                        ("take_orders", "Can take orders"),)
 
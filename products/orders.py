@@ -0,0 +1,32 @@
+from . import events
+from .counters import NEW_ORDERS_KEY, adjust_counter
+from .models import Order
+
+
+def claim_order(pk, deliveryman):
+    """
+    Закрепляет заказ за курьером одним условным UPDATE ... WHERE deliveryman_id IS NULL.
+    Из нескольких курьеров, одновременно взявших один заказ, строку обновит ровно один;
+    возвращает True, если это был текущий курьер.
+    """
+    claimed = (
+        Order.objects.filter(pk=pk, ordered=True, deliveryman__isnull=True)
+        .exclude(user_id=deliveryman.user_id)
+        .update(deliveryman=deliveryman, status="В ожидании")
+    )
+    # update() обходит post_save, поэтому счётчик новых заказов сдвигаем сами
+    adjust_counter(NEW_ORDERS_KEY, -claimed)
+    if claimed:
+        events.order_claimed(pk)
+    return bool(claimed)
+
+
+def confirm_delivery(pk, user):
+    """
+    Отмечает взятый курьером заказ пользователя выполненным одним условным UPDATE.
+    Возвращает True, если статус изменился.
+    """
+    return bool(
+        Order.objects.filter(pk=pk, user=user, deliveryman__isnull=False, status="В ожидании")
+        .update(status="Выполнен")
+    )
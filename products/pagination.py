@@ -0,0 +1,75 @@
+import base64
+import binascii
+
+from django.db.models import Q
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(created_date, pk):
+    raw = f"{created_date.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Разбирает курсор в пару (created_date, pk). Испорченный курсор — это 404, как у номера страницы.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created, pk = raw.rsplit("|", 1)
+        created_date = parse_datetime(created)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        created_date = None
+    if created_date is None:
+        raise Http404("Неверный курсор страницы.")
+    return created_date, pk
+
+
+def keyset_page(queryset, cursor, page_size, descending=False):
+    """
+    Страница по ключу (created_date, id) после курсора: (строки, курсор следующей страницы или None).
+    Строки могут быть объектами моделей или словарями из values() с ключами created_date и id.
+    """
+    if descending:
+        queryset = queryset.order_by("-created_date", "-id")
+    else:
+        queryset = queryset.order_by("created_date", "id")
+    if cursor:
+        created_date, pk = decode_cursor(cursor)
+        if descending:
+            after = Q(created_date__lt=created_date) | Q(created_date=created_date, id__lt=pk)
+        else:
+            after = Q(created_date__gt=created_date) | Q(created_date=created_date, id__gt=pk)
+        queryset = queryset.filter(after)
+    # одна лишняя строка показывает, есть ли следующая страница
+    object_list = list(queryset[:page_size + 1])
+    if len(object_list) <= page_size:
+        return object_list, None
+    object_list = object_list[:page_size]
+    last = object_list[-1]
+    if isinstance(last, dict):
+        return object_list, encode_cursor(last["created_date"], last["id"])
+    return object_list, encode_cursor(last.created_date, last.pk)
+
+
+class KeysetPaginationMixin:
+    """
+    Постраничный вывод ListView по ключу (created_date, id) вместо OFFSET:
+    следующая страница выбирается условием "после последней строки", поэтому
+    страница N стоит столько же, сколько первая, при наличии индекса по этим полям.
+    """
+    paginate_by = 20
+    cursor_kwarg = "after"
+    keyset_descending = False
+
+    def paginate_queryset(self, queryset, page_size):
+        cursor = self.request.GET.get(self.cursor_kwarg)
+        object_list, self.next_cursor = keyset_page(queryset, cursor, page_size, self.keyset_descending)
+        return None, None, object_list, self.next_cursor is not None
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["next_cursor"] = self.next_cursor
+        return context
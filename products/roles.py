@@ -0,0 +1,141 @@
+"""
+Роли пользователя в кэше: курьер ли он (и его Deliveryman) и набор его прав.
+
+Профиль лежит в общем кэше (Redis в продакшене) и подключается к запросу лениво
+как request.roles. Им же RoleProfileMiddleware заполняет кэш прав объекта
+пользователя, из которого отвечают и ModelBackend, и бэкенд allauth, поэтому
+has_perm, PermissionRequiredMixin и {{ perms }} в шаблонах не ходят в базу.
+Профиль пользователя сбрасывается, когда меняются его группы, личные права или
+запись курьера. Изменение прав группы сбрасывает версию всех профилей сразу:
+участников группы может быть много.
+"""
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.middleware import get_user
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils.functional import SimpleLazyObject
+
+from .models import Deliveryman
+
+ROLES_VERSION_KEY = "roles:version"
+ROLE_PROFILE_KEY = "roles:profile:{pk}"
+
+
+class RoleProfile:
+    """
+    Роли одного пользователя. Права — строки "app_label.codename", как у get_all_permissions().
+    """
+    __slots__ = ("user_id", "deliveryman_id", "permissions")
+
+    def __init__(self, user_id=None, deliveryman_id=None, permissions=()):
+        self.user_id = user_id
+        self.deliveryman_id = deliveryman_id
+        self.permissions = frozenset(permissions)
+
+    @property
+    def is_courier(self):
+        return self.deliveryman_id is not None
+
+    @property
+    def deliveryman(self):
+        """
+        Deliveryman без запроса к базе: заполнены только pk и user_id, этого хватает
+        для фильтров и update(deliveryman=...).
+        """
+        if self.deliveryman_id is None:
+            return None
+        return Deliveryman(pk=self.deliveryman_id, user_id=self.user_id)
+
+    def has_perm(self, perm):
+        return perm in self.permissions
+
+
+ANONYMOUS = RoleProfile()
+
+
+def _current_version(cached):
+    version = cached.get(ROLES_VERSION_KEY)
+    if version is None:
+        cache.add(ROLES_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(ROLES_VERSION_KEY)
+    return version
+
+
+def load_role_profile(user):
+    """
+    Профиль из базы: два запроса — запись курьера и права пользователя вместе с правами его групп.
+    """
+    deliveryman_id = Deliveryman.objects.filter(user=user).values_list("pk", flat=True).first()
+    permissions = (
+        Permission.objects.filter(Q(user=user) | Q(group__user=user))
+        .values_list("content_type__app_label", "codename").distinct()
+    )
+    return RoleProfile(user.pk, deliveryman_id, (f"{app_label}.{codename}" for app_label, codename in permissions))
+
+
+def get_role_profile(user):
+    """
+    Профиль пользователя из кэша, один на объект пользователя (то есть на запрос).
+    """
+    if not user.is_authenticated:
+        return ANONYMOUS
+    if not hasattr(user, "_role_profile"):
+        key = ROLE_PROFILE_KEY.format(pk=user.pk)
+        cached = cache.get_many([ROLES_VERSION_KEY, key])
+        version = _current_version(cached)
+        data = cached.get(key)
+        if data is not None and data["version"] == version:
+            profile = RoleProfile(user.pk, data["deliveryman_id"], data["permissions"])
+        else:
+            profile = load_role_profile(user)
+            cache.set(key, {"version": version, "deliveryman_id": profile.deliveryman_id,
+                            "permissions": sorted(profile.permissions)}, settings.ROLES_CACHE_TIMEOUT)
+        user._role_profile = profile
+    return user._role_profile
+
+
+def invalidate_roles(*user_pks):
+    """
+    Сбрасывает профили пользователей после фиксации транзакции, чтобы параллельный
+    запрос не закэшировал старые роли до коммита.
+    """
+    keys = [ROLE_PROFILE_KEY.format(pk=pk) for pk in user_pks if pk is not None]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_all_roles():
+    transaction.on_commit(lambda: cache.set(ROLES_VERSION_KEY, uuid.uuid4().hex, None))
+
+
+def prime_permissions(user):
+    """
+    Заполняет _perm_cache пользователя правами из профиля. Этот кэш на объекте
+    пользователя ModelBackend (и унаследованный от него бэкенд allauth) проверяют
+    раньше, чем идут в базу. Суперпользователю права не нужны: has_perm отвечает
+    ему True до бэкендов.
+    """
+    if user.is_authenticated and user.is_active and not user.is_superuser:
+        user._perm_cache = set(get_role_profile(user).permissions)
+    return user
+
+
+class RoleProfileMiddleware:
+    """
+    Подключает request.roles и кэш прав пользователя. Ставится после
+    AuthenticationMiddleware; профиль читается из кэша только при первом обращении
+    к request.user или request.roles.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # get_user запоминает пользователя в request._cached_user, как у AuthenticationMiddleware
+        request.user = SimpleLazyObject(lambda: prime_permissions(get_user(request)))
+        request.roles = SimpleLazyObject(lambda: get_role_profile(request.user))
+        return self.get_response(request)
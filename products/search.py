@@ -0,0 +1,149 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Product
+
+FTS_TABLE = "products_product_fts"
+
+# Одно и то же выражение и в GIN-индексе, и в запросе, иначе PostgreSQL не станет использовать индекс
+PG_VECTOR_SQL = (
+    "(setweight(to_tsvector('russian', coalesce({prefix}name, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce({prefix}\"desc\", '')), 'B'))"
+)
+
+
+def tokenize(query):
+    """
+    Разбивает запрос на слова. Всё, кроме букв и цифр, отбрасывается, поэтому
+    пользовательский ввод не может сломать синтаксис запросов FTS5 и to_tsquery.
+    """
+    return re.findall(r"\w+", (query or "").lower())[:10]
+
+
+class FallbackBackend:
+    """
+    Поиск через icontains для баз без полнотекстового индекса. Каждое слово должно
+    встретиться в названии или описании.
+    """
+
+    def install(self, schema_connection):
+        pass
+
+    def rebuild(self, schema_connection=connection):
+        pass
+
+    def update(self, product):
+        pass
+
+    def remove(self, pk):
+        pass
+
+    def search(self, queryset, tokens):
+        for token in tokens:
+            queryset = queryset.filter(Q(name__icontains=token) | Q(desc__icontains=token))
+        return queryset.order_by("name", "pk")
+
+
+class SqliteBackend(FallbackBackend):
+    """
+    Таблица FTS5 с rowid = id продукта. Обновляется сигналами Product, массовые
+    изменения в обход save() догоняет manage.py rebuild_search_index.
+    """
+
+    def install(self, schema_connection):
+        with schema_connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [FTS_TABLE])
+            if cursor.fetchone():
+                return
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5"
+                "(name, \"desc\", tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+        self.rebuild(schema_connection)
+
+    def rebuild(self, schema_connection=connection):
+        with schema_connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, "desc") SELECT id, name, "desc" FROM products_product'
+            )
+
+    def update(self, product):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [product.pk])
+            cursor.execute(f'INSERT INTO {FTS_TABLE} (rowid, name, "desc") VALUES (%s, %s, %s)',
+                           [product.pk, product.name, product.desc])
+
+    def remove(self, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [pk])
+
+    def search(self, queryset, tokens):
+        # каждое слово ищется как префикс: "моло" найдёт "молоко"
+        match = " ".join(f'"{token}"*' for token in tokens)
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f"{FTS_TABLE}.rowid = products_product.id", f"{FTS_TABLE} MATCH %s"],
+            params=[match],
+            select={"rank": f"{FTS_TABLE}.rank"},
+            order_by=["rank", "pk"],
+        )
+
+
+class PostgresBackend(FallbackBackend):
+    """
+    Полнотекстовый GIN-индекс по выражению (название весомее описания) и триграммный
+    GIN-индекс по названию для опечаток. Оба индекса PostgreSQL обновляет сам.
+    """
+
+    def install(self, schema_connection):
+        with schema_connection.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS product_search_vector_idx ON products_product "
+                f"USING gin ({PG_VECTOR_SQL.format(prefix='')})"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS product_name_trgm_idx ON products_product "
+                "USING gin (name gin_trgm_ops)"
+            )
+
+    def search(self, queryset, tokens):
+        vector = PG_VECTOR_SQL.format(prefix="products_product.")
+        tsquery = " & ".join(f"{token}:*" for token in tokens)
+        phrase = " ".join(tokens)
+        return queryset.extra(
+            where=[f"({vector} @@ to_tsquery('russian', %s) OR products_product.name %% %s)"],
+            params=[tsquery, phrase],
+            select={"rank": f"ts_rank({vector}, to_tsquery('russian', %s)) + similarity(products_product.name, %s)"},
+            select_params=[tsquery, phrase],
+            order_by=["-rank", "pk"],
+        )
+
+
+def get_backend(db_connection=connection):
+    if db_connection.vendor == "postgresql":
+        return PostgresBackend()
+    if db_connection.vendor == "sqlite":
+        return SqliteBackend()
+    return FallbackBackend()
+
+
+def search_products(query, store=None, category=None):
+    """
+    Продукты по запросу, лучшие совпадения первыми. Без запроса возвращает продукты
+    выбранного магазина или категории, а если не выбрано ничего — пустой список.
+    """
+    queryset = Product.objects.select_related("store")
+    if store is not None:
+        queryset = queryset.filter(store=store)
+    if category is not None:
+        queryset = queryset.filter(category=category)
+    tokens = tokenize(query)
+    if tokens:
+        return get_backend().search(queryset, tokens)
+    if store is None and category is None:
+        return queryset.none()
+    return queryset.order_by("name", "pk")
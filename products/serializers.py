@@ -0,0 +1,78 @@
+from decimal import Decimal
+
+
+def money(value):
+    # агрегаты SQLite теряют масштаб Decimal, поэтому приводим к копейкам явно
+    return str(Decimal(value).quantize(Decimal("0.01")))
+
+
+def serialize_store(store):
+    return {
+        "id": store.pk,
+        "slug": store.slug,
+        "name": store.name,
+        "desc": store.desc,
+        "avatar": store.avatar.url if store.avatar else None,
+    }
+
+
+def serialize_category(category):
+    return {
+        "id": category.pk,
+        "slug": category.slug,
+        "name": category.name,
+    }
+
+
+def serialize_product(product):
+    return {
+        "id": product.pk,
+        "slug": product.slug,
+        "name": product.name,
+        "price": money(product.price),
+        "category": product.category_id,
+        "store": product.store_id,
+        "available": product.available,
+        "picture": product.picture.url if product.picture else None,
+    }
+
+
+def serialize_product_detail(product):
+    data = serialize_product(product)
+    data["desc"] = product.desc
+    data["updated"] = product.updated.isoformat()
+    return data
+
+
+def serialize_cart(cart):
+    return {
+        "items": [
+            {
+                "slug": line.product.slug,
+                "name": line.name,
+                "price": money(line.price),
+                "quantity": line.amount,
+                "total": money(line.get_total_item_price()),
+            }
+            for line in cart.lines
+        ],
+        "item_count": cart.item_count,
+        "total": money(cart.total),
+    }
+
+
+# поля заказа для доски курьеров: читаются через values(), без объектов моделей
+ORDER_BOARD_FIELDS = ("id", "created_date", "status", "name", "phone", "address", "total", "item_count")
+
+
+def serialize_order_row(row):
+    return {
+        "id": row["id"],
+        "created_date": row["created_date"].isoformat(),
+        "status": row["status"],
+        "name": row["name"],
+        "phone": row["phone"],
+        "address": row["address"],
+        "total": money(row["total"]),
+        "item_count": row["item_count"],
+    }
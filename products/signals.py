@@ -0,0 +1,144 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.db import connections
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import catalog, search
+from .counters import NEW_ORDERS_KEY, PENDING_APPS_KEY, adjust_counter
+from .models import ApplicationForm, Category, Deliveryman, Order, Product, Store
+from .roles import invalidate_all_roles, invalidate_roles
+
+User = get_user_model()
+
+
+def _is_new_order(ordered, deliveryman_id):
+    return bool(ordered) and deliveryman_id is None
+
+
+def _is_pending_app(status):
+    return status == "В ожидании"
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, **kwargs):
+    """
+    Поддерживает счётчик новых заказов: оформленных и ещё не взятых курьером.
+    """
+    before = not created and _is_new_order(instance.tracker.previous("ordered"),
+                                           instance.tracker.previous("deliveryman"))
+    after = _is_new_order(instance.ordered, instance.deliveryman_id)
+    adjust_counter(NEW_ORDERS_KEY, int(after) - int(before))
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    if _is_new_order(instance.tracker.previous("ordered"), instance.tracker.previous("deliveryman")):
+        adjust_counter(NEW_ORDERS_KEY, -1)
+
+
+@receiver(post_save, sender=ApplicationForm)
+def app_saved(sender, instance, created, **kwargs):
+    """
+    Поддерживает счётчик заявок в ожидании.
+    """
+    before = not created and _is_pending_app(instance.tracker.previous("status"))
+    after = _is_pending_app(instance.status)
+    adjust_counter(PENDING_APPS_KEY, int(after) - int(before))
+
+
+@receiver(post_delete, sender=ApplicationForm)
+def app_deleted(sender, instance, **kwargs):
+    if _is_pending_app(instance.tracker.previous("status")):
+        adjust_counter(PENDING_APPS_KEY, -1)
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, **kwargs):
+    """
+    Пересчитывает итоги открытых корзин, в которых лежит продукт с изменённой ценой.
+    """
+    if not created and instance.tracker.has_changed("price"):
+        for order in Order.objects.filter(ordered=False, lines__product=instance):
+            order.recalculate_totals()
+
+
+@receiver(post_save, sender=Product)
+def product_indexed(sender, instance, **kwargs):
+    search.get_backend().update(instance)
+
+
+@receiver(post_delete, sender=Product)
+def product_unindexed(sender, instance, **kwargs):
+    search.get_backend().remove(instance.pk)
+
+
+def install_search_index(sender, using, **kwargs):
+    """
+    Создаёт поисковый индекс после migrate (и после создания тестовой базы).
+    Индекс зависит от СУБД, поэтому он не описан в миграциях.
+    """
+    db_connection = connections[using]
+    search.get_backend(db_connection).install(db_connection)
+
+
+@receiver(post_save, sender=Store)
+@receiver(post_delete, sender=Store)
+def store_changed(sender, instance, **kwargs):
+    catalog.invalidate_catalog()
+    catalog.invalidate_store(instance.pk)
+    # название и аватар магазина есть и в карточках его продуктов
+    catalog.invalidate_cards(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    """
+    Категория меняет и указатель slug, и каталог магазина (старого, если её перенесли).
+    """
+    catalog.invalidate_catalog()
+    catalog.invalidate_store(instance.store_id, instance.tracker.previous("store"))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, instance, **kwargs):
+    catalog.invalidate_store(instance.store_id, instance.tracker.previous("store"))
+
+
+@receiver(post_save, sender=Deliveryman)
+@receiver(post_delete, sender=Deliveryman)
+def deliveryman_changed(sender, instance, **kwargs):
+    invalidate_roles(instance.user_id)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def user_roles_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Группы или личные права пользователя: user.groups.add(...) или, с другой стороны,
+    group.user_set.add(...) (так accept_app делает пользователя курьером).
+    """
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        invalidate_roles(instance.pk)
+    elif pk_set is None:
+        # group.user_set.clear(): кто был в группе, уже не узнать
+        invalidate_all_roles()
+    else:
+        invalidate_roles(*pk_set)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def group_permissions_changed(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_all_roles()
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def role_deleted(sender, instance, **kwargs):
+    # связи удаляются каскадом без m2m_changed
+    invalidate_all_roles()
@@ -1,55 +1,32 @@
 from django import template
-from products.models import Order, Deliveryman, ApplicationForm
+from products.counters import compute_badge_counters
 
 register = template.Library()
 
+# Фильтры оставлены для обратной совместимости: base.html берёт счётчики
+# из контекстного процессора badge_counters, который считает их одним запросом.
+
 
 @register.filter
 def cart_item_count(user):
-    if user.is_authenticated:
-        qs = Order.objects.filter(user=user.id, ordered=False)
-        if qs.exists():
-            return qs[0].products.count()
-    return 0
+    return compute_badge_counters(user)["cart"]
 
 
 @register.filter
 def ordered_count(user):
-    if user.is_authenticated:
-        if Deliveryman.objects.filter(user=user.id).exists():
-            qs = Order.objects.filter(ordered=True, deliveryman=None).exclude(user=user.id)
-        else:
-            qs = Order.objects.filter(ordered=True, deliveryman=None)
-        if qs.exists():
-            return qs.count()
-    return 0
+    return compute_badge_counters(user)["ordered"]
 
 
 @register.filter
 def my_order_count(user):
-    if user.is_authenticated:
-        qs = Order.objects.filter(user=user.id, ordered=True)
-        if qs.exists():
-            return qs.count()
-    return 0
+    return compute_badge_counters(user)["my_orders"]
 
 
 @register.filter
 def orders_taken_count(user):
-    if user.is_authenticated:
-        if Deliveryman.objects.filter(user=user.id).exists():
-            deliveryman = Deliveryman.objects.get(user=user.id)
-            qs = Order.objects.filter(deliveryman=deliveryman)
-            if qs.exists():
-                return qs.count()
-        return 0
-    return 0
+    return compute_badge_counters(user)["orders_taken"]
 
 
 @register.filter
 def delivery_app_count(user):
-    if user.is_authenticated:
-        qs = ApplicationForm.objects.filter(status="В ожидании")
-        if qs.exists():
-            return qs.count()
-    return 0
+    return compute_badge_counters(user)["delivery_apps"]
@@ -0,0 +1,18 @@
+from django import template
+
+from products.fragments import render_product_cards, render_store_cards
+
+register = template.Library()
+
+# Карточки рендерятся и кэшируются отдельно от страницы, поэтому навигационная
+# панель base.html со счётчиками пользователя в кэш фрагментов никогда не попадает.
+
+
+@register.simple_tag
+def product_cards(products, show_store=False):
+    return render_product_cards(products, show_store)
+
+
+@register.simple_tag
+def store_cards(stores):
+    return render_store_cards(stores)
@@ -0,0 +1,82 @@
+from decimal import Decimal
+
+from django.utils import timezone
+from factory import Faker, LazyFunction, Sequence, SubFactory
+from factory.django import DjangoModelFactory, ImageField
+
+from inel_delivery.users.tests.factories import UserFactory
+from products.models import ApplicationForm, Category, Deliveryman, Order, OrderProduct, Product, Store
+
+
+class StoreFactory(DjangoModelFactory):
+
+    name = Faker("company")
+    slug = Sequence(lambda n: f"store-{n}")
+    desc = Faker("sentence")
+    avatar = ImageField(color="blue", width=32, height=32)
+
+    class Meta:
+        model = Store
+
+
+class CategoryFactory(DjangoModelFactory):
+
+    name = Faker("word")
+    slug = Sequence(lambda n: f"category-{n}")
+    store = SubFactory(StoreFactory)
+
+    class Meta:
+        model = Category
+
+
+class ProductFactory(DjangoModelFactory):
+
+    name = Faker("word")
+    slug = Sequence(lambda n: f"product-{n}")
+    category = SubFactory(CategoryFactory)
+    store = SubFactory(StoreFactory)
+    price = Decimal("100.00")
+    desc = Faker("sentence")
+    picture = ImageField(color="green", width=32, height=32)
+
+    class Meta:
+        model = Product
+
+
+class DeliverymanFactory(DjangoModelFactory):
+
+    user = SubFactory(UserFactory)
+    name = Faker("name")
+    phone = Faker("phone_number")
+
+    class Meta:
+        model = Deliveryman
+
+
+class ApplicationFormFactory(DjangoModelFactory):
+
+    user = SubFactory(UserFactory)
+    name = Faker("name")
+    phone = Faker("phone_number")
+    reason = Faker("sentence")
+
+    class Meta:
+        model = ApplicationForm
+
+
+class OrderFactory(DjangoModelFactory):
+
+    user = SubFactory(UserFactory)
+    created_date = LazyFunction(timezone.now)
+
+    class Meta:
+        model = Order
+
+
+class OrderProductFactory(DjangoModelFactory):
+
+    order = SubFactory(OrderFactory)
+    product = SubFactory(ProductFactory)
+
+    class Meta:
+        model = OrderProduct
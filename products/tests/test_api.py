@@ -0,0 +1,110 @@
+import json
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth.models import Permission
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+
+from inel_delivery.users.models import User
+from products.models import Order
+from products.tests.factories import CategoryFactory, DeliverymanFactory, OrderFactory, ProductFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def api_client(user: User, settings) -> Client:
+    settings.CART_BACKEND = "products.cart.CacheCart"
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+@pytest.fixture
+def courier_api_client(api_client: Client, user: User) -> Client:
+    DeliverymanFactory(user=user)
+    user.user_permissions.add(*Permission.objects.filter(codename__in=["view_orders_page", "take_orders"]))
+    return api_client
+
+
+def post_json(client: Client, url, data):
+    return client.post(url, json.dumps(data), content_type="application/json")
+
+
+def test_catalog_endpoints_revalidate_without_queries(client: Client):
+    category = CategoryFactory()
+    product = ProductFactory(store=category.store, category=category, price=Decimal("5.00"))
+    urls = [
+        reverse("products:api-stores"),
+        reverse("products:api-store", kwargs={"slug": category.store.slug}),
+        reverse("products:api-category", kwargs={"slug": category.slug}),
+    ]
+    for url in urls:
+        response = client.get(url)
+        assert response.status_code == 200
+        with CaptureQueriesContext(connection) as context:
+            assert client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 304
+        assert not [query for query in context.captured_queries if query["sql"].startswith("SELECT")]
+
+    payload = client.get(urls[2]).json()
+    assert payload["products"] == [{
+        "id": product.pk, "slug": product.slug, "name": product.name, "price": "5.00", "category": category.pk,
+        "store": category.store.pk, "available": True, "picture": product.picture.url,
+    }]
+    assert client.get(reverse("products:api-store", kwargs={"slug": "missing"})).status_code == 404
+
+
+def test_product_detail_answers_if_modified_since(client: Client):
+    product = ProductFactory()
+    url = reverse("products:api-product", kwargs={"pk": product.pk})
+
+    assert client.get(url).json()["product"]["desc"] == product.desc
+    assert client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(product.updated.timestamp() + 1)).status_code == 304
+
+
+def test_cart_and_checkout(user: User, api_client: Client):
+    product = ProductFactory(price=Decimal("12.00"))
+    post_json(api_client, reverse("products:cart-api"), [{"slug": product.slug, "quantity": 2}])
+
+    response = post_json(api_client, reverse("products:api-checkout"), {"name": "Иван", "phone": "555"})
+    assert response.status_code == 400 and "address" in response.json()["fields"]
+
+    response = post_json(api_client, reverse("products:api-checkout"),
+                         {"name": "Иван", "phone": "555", "address": "Токмок"})
+    assert response.status_code == 201
+    order = Order.objects.get(user=user)
+    assert response.json()["order"] == {"id": order.pk, "total": "24.00", "item_count": 1}
+
+
+def test_order_board_take_and_confirm(user: User, courier_api_client: Client):
+    OrderFactory(user=user, ordered=True)
+    orders = [OrderFactory(ordered=True) for _ in range(3)]
+    url = reverse("products:api-order-board")
+
+    response = courier_api_client.get(url)
+    assert [row["id"] for row in response.json()["orders"]] == [order.pk for order in orders]
+    assert courier_api_client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 304
+    assert courier_api_client.get(url, {"after": "broken"}).status_code == 400
+
+    take_url = reverse("products:api-take-order", kwargs={"pk": orders[0].pk})
+    assert courier_api_client.post(take_url).status_code == 200
+    assert courier_api_client.post(take_url).status_code == 409
+    assert courier_api_client.post(reverse("products:api-take-order", kwargs={"pk": 0})).status_code == 404
+    assert orders[0].pk not in [row["id"] for row in courier_api_client.get(url).json()["orders"]]
+
+    owner = Client()
+    owner.force_login(orders[0].user)
+    confirm_url = reverse("products:api-confirm-execution", kwargs={"pk": orders[0].pk})
+    assert courier_api_client.post(confirm_url).status_code == 404
+    assert owner.post(confirm_url).json() == {"order": orders[0].pk, "status": "Выполнен"}
+    assert owner.post(confirm_url).status_code == 409
+
+
+def test_api_permissions(client: Client, api_client: Client):
+    assert client.get(reverse("products:cart-api")).status_code == 401
+    assert api_client.get(reverse("products:api-order-board")).status_code == 403
+    assert api_client.get(reverse("products:api-checkout")).status_code == 405
@@ -0,0 +1,161 @@
+import json
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from inel_delivery.users.models import User
+from products.cart import CacheCart, DatabaseCart
+from products.counters import compute_badge_counters
+from products.models import Order, OrderProduct
+from products.tests.factories import ProductFactory
+from products.totals import inconsistent_orders
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def customer_client(user: User, settings) -> Client:
+    settings.CART_BACKEND = "products.cart.CacheCart"
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def writes(context):
+    return [query["sql"] for query in context.captured_queries if query["sql"].startswith(("INSERT", "UPDATE"))]
+
+
+def test_cache_cart_clicks_do_not_write_to_database(user: User, customer_client: Client):
+    apple = ProductFactory(price=Decimal("10.00"))
+    pear = ProductFactory(price=Decimal("25.50"))
+
+    with CaptureQueriesContext(connection) as context:
+        customer_client.get(apple.get_add_to_cart_url())
+        customer_client.get(apple.get_add_to_cart_url())
+        customer_client.get(pear.get_add_to_cart_url())
+        customer_client.get(reverse("products:remove-single-item-from-cart", kwargs={"slug": apple.slug}))
+    # сессия входа пишется в базу один раз на запрос — это не корзина
+    assert not [sql for sql in writes(context) if "django_session" not in sql]
+    assert not Order.objects.exists() and not OrderProduct.objects.exists()
+
+    cart = CacheCart(user)
+    assert cart.items == {apple.pk: 1, pear.pk: 1}
+    assert cart.total == Decimal("35.50")
+    assert compute_badge_counters(user)["cart"] == 2
+
+    response = customer_client.get(reverse("products:order-summary"))
+    assert [line.product for line in response.context["cart"].lines] == [apple, pear]
+
+
+def test_cache_cart_checkout_creates_order(user: User, customer_client: Client, django_capture_on_commit_callbacks):
+    product = ProductFactory(price=Decimal("10.00"), name="Хлеб")
+    customer_client.get(product.get_add_to_cart_url())
+    customer_client.get(product.get_add_to_cart_url())
+
+    with django_capture_on_commit_callbacks(execute=True):
+        customer_client.post(reverse("products:order"), {"name": "Иван", "phone": "555", "address": "Токмок"})
+
+    order = Order.objects.get(user=user)
+    line = order.lines.get()
+    assert order.ordered and (order.total, order.item_count) == (Decimal("20.00"), 1)
+    assert (line.amount, line.unit_price, line.product_name) == (2, Decimal("10.00"), "Хлеб")
+    assert not CacheCart(user).exists()
+
+
+def test_database_cart_keeps_one_line_per_product(user: User, django_assert_num_queries):
+    apple = ProductFactory(price=Decimal("10.00"))
+    pear = ProductFactory(price=Decimal("25.50"))
+    DatabaseCart(user).add(apple)
+
+    cart = DatabaseCart(user)
+    # открытый заказ, get_or_create строки по (order, product) и сдвиг итогов; записи внутри atomic()
+    with django_assert_num_queries(8):
+        assert cart.add(pear) == 1
+    with django_assert_num_queries(5):
+        assert cart.add(apple) == 2
+    # строка продукта в заказе, её изменение и сдвиг итогов
+    with django_assert_num_queries(5):
+        assert cart.remove_one(apple)
+    with django_assert_num_queries(1):
+        assert not cart.remove(ProductFactory.build(pk=0))
+
+    order = Order.objects.get(user=user)
+    assert sorted((line.product_id, line.amount) for line in order.lines.all()) == [(apple.pk, 1), (pear.pk, 1)]
+    assert (order.total, order.item_count) == (Decimal("35.50"), 2)
+    assert not inconsistent_orders(Order.objects.all()).exists()
+
+
+def test_removing_missing_product_redirects_to_product(customer_client: Client):
+    product = ProductFactory()
+
+    response = customer_client.get(product.get_remove_from_cart_url())
+
+    assert response.url == reverse("products:product_detail", kwargs={"pk": product.pk})
+
+
+def post_cart(client: Client, items):
+    return client.post(reverse("products:cart-api"), json.dumps(items), content_type="application/json")
+
+
+@pytest.mark.parametrize("backend", ["products.cart.CacheCart", "products.cart.DatabaseCart"])
+def test_cart_api_sets_quantities(user: User, customer_client: Client, settings, backend):
+    settings.CART_BACKEND = backend
+    apple, pear, plum = (ProductFactory(price=Decimal(price)) for price in ("10.00", "2.50", "4.00"))
+    customer_client.get(apple.get_add_to_cart_url())
+    customer_client.get(pear.get_add_to_cart_url())
+
+    response = post_cart(customer_client, [
+        {"slug": apple.slug, "quantity": 3},
+        {"slug": pear.slug, "quantity": 0},
+        {"slug": plum.slug, "quantity": 2},
+    ])
+
+    assert response.status_code == 200
+    payload = response.json()
+    assert [(item["slug"], item["quantity"]) for item in payload["items"]] == [(apple.slug, 3), (plum.slug, 2)]
+    assert (payload["item_count"], payload["total"]) == (2, "38.00")
+    assert customer_client.get(reverse("products:cart-api")).json() == payload
+    assert not inconsistent_orders().exists()
+
+
+@pytest.mark.parametrize("cart_class", [CacheCart, DatabaseCart])
+def test_zero_quantities_do_not_open_a_cart(user: User, cart_class):
+    cart_class(user).set_quantities({ProductFactory(): 0})
+
+    assert not cart_class(user).exists()
+    assert not Order.objects.filter(user=user).exists()
+
+
+def test_cart_api_updates_lines_in_bulk(user: User, customer_client: Client, settings, django_assert_max_num_queries):
+    settings.CART_BACKEND = "products.cart.DatabaseCart"
+    products = [ProductFactory() for _ in range(8)]
+    post_cart(customer_client, [{"slug": product.slug, "quantity": 1} for product in products])
+
+    with CaptureQueriesContext(connection) as few:
+        post_cart(customer_client, [{"slug": product.slug, "quantity": 2} for product in products[:2]])
+    with CaptureQueriesContext(connection) as many:
+        post_cart(customer_client, [{"slug": product.slug, "quantity": 3} for product in products])
+
+    assert len(many) == len(few)
+    assert {line.amount for line in Order.objects.get(user=user).lines.all()} == {3}
+
+
+@pytest.mark.parametrize("body, status", [
+    ("not json", 400),
+    (json.dumps([{"slug": "missing", "quantity": 1}]), 400),
+    (json.dumps([{"slug": "x", "quantity": -1}]), 400),
+    (json.dumps({"items": "x"}), 400),
+])
+def test_cart_api_rejects_bad_input(customer_client: Client, body, status):
+    response = customer_client.post(reverse("products:cart-api"), body, content_type="application/json")
+
+    assert response.status_code == status
+    assert "error" in response.json()
+
+
+def test_cart_api_requires_login(client: Client):
+    assert client.get(reverse("products:cart-api")).status_code == 401
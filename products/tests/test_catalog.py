@@ -0,0 +1,70 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from products import catalog
+from products.tests.factories import CategoryFactory, ProductFactory, StoreFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def select_count(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return sum(query["sql"].startswith("SELECT") for query in context.captured_queries), response
+
+
+def test_lru_evicts_least_recently_used():
+    lru = catalog.LRUCache(2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")
+    lru.set("c", 3)
+
+    assert (lru.get("a"), lru.get("b"), lru.get("c")) == (1, None, 3)
+
+
+def test_browsing_costs_no_catalog_queries_when_warm(client):
+    category = CategoryFactory()
+    for _ in range(3):
+        ProductFactory(store=category.store, category=category)
+    urls = [
+        reverse("products:store_list"),
+        reverse("products:product_category", kwargs={"slug": category.store.slug}),
+        reverse("products:cat_products", kwargs={"slug": category.slug}),
+    ]
+    for url in urls:
+        select_count(client, url)
+
+    for url in urls:
+        assert select_count(client, url)[0] == 0
+    # второй процесс: пустой LRU, данные берутся из общего кэша
+    catalog.local_cache.clear()
+    for url in urls:
+        assert select_count(client, url)[0] == 0
+
+
+def test_signals_invalidate_catalog(client, django_capture_on_commit_callbacks):
+    category = CategoryFactory()
+    product = ProductFactory(store=category.store, category=category, name="Старое имя")
+    url = reverse("products:cat_products", kwargs={"slug": category.slug})
+    assert select_count(client, url)[1].context["cat_products"] == [product]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        product.name = "Новое имя"
+        product.save()
+    assert [item.name for item in select_count(client, url)[1].context["cat_products"]] == ["Новое имя"]
+
+    other = StoreFactory()
+    with django_capture_on_commit_callbacks(execute=True):
+        product.store = other
+        product.save()
+    assert select_count(client, url)[1].context["cat_products"] == []
+    assert catalog.get_store_catalog(other)["products"] == [product]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        category.store.delete()
+    assert client.get(url).status_code == 404
+    assert select_count(client, reverse("products:store_list"))[1].context["stores"] == [other]
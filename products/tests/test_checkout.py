@@ -0,0 +1,104 @@
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from inel_delivery.users.models import User
+from inel_delivery.users.tests.factories import UserFactory
+from products.cart import CacheCart, DatabaseCart
+from products.checkout import checkout
+from products.models import Order, OrderProduct
+from products.tests.factories import OrderFactory, ProductFactory
+from products.totals import inconsistent_orders
+
+pytestmark = pytest.mark.django_db
+
+CONTACTS = ("Покупатель", "0555000000", "ул. Токтогула, 1")
+
+
+def fill(cart, size):
+    products = [ProductFactory(price=Decimal("10.50"), picture="products_pic/no-image.jpg") for _ in range(size)]
+    cart.set_quantities({product: 2 for product in products})
+    return products
+
+
+def checkout_queries(cart_class, size):
+    user = UserFactory()
+    fill(cart_class(user), size)
+    with CaptureQueriesContext(connection) as context:
+        order, created = checkout(cart_class(user), *CONTACTS, idempotency_key="k")
+    queries = len(context.captured_queries)
+    assert created and order.ordered
+    return queries, order
+
+
+@pytest.mark.parametrize("cart_class", [DatabaseCart, CacheCart])
+def test_checkout_costs_the_same_for_any_basket(cart_class):
+    small, _ = checkout_queries(cart_class, 2)
+    large, order = checkout_queries(cart_class, 40)
+
+    assert large == small
+    assert (order.total, order.item_count) == (Decimal("840.00"), 40)
+    lines = list(order.lines.all())
+    assert all(line.unit_price == Decimal("10.50") and line.product_name for line in lines)
+    assert not inconsistent_orders().exists()
+
+
+@pytest.mark.parametrize("cart_class", [DatabaseCart, CacheCart])
+def test_same_key_returns_the_same_order(user: User, cart_class):
+    fill(cart_class(user), 3)
+    order, created = checkout(cart_class(user), *CONTACTS, idempotency_key="retry")
+    fill(cart_class(user), 1)
+
+    again, created_again = checkout(cart_class(user), *CONTACTS, idempotency_key="retry")
+
+    assert created and not created_again
+    assert again.pk == order.pk
+    assert Order.objects.filter(user=user, ordered=True).count() == 1
+    assert order.item_count == 3
+
+
+@pytest.mark.parametrize("backend", ["products.cart.DatabaseCart", "products.cart.CacheCart"])
+def test_empty_cart_is_not_placed(user: User, client: Client, settings, backend):
+    settings.CART_BACKEND = backend
+    # открытый заказ без строк: корзина, из которой всё убрали
+    OrderFactory(user=user)
+    client.force_login(user)
+
+    response = client.post(reverse("products:api-checkout"), dict(zip(("name", "phone", "address"), CONTACTS)),
+                           content_type="application/json")
+
+    assert response.status_code == 409
+    assert not Order.objects.filter(user=user, ordered=True).exists()
+
+
+def test_form_double_submit_places_one_order(user: User, client: Client, settings):
+    settings.CART_BACKEND = "products.cart.CacheCart"
+    fill(CacheCart(user), 2)
+    client.force_login(user)
+    key = client.get(reverse("products:order")).context["form"]["idempotency_key"].value()
+    data = dict(zip(("name", "phone", "address"), CONTACTS), idempotency_key=key)
+
+    for _ in range(2):
+        response = client.post(reverse("products:order"), data)
+        assert response.url == reverse("products:store_list")
+
+    assert Order.objects.filter(user=user, ordered=True).count() == 1
+    assert OrderProduct.objects.filter(order__user=user, order__ordered=True).count() == 2
+
+
+def test_api_retry_with_idempotency_key(user: User, client: Client, cache_cart):
+    fill(CacheCart(user), 2)
+    client.force_login(user)
+
+    def post():
+        return client.post(reverse("products:api-checkout"), dict(zip(("name", "phone", "address"), CONTACTS)),
+                           content_type="application/json", HTTP_IDEMPOTENCY_KEY="mobile-1")
+
+    first, second = post(), post()
+
+    assert (first.status_code, second.status_code) == (201, 200)
+    assert first.json() == second.json()
@@ -0,0 +1,81 @@
+import pytest
+from django.contrib.messages import constants
+from django.contrib.messages.storage.base import Message
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from inel_delivery.users.models import User
+from products.cart import CacheCart
+from products.tests.factories import CategoryFactory, ProductFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def product():
+    category = CategoryFactory()
+    return ProductFactory(store=category.store, category=category)
+
+
+def catalog_urls(product):
+    return [
+        reverse("products:store_list"),
+        reverse("products:product_category", kwargs={"slug": product.store.slug}),
+        reverse("products:cat_products", kwargs={"slug": product.category.slug}),
+        reverse("products:product_detail", kwargs={"pk": product.pk}),
+    ]
+
+
+def test_repeat_visit_is_answered_before_rendering(client: Client, product):
+    for url in catalog_urls(product):
+        response = client.get(url)
+        assert response.status_code == 200 and response["Last-Modified"]
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        assert response.status_code == 304
+        assert not response.templates
+        # страница продукта читает store_id и updated, остальные обходятся кэшем
+        assert len([query for query in context.captured_queries if query["sql"].startswith("SELECT")]) <= 1
+
+
+def test_catalog_change_invalidates_validators(client: Client, product, django_capture_on_commit_callbacks):
+    urls = catalog_urls(product)[1:]
+    etags = [client.get(url)["ETag"] for url in urls]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        product.price += 1
+        product.save()
+
+    for url, etag in zip(urls, etags):
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+def test_etag_is_personal(user: User, client: Client, product, settings):
+    settings.CART_BACKEND = "products.cart.CacheCart"
+    url = reverse("products:store_list")
+    anonymous_etag = client.get(url)["ETag"]
+
+    client.force_login(user)
+    response = client.get(url)
+    assert response["ETag"] != anonymous_etag
+    assert not response.has_header("Last-Modified")
+    assert "private" in response["Cache-Control"]
+
+    CacheCart(user).add(product)
+    assert client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 200
+
+
+def test_pending_messages_are_always_rendered(client: Client, product, rf):
+    url = reverse("products:store_list")
+    etag = client.get(url)["ETag"]
+    storage = CookieStorage(rf.get(url))
+    client.cookies[storage.cookie_name] = storage._encode([Message(constants.INFO, "Готово")])
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 200
+    assert [str(message) for message in response.context["messages"]] == ["Готово"]
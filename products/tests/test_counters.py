@@ -0,0 +1,129 @@
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory
+
+from inel_delivery.users.models import User
+from products.cart import CacheCart, DatabaseCart
+from products.checkout import checkout
+from products.counters import (
+    NEW_ORDERS_KEY,
+    PENDING_APPS_KEY,
+    compute_badge_counters,
+    get_badge_counters,
+    get_global_counter,
+    reconcile_counters,
+)
+from products.models import Order
+from products.roles import get_role_profile
+from products.tests.factories import (
+    ApplicationFormFactory,
+    DeliverymanFactory,
+    OrderFactory,
+    OrderProductFactory,
+    ProductFactory,
+)
+
+pytestmark = [pytest.mark.django_db, pytest.mark.usefixtures("database_cart")]
+
+
+def test_anonymous_user_costs_no_queries(django_assert_num_queries):
+    with django_assert_num_queries(0):
+        counters = compute_badge_counters(AnonymousUser())
+    assert set(counters.values()) == {0}
+
+
+def test_counters_for_customer(user: User, django_assert_num_queries):
+    cart = OrderFactory(user=user)
+    OrderProductFactory.create_batch(2, order=cart)
+    OrderFactory(user=user, ordered=True)
+    OrderFactory(ordered=True)
+    ApplicationFormFactory()
+    get_global_counter(NEW_ORDERS_KEY)
+    get_global_counter(PENDING_APPS_KEY)
+    get_role_profile(User.objects.get(pk=user.pk))
+
+    with django_assert_num_queries(1):
+        counters = compute_badge_counters(user)
+
+    assert counters == {
+        "cart": 2,
+        "my_orders": 1,
+        "ordered": 2,
+        "orders_taken": 0,
+        "delivery_apps": 1,
+    }
+
+
+def test_courier_does_not_count_own_orders(user: User):
+    deliveryman = DeliverymanFactory(user=user)
+    OrderFactory(user=user, ordered=True)
+    OrderFactory(ordered=True)
+    OrderFactory(ordered=True, deliveryman=deliveryman)
+
+    counters = compute_badge_counters(user)
+
+    assert counters["ordered"] == 1
+    assert counters["orders_taken"] == 1
+
+
+def test_counters_are_memoized_on_request(user: User, rf: RequestFactory, django_assert_num_queries):
+    request = rf.get("/fake-url/")
+    request.user = user
+    get_global_counter(NEW_ORDERS_KEY)
+    get_global_counter(PENDING_APPS_KEY)
+    get_role_profile(User.objects.get(pk=user.pk))
+
+    with django_assert_num_queries(1):
+        get_badge_counters(request)
+        get_badge_counters(request)
+
+
+def test_new_orders_counter_follows_order_state(user: User, django_capture_on_commit_callbacks):
+    assert get_global_counter(NEW_ORDERS_KEY) == 0
+    order = OrderFactory(user=user)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        order.ordered = True
+        order.save()
+    assert get_global_counter(NEW_ORDERS_KEY) == 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        order.deliveryman = DeliverymanFactory()
+        order.save()
+    assert get_global_counter(NEW_ORDERS_KEY) == 0
+
+
+@pytest.mark.parametrize("cart_class", [DatabaseCart, CacheCart])
+def test_checkout_counts_new_order(user: User, cart_class, django_capture_on_commit_callbacks):
+    assert get_global_counter(NEW_ORDERS_KEY) == 0
+    cart_class(user).set_quantities({ProductFactory(picture="products_pic/no-image.jpg"): 1})
+
+    with django_capture_on_commit_callbacks(execute=True):
+        order, created = checkout(cart_class(user), "Покупатель", "0555000000", "ул. Токтогула, 1")
+
+    assert created and Order.objects.filter(ordered=True, deliveryman=None).count() == 1
+    assert get_global_counter(NEW_ORDERS_KEY) == 1
+
+
+def test_pending_apps_counter_follows_app_state(django_capture_on_commit_callbacks):
+    assert get_global_counter(PENDING_APPS_KEY) == 0
+
+    with django_capture_on_commit_callbacks(execute=True):
+        app = ApplicationFormFactory()
+    assert get_global_counter(PENDING_APPS_KEY) == 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        app.status = "Принято"
+        app.save()
+    assert get_global_counter(PENDING_APPS_KEY) == 0
+
+
+def test_reconcile_fixes_drift(django_capture_on_commit_callbacks):
+    OrderFactory(ordered=True)
+    assert get_global_counter(NEW_ORDERS_KEY) == 1
+    # изменения мимо сигналов (update) счётчик не видит
+    Order.objects.update(ordered=False)
+    assert get_global_counter(NEW_ORDERS_KEY) == 1
+
+    assert reconcile_counters()[NEW_ORDERS_KEY] == (1, 0)
+    assert get_global_counter(NEW_ORDERS_KEY) == 0
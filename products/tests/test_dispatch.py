@@ -0,0 +1,56 @@
+from datetime import datetime
+
+import pytest
+
+from inel_delivery.users.models import User
+from products.dispatch import Courier, Dispatcher, FifoPolicy, LeastLoadedPolicy, PendingOrder, StoreGroupedPolicy
+from products.models import Order
+from products.tests.factories import DeliverymanFactory, OrderFactory, OrderProductFactory
+
+
+def pending(pk, store_id=1, user_id=100):
+    return PendingOrder(pk, user_id, datetime(2020, 1, 1, 0, pk), store_id)
+
+
+def assigned_to(assignments):
+    return [(order.pk, courier.pk) for order, courier in assignments]
+
+
+def test_fifo_round_robin_respects_capacity():
+    couriers = [Courier(1, 1, 0, 1), Courier(2, 2, 0, 2)]
+    orders = [pending(pk) for pk in range(1, 6)]
+
+    assert assigned_to(FifoPolicy().assign(orders, couriers)) == [(1, 1), (2, 2), (3, 2)]
+
+
+def test_least_loaded_skips_own_orders():
+    couriers = [Courier(1, 1, 2, 3), Courier(2, 2, 0, 3)]
+    orders = [pending(1, user_id=2), pending(2), pending(3)]
+
+    assert assigned_to(LeastLoadedPolicy().assign(orders, couriers)) == [(1, 1), (2, 2), (3, 2)]
+
+
+def test_store_grouped_keeps_store_together():
+    couriers = [Courier(1, 1, 0, 2), Courier(2, 2, 1, 3)]
+    orders = [pending(1, store_id=7), pending(2, store_id=8), pending(3, store_id=7), pending(4, store_id=8)]
+
+    assert assigned_to(StoreGroupedPolicy().assign(orders, couriers)) == [(1, 1), (3, 1), (2, 2), (4, 2)]
+
+
+@pytest.mark.django_db
+def test_dispatcher_assigns_queue(user: User, django_assert_max_num_queries):
+    couriers = [DeliverymanFactory(), DeliverymanFactory()]
+    OrderFactory(deliveryman=couriers[0], ordered=True, status="В ожидании")
+    orders = [OrderFactory(user=user, ordered=True) for _ in range(3)]
+    for order in orders:
+        OrderProductFactory(order=order)
+
+    dispatcher = Dispatcher(policy=LeastLoadedPolicy(), capacity=2)
+    # два запроса на состояние и по одному UPDATE на заказ
+    with django_assert_max_num_queries(2 + len(orders)):
+        assigned = dispatcher.run_once()
+
+    assert [pk for pk, _ in assigned] == [order.pk for order in orders]
+    assert Order.objects.filter(deliveryman=couriers[1]).count() == 2
+    assert Order.objects.filter(deliveryman=couriers[0]).count() == 2
+    assert dispatcher.run_once() == []
@@ -0,0 +1,129 @@
+import asyncio
+from contextlib import contextmanager
+
+import pytest
+from django.contrib.auth.models import Permission
+from django.test import Client
+from django.urls import reverse
+
+from inel_delivery.users.models import User
+from inel_delivery.users.tests.factories import UserFactory
+from products import events
+from products.cart import CacheCart
+from products.checkout import checkout
+from products.orders import claim_order
+from products.roles import RoleProfile
+from products.tests.factories import DeliverymanFactory, OrderFactory, ProductFactory
+
+pytestmark = pytest.mark.django_db
+
+
+async def subscribe():
+    return events.get_bus().subscribe()
+
+
+@contextmanager
+def board_events():
+    # очередь подписчика в своём цикле событий; цикл не запущен, пока тест работает с базой
+    loop = asyncio.new_event_loop()
+    queue = loop.run_until_complete(subscribe())
+    received = []
+    try:
+        yield received
+        loop.run_until_complete(asyncio.sleep(0))
+        while not queue.empty():
+            received.append(queue.get_nowait().chunk.decode())
+    finally:
+        events.get_bus().unsubscribe(queue)
+        loop.close()
+
+
+def test_checkout_and_claim_reach_the_board(user: User, django_capture_on_commit_callbacks):
+    courier = DeliverymanFactory()
+    cart = CacheCart(user)
+    cart.set_quantities({ProductFactory(picture="products_pic/no-image.jpg"): 1})
+
+    with board_events() as received, django_capture_on_commit_callbacks(execute=True):
+        order, _ = checkout(cart, "Покупатель", "0555000000", "ул. Токтогула, 1")
+        claim_order(order.pk, courier)
+
+    assert received[0].startswith("event: order_placed\n")
+    assert f'"id": {order.pk}' in received[0] and '"name": "Покупатель"' in received[0]
+    assert received[1] == f'event: order_claimed\ndata: {{"id": {order.pk}}}\n\n'
+
+
+def test_uncommitted_claim_is_not_published(django_capture_on_commit_callbacks):
+    order = OrderFactory(ordered=True)
+    with board_events() as received, django_capture_on_commit_callbacks(execute=False) as callbacks:
+        assert claim_order(order.pk, DeliverymanFactory())
+    assert received == [] and callbacks
+
+
+def test_authorize_requires_board_permission(user: User, django_capture_on_commit_callbacks):
+    client = Client()
+    client.force_login(user)
+    scope = {"type": "http", "method": "GET", "path": "/ordered/events/", "query_string": b"",
+             "headers": [(b"cookie", client.cookies.output(header="", sep=";").encode())]}
+    assert events.authorize(scope) is None
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user.user_permissions.add(Permission.objects.get(codename="view_orders_page"))
+        DeliverymanFactory(user=user)
+    roles = events.authorize(scope)
+    assert roles.user_id == user.pk and roles.is_courier
+
+
+def test_stream_skips_couriers_own_orders(monkeypatch, settings):
+    settings.EVENTS_HEARTBEAT = 60
+    monkeypatch.setattr(events, "authorize", lambda scope: RoleProfile(1, 1, ["products.view_orders_page"]))
+    sent = []
+
+    async def run():
+        disconnected = asyncio.Event()
+        requests = [{"type": "http.request", "body": b""}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        stream = asyncio.ensure_future(events.order_board_stream({"type": "http"}, receive, send))
+        while not events.get_bus()._subscribers:
+            await asyncio.sleep(0)
+        events.get_bus().publish(events.encode(events.ORDER_PLACED, {"id": 7}, owner=1))
+        events.get_bus().publish(events.encode(events.ORDER_PLACED, {"id": 8}, owner=2))
+        await asyncio.sleep(0.01)
+        disconnected.set()
+        await stream
+
+    asyncio.run(run())
+
+    assert sent[0]["status"] == 200
+    assert (b"content-type", b"text/event-stream; charset=utf-8") in sent[0]["headers"]
+    body = b"".join(message["body"] for message in sent[1:])
+    assert body == b'retry: 3000\n\nevent: order_placed\ndata: {"id": 8}\n\n'
+    assert not events.get_bus()._subscribers
+
+
+def test_stream_url_without_asgi_stops_reconnects(client: Client):
+    client.force_login(UserFactory())
+    assert client.get(reverse("products:order_events")).status_code == 204
+
+
+def test_event_card_sorts_like_board(user: User, django_capture_on_commit_callbacks):
+    user.user_permissions.add(Permission.objects.get(codename="view_orders_page"))
+    order = OrderFactory(ordered=True)
+    client = Client()
+    client.force_login(user)
+
+    with board_events() as received, django_capture_on_commit_callbacks(execute=True):
+        events.order_released(order)
+    content = client.get(reverse("products:ordered")).content.decode()
+
+    created_date = events._card(order)["created_date"]
+    assert f'"created_date": "{created_date}"' in received[0]
+    assert f'data-created="{created_date}"' in content
@@ -0,0 +1,78 @@
+import pytest
+from django.urls import reverse
+from imagekit.cachefiles import ImageCacheFile
+
+from products.fragments import render_product_cards, render_store_cards
+from products.tests.factories import CategoryFactory, ProductFactory
+
+pytestmark = pytest.mark.django_db
+
+# 300 и 600 px в WebP, 300 и 600 px в JPEG и src
+URLS_PER_CARD = 5
+
+
+@pytest.fixture
+def products():
+    category = CategoryFactory()
+    return [ProductFactory(store=category.store, category=category) for _ in range(3)]
+
+
+@pytest.fixture
+def image_urls(monkeypatch):
+    """
+    Считает обращения карточек к imagekit за url миниатюры.
+    """
+    calls = []
+    original = ImageCacheFile.url
+
+    def url(self):
+        calls.append(self)
+        return original.fget(self)
+
+    monkeypatch.setattr(ImageCacheFile, "url", property(url))
+    return calls
+
+
+def test_cards_are_rendered_once(products, image_urls):
+    first = render_product_cards(products, show_store=True)
+    assert len(image_urls) == 3 * URLS_PER_CARD
+
+    assert render_product_cards(products, show_store=True) == first
+    assert len(image_urls) == 3 * URLS_PER_CARD
+    assert products[0].name in first and f"Магазин: {products[0].store}" in first
+
+    # вариант без магазина — отдельная запись
+    assert "Магазин:" not in render_product_cards(products)
+    assert len(image_urls) == 6 * URLS_PER_CARD
+
+
+def test_product_save_refreshes_only_its_card(products, image_urls):
+    render_product_cards(products)
+    products[0].name = "Новое имя"
+    products[0].save()
+
+    assert "Новое имя" in render_product_cards(products)
+    assert len(image_urls) == 4 * URLS_PER_CARD
+
+
+def test_store_change_refreshes_its_cards(products, image_urls, django_capture_on_commit_callbacks):
+    store = products[0].store
+    render_product_cards(products, show_store=True)
+    render_store_cards([store])
+
+    with django_capture_on_commit_callbacks(execute=True):
+        store.name = "Другой магазин"
+        store.save()
+
+    assert "Магазин: Другой магазин" in render_product_cards(products, show_store=True)
+    assert "Другой магазин" in render_store_cards([store])
+
+
+def test_navbar_is_not_cached_with_cards(client, user, products):
+    url = reverse("products:product_category", kwargs={"slug": products[0].store.slug})
+    assert user.username not in client.get(url).content.decode()
+
+    client.force_login(user)
+    content = client.get(url).content.decode()
+    assert user.username in content
+    assert products[0].name in content
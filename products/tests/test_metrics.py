@@ -0,0 +1,110 @@
+import logging
+import re
+
+import pytest
+from django.conf import settings as django_settings
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+
+from inel_delivery.users.models import User
+from products import metrics
+from products.cart import get_cart_class
+from products.tests.factories import CategoryFactory, DeliverymanFactory, OrderFactory, ProductFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    registry = metrics.Registry()
+    monkeypatch.setattr(metrics, "registry", registry)
+    return registry
+
+
+@pytest.fixture
+def staff_client(user: User) -> Client:
+    user.is_staff = True
+    user.save()
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def sample(text, name, view):
+    match = re.search(rf'^{name}{{view="{re.escape(view)}"}} (\S+)$', text, re.M)
+    return float(match.group(1)) if match else None
+
+
+def test_metrics_are_collected_per_url_name(client: Client, staff_client: Client):
+    category = CategoryFactory()
+    ProductFactory(store=category.store, category=category)
+    url = reverse("products:product_category", kwargs={"slug": category.store.slug})
+    client.get(url)
+    client.get(url)
+
+    text = staff_client.get(reverse("products:metrics")).content.decode()
+
+    view = "products:product_category"
+    assert sample(text, "delivery_requests_total", view) == 2
+    assert sample(text, "delivery_request_duration_seconds_count", view) == 2
+    assert f'delivery_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} 2' in text
+    assert sample(text, "delivery_db_queries_total", view) > 0
+    assert sample(text, "delivery_template_seconds_total", view) > 0
+    # первый запрос строит каталог и карточки, второй берёт их из кэша
+    assert sample(text, "delivery_cache_misses_total", view) > 0
+    assert sample(text, "delivery_cache_hits_total", view) > 0
+
+
+def test_query_budget_warning(client: Client, settings, caplog):
+    settings.METRICS_QUERY_BUDGETS = {"products:store_list": 0}
+
+    with caplog.at_level(logging.WARNING, logger="products.metrics"):
+        client.get(reverse("products:store_list"))
+
+    record, = [record for record in caplog.records if record.name == "products.metrics"]
+    assert '"view": "products:store_list"' in record.getMessage()
+
+
+def test_endpoint_requires_staff_or_token(client: Client, user: User, settings):
+    url = reverse("products:metrics")
+    assert client.get(url).status_code == 403
+    client.force_login(user)
+    assert client.get(url).status_code == 403
+
+    settings.METRICS_TOKEN = "secret"
+    response = client.get(url, HTTP_AUTHORIZATION="Bearer secret")
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain")
+
+
+@pytest.mark.parametrize("backend", ["products.cart.DatabaseCart", "products.cart.CacheCart"])
+@pytest.mark.parametrize("view", sorted(django_settings.METRICS_QUERY_BUDGETS))
+def test_budgeted_views_fit_with_empty_cache(user: User, view, backend, settings, monkeypatch):
+    # худший случай: курьер с правами на заявки и корзиной, все кэши пусты
+    settings.CART_BACKEND = backend
+    DeliverymanFactory(user=user)
+    permissions = Permission.objects.filter(codename__in=["view_orders_page", "take_orders", "accept_app"])
+    user.user_permissions.add(*permissions)
+    category = CategoryFactory()
+    products = [ProductFactory(store=category.store, category=category) for _ in range(3)]
+    OrderFactory.create_batch(3, ordered=True)
+    client = Client()
+    client.force_login(user)
+    cache.clear()
+    # корзина CacheCart хранится в кэше и пропала бы при очистке, поэтому кладётся после неё
+    get_cart_class()(user).add(products[0])
+    kwargs = {
+        "products:product_category": {"slug": category.store.slug},
+        "products:cat_products": {"slug": category.slug},
+    }.get(view, {})
+    observed = []
+    monkeypatch.setattr(metrics.registry, "observe", lambda view, stats, *args: observed.append((view, stats.queries)))
+
+    response = client.get(reverse(view, kwargs=kwargs))
+
+    assert response.status_code == 200
+    (observed_view, queries), = observed
+    assert observed_view == view
+    assert queries <= metrics.get_query_budget(view)
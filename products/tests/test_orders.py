@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+from django.contrib.auth.models import Permission
+from django.db import OperationalError, connection
+from django.test import Client
+from django.urls import reverse
+
+from inel_delivery.users.models import User
+from products.models import Order
+from products.orders import claim_order
+from products.tests.factories import DeliverymanFactory, OrderFactory
+
+
+@pytest.mark.django_db
+def test_claim_order(user: User):
+    courier = DeliverymanFactory()
+    order = OrderFactory(user=user, ordered=True)
+
+    assert claim_order(order.pk, courier)
+    assert not claim_order(order.pk, DeliverymanFactory())
+
+    order.refresh_from_db()
+    assert (order.deliveryman, order.status) == (courier, "В ожидании")
+
+
+@pytest.mark.django_db
+def test_courier_cannot_claim_own_or_open_order(user: User):
+    courier = DeliverymanFactory(user=user)
+
+    assert not claim_order(OrderFactory(user=user, ordered=True).pk, courier)
+    assert not claim_order(OrderFactory(ordered=False).pk, courier)
+
+
+@pytest.mark.django_db
+def test_take_order_view_is_a_single_update(user: User, django_assert_max_num_queries):
+    DeliverymanFactory(user=user)
+    user.user_permissions.add(Permission.objects.get(codename="take_orders"))
+    client = Client()
+    client.force_login(user)
+    order = OrderFactory(ordered=True)
+    url = reverse("products:take-order", kwargs={"pk": order.pk})
+
+    # сессия, пользователь, курьер, права (2), UPDATE и сообщение в сессию
+    with django_assert_max_num_queries(8):
+        response = client.get(url)
+
+    assert response.url == reverse("products:orders_taken")
+    assert Order.objects.get(pk=order.pk).deliveryman.user == user
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_claims_have_exactly_one_winner():
+    order = OrderFactory(ordered=True)
+    couriers = [DeliverymanFactory() for _ in range(16)]
+    barrier = threading.Barrier(len(couriers))
+    winners = []
+
+    def hammer(courier):
+        try:
+            barrier.wait()
+            while True:
+                try:
+                    if claim_order(order.pk, courier):
+                        winners.append(courier)
+                    return
+                except OperationalError:
+                    # SQLite отвечает "database is locked" на параллельную запись — повторяем
+                    continue
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=hammer, args=(courier,)) for courier in couriers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(winners) == 1
+    assert Order.objects.get(pk=order.pk).deliveryman == winners[0]
@@ -0,0 +1,76 @@
+import pytest
+from django.contrib.auth.models import Group, Permission
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from inel_delivery.users.models import User
+from products.roles import get_role_profile, prime_permissions
+from products.tests.factories import ApplicationFormFactory, DeliverymanFactory, OrderFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def fresh(user: User) -> User:
+    # новый объект пользователя, как в следующем запросе
+    return User.objects.get(pk=user.pk)
+
+
+def test_profile_is_loaded_once_and_shared(user: User, django_assert_num_queries):
+    deliveryman = DeliverymanFactory(user=user)
+    user.user_permissions.add(Permission.objects.get(codename="take_orders"))
+    get_role_profile(fresh(user))
+
+    user = fresh(user)
+    with django_assert_num_queries(0):
+        profile = get_role_profile(prime_permissions(user))
+        assert user.has_perm("products.take_orders") and not user.has_perm("products.accept_app")
+    assert profile.is_courier and profile.deliveryman.pk == deliveryman.pk
+
+
+def test_accept_app_refreshes_roles(user: User, django_capture_on_commit_callbacks):
+    group = Group.objects.create(name="deliveryman")
+    group.permissions.add(*Permission.objects.filter(codename__in=["view_orders_page", "take_orders"]))
+    user.user_permissions.add(Permission.objects.get(codename="accept_app"))
+    app = ApplicationFormFactory()
+    assert not get_role_profile(fresh(app.user)).is_courier
+
+    client = Client()
+    client.force_login(user)
+    with django_capture_on_commit_callbacks(execute=True):
+        client.get(reverse("products:accept_app", kwargs={"pk": app.pk}))
+
+    courier = prime_permissions(fresh(app.user))
+    assert get_role_profile(courier).is_courier
+    assert courier.has_perm("products.take_orders")
+
+
+def test_group_permission_change_refreshes_members(user: User, django_capture_on_commit_callbacks):
+    group = Group.objects.create(name="deliveryman")
+    with django_capture_on_commit_callbacks(execute=True):
+        user.groups.add(group)
+    assert not prime_permissions(fresh(user)).has_perm("products.take_orders")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        group.permissions.add(Permission.objects.get(codename="take_orders"))
+
+    assert prime_permissions(fresh(user)).has_perm("products.take_orders")
+
+
+def test_take_order_checks_roles_without_queries(user: User):
+    DeliverymanFactory(user=user)
+    user.user_permissions.add(Permission.objects.get(codename="take_orders"))
+    order = OrderFactory(ordered=True)
+    client = Client()
+    client.force_login(user)
+    get_role_profile(fresh(user))
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(reverse("products:take-order", kwargs={"pk": order.pk}))
+
+    assert response.url == reverse("products:orders_taken")
+    assert not [query["sql"] for query in context.captured_queries
+                if "auth_permission" in query["sql"] or "products_deliveryman" in query["sql"]]
+    order.refresh_from_db()
+    assert order.deliveryman.user == user
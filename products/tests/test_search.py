@@ -0,0 +1,58 @@
+import pytest
+from django.urls import reverse
+
+from products.search import search_products, tokenize
+from products.tests.factories import CategoryFactory, ProductFactory, StoreFactory
+
+
+def test_tokenize_drops_query_syntax():
+    assert tokenize('Молоко "3,2%" OR* (NEAR') == ["молоко", "3", "2", "or", "near"]
+    assert tokenize(None) == []
+
+
+@pytest.mark.django_db
+def test_search_ranks_and_filters():
+    store = StoreFactory()
+    milk = ProductFactory(name="Молоко коровье", desc="Пастеризованное", store=store)
+    ProductFactory(name="Шоколад", desc="Молочный шоколад с молоком", store=store)
+    other = ProductFactory(name="Молоко козье")
+    ProductFactory(name="Хлеб")
+
+    assert [product.name for product in search_products("молоко")][0] != "Шоколад"
+    assert set(search_products("моло")) == {milk, other} | set(search_products("молоком"))
+    assert list(search_products("молоко коровье")) == [milk]
+    assert list(search_products("молоко", store=other.store)) == [other]
+    assert list(search_products("", category=milk.category)) == [milk]
+    assert not search_products("")
+
+
+@pytest.mark.django_db
+def test_search_index_follows_product_changes():
+    product = ProductFactory(name="Кефир")
+    assert list(search_products("кефир")) == [product]
+
+    product.name = "Ряженка"
+    product.save()
+    assert not search_products("кефир")
+    assert list(search_products("ряженка")) == [product]
+
+    product.delete()
+    assert not search_products("ряженка")
+
+
+@pytest.mark.django_db
+def test_search_view(client, django_assert_num_queries):
+    category = CategoryFactory()
+    for index in range(30):
+        ProductFactory(name=f"Сыр {index}", store=category.store, category=category)
+
+    # магазин, COUNT и страница; представление без транзакции запроса, SAVEPOINT/RELEASE нет
+    with django_assert_num_queries(3):
+        response = client.get(reverse("products:search_products"), {"q": "сыр", "store": category.store.slug})
+    assert response.status_code == 200
+    assert len(response.context["search_products"]) == 24
+    assert response.context["page_obj"].has_next()
+
+    response = client.get(reverse("products:search_products"))
+    assert response.status_code == 200
+    assert not response.context["search_products"]
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+from django.core.management import call_command
+from django.test import Client
+from django.urls import reverse
+
+from products import thumbnails
+from products.cart import CacheCart
+from products.tests.factories import CategoryFactory, ProductFactory, StoreFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def exists(file):
+    return file.storage.exists(file.name)
+
+
+def test_thumbnail_is_generated_on_upload(django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        store = StoreFactory()
+        product = ProductFactory(store=store, category=CategoryFactory(store=store))
+
+    assert exists(store.mini_avatar) and exists(product.mini_picture)
+
+
+def test_rendering_never_generates(client: Client, monkeypatch):
+    category = CategoryFactory()
+    product = ProductFactory(store=category.store, category=category)
+    monkeypatch.setattr(thumbnails, "generate", pytest.fail)
+
+    response = client.get(reverse("products:product_category", kwargs={"slug": category.store.slug}))
+
+    assert response.status_code == 200
+    assert product.mini_picture.url in response.content.decode()
+    assert not exists(product.mini_picture)
+
+
+def test_warm_skips_existing(capsys):
+    category = CategoryFactory()
+    products = [ProductFactory(store=category.store, category=category) for _ in range(3)]
+    # аватар магазина и все варианты картинок продуктов
+    total = 1 + 3 * (len(thumbnails.SPEC_FIELDS) - 1)
+
+    assert thumbnails.warm_all(workers=1, chunk_size=2) == {"generated": total}
+    assert all(exists(product.picture_100_webp) for product in products)
+    assert thumbnails.warm_all(workers=1) == {"skipped": total}
+    assert thumbnails.warm_all(workers=1, force=True) == {"generated": total}
+
+    call_command("warm_thumbnails", workers=1)
+    assert f"пропущено: {total}" in capsys.readouterr().out
+
+
+def test_cart_ships_small_variants(user, client: Client, cache_cart):
+    product = ProductFactory()
+    CacheCart(user).add(product)
+    client.force_login(user)
+
+    content = client.get(reverse("products:order-summary")).content.decode()
+
+    assert f"{product.picture_100_webp.url} 100w" in content
+    assert product.mini_picture.url not in content
+
+
+@pytest.mark.parametrize("failures, attempts", [(1, 2), (5, 3)])
+def test_thread_queue_retries_failed_generation(settings, monkeypatch, failures, attempts):
+    settings.THUMBNAIL_RETRIES, settings.THUMBNAIL_RETRY_DELAY = 3, 0
+    calls = []
+    finished = threading.Event()
+
+    def generate(file, force=False):
+        calls.append(file.name)
+        succeeded = len(calls) > failures
+        if succeeded or len(calls) == settings.THUMBNAIL_RETRIES:
+            finished.set()
+        return succeeded
+
+    monkeypatch.setattr(thumbnails, "generate", generate)
+    thumbnails.ThreadQueue().put(ProductFactory.build().mini_picture)
+
+    assert finished.wait(5)
+    time.sleep(0.1)
+    assert len(calls) == attempts
@@ -0,0 +1,94 @@
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from inel_delivery.users.models import User
+from products.models import Order
+from products.tests.factories import OrderFactory, OrderProductFactory, ProductFactory
+from products.totals import inconsistent_orders
+
+pytestmark = [pytest.mark.django_db, pytest.mark.usefixtures("database_cart")]
+
+
+@pytest.fixture
+def customer_client(user: User) -> Client:
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def test_cart_actions_keep_totals_consistent(user: User, customer_client: Client):
+    apple = ProductFactory(price=Decimal("10.00"))
+    pear = ProductFactory(price=Decimal("25.50"))
+
+    customer_client.get(apple.get_add_to_cart_url())
+    customer_client.get(apple.get_add_to_cart_url())
+    customer_client.get(pear.get_add_to_cart_url())
+    order = Order.objects.get(user=user, ordered=False)
+    assert (order.total, order.item_count) == (Decimal("45.50"), 2)
+
+    customer_client.get(reverse("products:remove-single-item-from-cart", kwargs={"slug": apple.slug}))
+    order.refresh_from_db()
+    assert (order.total, order.item_count) == (Decimal("35.50"), 2)
+
+    customer_client.get(pear.get_remove_from_cart_url())
+    order.refresh_from_db()
+    assert (order.total, order.item_count) == (Decimal("10.00"), 1)
+    assert not inconsistent_orders().exists()
+
+
+def test_price_change_updates_open_carts(user: User):
+    product = ProductFactory(price=Decimal("10.00"))
+    order = OrderFactory(user=user)
+    OrderProductFactory(order=order, product=product, amount=3)
+    order.recalculate_totals()
+
+    product.price = Decimal("12.00")
+    product.save()
+
+    order.refresh_from_db()
+    assert order.total == Decimal("36.00")
+
+
+def test_backfill_and_check_commands(user: User):
+    order = OrderFactory(user=user)
+    OrderProductFactory(order=order, product=ProductFactory(price=Decimal("7.00")), amount=2)
+
+    with pytest.raises(CommandError):
+        call_command("check_order_totals")
+
+    call_command("backfill_order_totals")
+
+    order.refresh_from_db()
+    assert (order.total, order.item_count) == (Decimal("14.00"), 1)
+    call_command("check_order_totals")
+
+
+def test_checkout_snapshots_prices(user: User, customer_client: Client):
+    product = ProductFactory(price=Decimal("10.00"), name="Хлеб")
+    customer_client.get(product.get_add_to_cart_url())
+    customer_client.get(product.get_add_to_cart_url())
+
+    customer_client.post(reverse("products:order"), {"name": "Иван", "phone": "555", "address": "Токмок"})
+
+    order = Order.objects.get(user=user)
+    line = order.lines.get()
+    assert order.ordered
+    assert (line.unit_price, line.product_name) == (Decimal("10.00"), "Хлеб")
+
+    product.price = Decimal("99.00")
+    product.name = "Батон"
+    product.save()
+
+    order.refresh_from_db()
+    assert order.total == Decimal("20.00")
+    with CaptureQueriesContext(connection) as queries:
+        response = customer_client.get(reverse("products:order_detail", kwargs={"pk": order.pk}))
+    assert "Хлеб" in response.content.decode()
+    assert not any('"products_product"' in query["sql"] for query in queries.captured_queries)
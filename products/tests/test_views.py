@@ -0,0 +1,167 @@
+import pytest
+from django.contrib.auth.models import Group, Permission
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from inel_delivery.users.models import User
+from products.models import ApplicationForm, Deliveryman
+from products.tests.factories import (
+    ApplicationFormFactory,
+    DeliverymanFactory,
+    OrderFactory,
+    OrderProductFactory,
+    ProductFactory,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def count_queries(client: Client, url: str) -> int:
+    # первый запрос прогревает кэш счётчиков и миниатюр
+    client.get(url)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(queries)
+
+
+def add_lines(order, count):
+    for _ in range(count):
+        line = OrderProductFactory(order=order)
+        if order.ordered:
+            line.snapshot_product()
+            line.save()
+
+
+@pytest.fixture
+def courier(user: User) -> User:
+    DeliverymanFactory(user=user)
+    user.user_permissions.add(Permission.objects.get(codename="view_orders_page"))
+    return user
+
+
+@pytest.fixture
+def courier_client(courier: User) -> Client:
+    client = Client()
+    client.force_login(courier)
+    return client
+
+
+def test_order_summary_query_count_is_constant(user: User, database_cart):
+    client = Client()
+    client.force_login(user)
+    order = OrderFactory(user=user)
+    add_lines(order, 1)
+    url = reverse("products:order-summary")
+
+    baseline = count_queries(client, url)
+    add_lines(order, 5)
+
+    assert count_queries(client, url) == baseline
+
+
+def test_order_detail_query_count_is_constant(courier_client: Client):
+    order = OrderFactory(ordered=True)
+    add_lines(order, 1)
+    url = reverse("products:order_detail", kwargs={"pk": order.pk})
+
+    baseline = count_queries(courier_client, url)
+    add_lines(order, 5)
+
+    assert count_queries(courier_client, url) == baseline
+
+
+@pytest.mark.parametrize(
+    "url_name, make_order",
+    [
+        ("products:ordered", lambda courier: OrderFactory(ordered=True)),
+        ("products:order_owner_list", lambda courier: OrderFactory(user=courier, ordered=True)),
+        ("products:orders_taken", lambda courier: OrderFactory(ordered=True, deliveryman=courier.deliveryman)),
+    ],
+)
+def test_order_lists_query_count_is_constant(courier: User, courier_client: Client, url_name, make_order):
+    add_lines(make_order(courier), 2)
+    url = reverse(url_name)
+
+    baseline = count_queries(courier_client, url)
+    for _ in range(5):
+        add_lines(make_order(courier), 2)
+
+    assert count_queries(courier_client, url) == baseline
+
+
+def test_order_board_keyset_pagination(courier_client: Client):
+    orders = [OrderFactory(ordered=True) for _ in range(25)]
+    url = reverse("products:ordered")
+
+    first = courier_client.get(url)
+    second = courier_client.get(url, {"after": first.context["next_cursor"]})
+
+    assert [order.pk for order in first.context["ordered_list"]] == [order.pk for order in orders[:20]]
+    assert [order.pk for order in second.context["ordered_list"]] == [order.pk for order in orders[20:]]
+    assert second.context["next_cursor"] is None
+
+
+def test_customer_orders_are_newest_first(courier: User, courier_client: Client):
+    orders = [OrderFactory(user=courier, ordered=True) for _ in range(3)]
+
+    response = courier_client.get(reverse("products:order_owner_list"))
+
+    assert list(response.context["ordered_list"]) == orders[::-1]
+
+
+def test_broken_cursor_is_not_found(courier_client: Client):
+    response = courier_client.get(reverse("products:ordered"), {"after": "not-a-cursor"})
+
+    assert response.status_code == 404
+
+
+def savepoints(context):
+    # тест идёт внутри транзакции, поэтому atomic() представления виден как SAVEPOINT
+    return [query["sql"] for query in context.captured_queries if query["sql"].startswith("SAVEPOINT")]
+
+
+@pytest.mark.parametrize("url_name", ["products:store_list", "products:search_products", "products:order-summary",
+                                      "products:order", "products:ordered"])
+def test_read_views_skip_request_transaction(courier: User, courier_client: Client, database_cart, url_name):
+    add_lines(OrderFactory(user=courier), 1)
+
+    with CaptureQueriesContext(connection) as context:
+        response = courier_client.get(reverse(url_name))
+
+    assert response.status_code == 200
+    assert not savepoints(context)
+
+
+def test_cart_action_wraps_only_its_writes(user: User, database_cart):
+    client = Client()
+    client.force_login(user)
+    product = ProductFactory()
+    client.get(product.get_add_to_cart_url())
+
+    with CaptureQueriesContext(connection) as context:
+        client.get(product.get_add_to_cart_url())
+
+    # транзакция запроса не открывается, строка и итоги заказа меняются в одном atomic()
+    assert len(savepoints(context)) == 1
+    assert context.captured_queries[0]["sql"].startswith("SELECT")
+
+
+def test_accept_app_writes_nothing_when_group_is_missing(user: User):
+    user.user_permissions.add(Permission.objects.get(codename="accept_app"))
+    app = ApplicationFormFactory()
+    client = Client()
+    client.force_login(user)
+
+    with pytest.raises(Group.DoesNotExist):
+        client.get(reverse("products:accept_app", kwargs={"pk": app.pk}))
+    assert ApplicationForm.objects.get(pk=app.pk).status == "В ожидании"
+    assert not Deliveryman.objects.exists()
+
+    Group.objects.create(name="deliveryman")
+    client.get(reverse("products:accept_app", kwargs={"pk": app.pk}))
+    deliveryman = Deliveryman.objects.get(user=app.user)
+    assert (deliveryman.name, deliveryman.phone) == (app.name, app.phone)
+    assert app.user.groups.filter(name="deliveryman").exists()
@@ -0,0 +1,166 @@
+"""
+Миниатюры imagekit генерируются заранее, а не при первом обращении к .url.
+
+QueuedStrategy — стратегия кэш-файлов imagekit (IMAGEKIT_DEFAULT_CACHEFILE_STRATEGY):
+когда исходная картинка сохранена, миниатюра ставится в очередь после коммита, а при
+рендеринге страницы стратегия не делает ничего — ни проверки файла в хранилище, ни
+Pillow. Существующие картинки догоняет manage.py warm_thumbnails.
+"""
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils.module_loading import import_string
+
+from .models import Product, Store
+
+logger = logging.getLogger(__name__)
+
+# Все поля ImageSpecField, которые нужно генерировать заранее
+SPEC_FIELDS = [
+    (Store, "mini_avatar"),
+    (Product, "mini_picture"),
+    (Product, "picture_300"),
+    (Product, "picture_100"),
+    (Product, "picture_600_webp"),
+    (Product, "picture_300_webp"),
+    (Product, "picture_100_webp"),
+]
+
+
+def generate(file, force=False):
+    """
+    Генерирует кэш-файл миниатюры. Ошибки (например, исходник пропал из хранилища)
+    только пишутся в лог: очередь не должна останавливаться из-за одной картинки.
+    """
+    try:
+        if force and file.storage.exists(file.name):
+            # иначе хранилище сохранит новый файл под другим именем, и imagekit его не увидит
+            file.storage.delete(file.name)
+        file.generate(force=force)
+    except Exception:
+        logger.exception("Не удалось сгенерировать миниатюру %s", file.name)
+        return False
+    return True
+
+
+class ImmediateQueue:
+    """
+    Генерирует миниатюру сразу в том же потоке. Для тестов и локальной разработки.
+    """
+
+    def put(self, file):
+        generate(file, force=True)
+
+
+class ThreadQueue:
+    """
+    Генерирует миниатюры в пуле фоновых потоков процесса. Pillow отпускает GIL
+    на время сжатия, поэтому загрузка картинки не задерживает ответ.
+    """
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=settings.THUMBNAIL_WORKERS, thread_name_prefix="thumbnails")
+
+    def put(self, file, attempt=1):
+        try:
+            future = self.executor.submit(generate, file, True)
+        except RuntimeError:
+            # пул уже остановлен (процесс завершается): миниатюру догонит manage.py warm_thumbnails
+            logger.error("Миниатюра %s не поставлена в очередь: пул остановлен", file.name)
+            return
+        future.add_done_callback(lambda future: self._done(future, file, attempt))
+
+    def _done(self, future, file, attempt):
+        """
+        Неудачная генерация повторяется через THUMBNAIL_RETRY_DELAY секунд, всего
+        THUMBNAIL_RETRIES попыток: стратегия не проверяет файл при рендеринге, и
+        потерянная миниатюра иначе осталась бы ссылкой в никуда.
+        """
+        if not future.cancelled() and future.exception() is None and future.result():
+            return
+        if attempt >= settings.THUMBNAIL_RETRIES:
+            logger.error("Миниатюра %s не сгенерирована за %d попыток", file.name, attempt)
+            return
+        logger.warning("Миниатюра %s не сгенерирована, попытка %d из %d",
+                       file.name, attempt, settings.THUMBNAIL_RETRIES)
+        timer = threading.Timer(settings.THUMBNAIL_RETRY_DELAY, self.put, (file, attempt + 1))
+        timer.daemon = True
+        timer.start()
+
+
+_queues = {}
+
+
+def get_queue():
+    path = settings.THUMBNAIL_QUEUE
+    if path not in _queues:
+        _queues[path] = import_string(path)()
+    return _queues[path]
+
+
+class QueuedStrategy:
+    """
+    Стратегия imagekit: генерация только по сохранению исходника, существование
+    файла при обращении к .url не проверяется.
+    """
+
+    def on_source_saved(self, file):
+        # исходник записан в хранилище уже сейчас, но строку в базе могут откатить
+        transaction.on_commit(lambda: get_queue().put(file))
+
+    def should_verify_existence(self, file):
+        return False
+
+
+# массовая генерация (manage.py warm_thumbnails)
+
+def _warm_chunk(model_label, field_name, pks, force):
+    """
+    Генерирует миниатюры для пачки объектов; уже лежащие в хранилище пропускает.
+    Возвращает Counter с ключами generated, skipped, failed.
+    """
+    model = next(model for model, name in SPEC_FIELDS if model._meta.label == model_label and name == field_name)
+    stats = Counter()
+    for obj in model.objects.filter(pk__in=pks):
+        file = getattr(obj, field_name)
+        if not file.generator.source:
+            stats["skipped"] += 1
+        elif not force and file.storage.exists(file.name):
+            stats["skipped"] += 1
+        else:
+            stats["generated" if generate(file, force=True) else "failed"] += 1
+    return stats
+
+
+def _init_worker():
+    # при запуске процессов через spawn (Windows, macOS) Django в воркере ещё не настроен
+    django.setup()
+
+
+def warm_all(workers=None, chunk_size=100, force=False):
+    """
+    Генерирует миниатюры всех полей SPEC_FIELDS в пуле процессов (workers=1 — в текущем процессе).
+    """
+    chunks = []
+    for model, field_name in SPEC_FIELDS:
+        pks = list(model.objects.order_by("pk").values_list("pk", flat=True))
+        chunks += [(model._meta.label, field_name, pks[i:i + chunk_size], force)
+                   for i in range(0, len(pks), chunk_size)]
+    stats = Counter()
+    if not chunks:
+        return stats
+    if workers == 1:
+        for chunk in chunks:
+            stats += _warm_chunk(*chunk)
+        return stats
+    # открытые соединения с базой не должны достаться процессам-воркерам
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        for chunk_stats in executor.map(_warm_chunk, *zip(*chunks)):
+            stats += chunk_stats
+    return stats
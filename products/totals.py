@@ -0,0 +1,37 @@
+from django.db.models import F, Q
+
+from .models import Order
+
+
+def inconsistent_orders(queryset=None):
+    """
+    Заказы, у которых сохранённые итоги расходятся с посчитанными по строкам.
+    """
+    queryset = Order.objects.all() if queryset is None else queryset
+    return queryset.with_totals().filter(
+        ~Q(total=F("computed_total")) | ~Q(item_count=F("computed_item_count"))
+    )
+
+
+def backfill_totals(queryset=None, batch_size=500):
+    """
+    Записывает в заказы итоги, посчитанные по строкам, пачками через bulk_update.
+    Возвращает количество исправленных заказов.
+    """
+    queryset = Order.objects.all() if queryset is None else queryset
+    queryset = queryset.order_by("pk").with_totals()
+    fixed = 0
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return fixed
+        changed = []
+        for order in batch:
+            if order.total != order.computed_total or order.item_count != order.computed_item_count:
+                order.total = order.computed_total
+                order.item_count = order.computed_item_count
+                changed.append(order)
+        Order.objects.bulk_update(changed, ["total", "item_count"])
+        fixed += len(changed)
+        last_pk = batch[-1].pk
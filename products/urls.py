@@ -4,6 +4,7 @@ from .views import (StoreList, ProductCategory, ProductDetail, StoreProduct
 , SearchProductsView, DeliveryFormView, DeliveryAppList, OrderDetail)
 from .actions import (add_to_cart, remove_from_cart, remove_single_item_from_cart, take_order
 , remove_order, accept_app, refuse_app, confirm_execution)
+from . import api, events, metrics
 
 app_name = 'products'
 
@@ -19,6 +20,8 @@ urlpatterns = [
     path("remove-item-from-cart/<slug>/", remove_single_item_from_cart, name="remove-single-item-from-cart"),
     path("order/", OrderFormView.as_view(), name="order"),
     path("ordered/", OrderedList.as_view(), name="ordered"),
+    # поток событий доски заказов отдаёт config/asgi.py (products/events.py)
+    path("ordered/events/", events.order_events, name="order_events"),
     path("my_orders/", OrderCustomerList.as_view(), name="order_owner_list"),
     path("orders_taken/", DeliveryRunningOrderList.as_view(), name="orders_taken"),
     path("take-order/<int:pk>/", take_order, name="take-order"),
@@ -29,4 +32,15 @@ urlpatterns = [
     path("accept_app/<int:pk>/", accept_app, name="accept_app"),
     path("refuse_app/<int:pk>/", refuse_app, name="refuse_app"),
     path("confirm_execution/<int:pk>/", confirm_execution, name="confirm_execution"),
+    # JSON API (products/api.py)
+    path("api/stores/", api.store_list, name="api-stores"),
+    path("api/stores/<slug>/", api.store_detail, name="api-store"),
+    path("api/categories/<slug>/", api.category_products, name="api-category"),
+    path("api/products/<int:pk>/", api.product_detail, name="api-product"),
+    path("api/cart/", api.cart_api, name="cart-api"),
+    path("api/checkout/", api.checkout, name="api-checkout"),
+    path("api/orders/board/", api.order_board, name="api-order-board"),
+    path("api/orders/<int:pk>/take/", api.take_order, name="api-take-order"),
+    path("api/orders/<int:pk>/confirm/", api.confirm_execution, name="api-confirm-execution"),
+    path("metrics/", metrics.metrics_view, name="metrics"),
 ]
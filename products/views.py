@@ -1,178 +1,249 @@
+import uuid
+
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
-from django.db.models import Q
-from django.shortcuts import render, get_object_or_404
+from django.db import transaction
+from django.http import Http404
+from django.shortcuts import render
 from django.urls.base import reverse_lazy
+from django.utils.decorators import method_decorator
 from django.views.generic import ListView, DetailView, View, FormView
-from .models import Store, Product, Category, Order, Deliveryman, ApplicationForm
+from .models import Store, Product, Category, Order, ApplicationForm
 from django.contrib import messages
 from django.shortcuts import redirect
 from django.core.exceptions import ObjectDoesNotExist
+from products import catalog
+from products.cart import get_cart
+from products.checkout import checkout, find_order
+from products.conditional import ConditionalPageMixin
 from products.forms import OrderForm, DeliveryForm
+from products.pagination import KeysetPaginationMixin
+from products.search import search_products
+
+# Страницы только читают базу, поэтому не открывают транзакцию ATOMIC_REQUESTS на весь запрос:
+# это лишние BEGIN/COMMIT и снимок, который держится открытым, пока рендерится шаблон.
+# Записи, которые всё же случаются (корзина, оформление), сами открывают короткий atomic().
+non_atomic = method_decorator(transaction.non_atomic_requests, name="dispatch")
 
 
 # страница с магазинами
-class StoreList(ListView):
+@non_atomic
+class StoreList(ConditionalPageMixin, ListView):
     model = Store
     template_name = 'products/store_list.html'
     context_object_name = 'stores'
 
+    def get_catalog_version(self):
+        return catalog.catalog_version()
+
+    def get_queryset(self):
+        return catalog.get_stores()
+
 
 # категории в магазинах
-class ProductCategory(ListView):
+@non_atomic
+class ProductCategory(ConditionalPageMixin, ListView):
     model = Category
     template_name = 'products/product_list.html'
     context_object_name = 'categories'
 
+    def get_catalog_version(self):
+        store = catalog.get_store(self.kwargs['slug'])
+        return catalog.store_version(store.pk) if store is not None else None
+
     def get_queryset(self):
-        self.store = get_object_or_404(Store, slug=self.kwargs['slug'])
-        return Category.objects.filter(store=self.store)
+        self.store = catalog.get_store(self.kwargs['slug'])
+        if self.store is None:
+            raise Http404("Магазин не найден.")
+        self.store_catalog = catalog.get_store_catalog(self.store)
+        return self.store_catalog["categories"]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["products"] = Product.objects.filter(store=self.store)
+        context["products"] = self.store_catalog["products"]
         return context
 
 
 # продукты в магазине
-class StoreProduct(ListView):
+@non_atomic
+class StoreProduct(ConditionalPageMixin, ListView):
     model = Product
     template_name = 'products/cat_product_list.html'
     context_object_name = 'cat_products'
 
+    def get_catalog_version(self):
+        category, store_catalog = catalog.get_category(self.kwargs['slug'])
+        return catalog.store_version(category.store_id) if category is not None else None
+
     def get_queryset(self):
-        self.category = get_object_or_404(Category, slug=self.kwargs['slug'])
-        return Product.objects.filter(category=self.category)
+        self.category, self.store_catalog = catalog.get_category(self.kwargs['slug'])
+        if self.category is None:
+            raise Http404("Категория не найдена.")
+        return [product for product in self.store_catalog["products"] if product.category_id == self.category.pk]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["categories"] = Category.objects.filter(store=self.category.store)
+        context["categories"] = self.store_catalog["categories"]
         return context
 
 
 # детали продукта
-class ProductDetail(DetailView):
+@non_atomic
+class ProductDetail(ConditionalPageMixin, DetailView):
     model = Product
     context_object_name = "product"
 
+    def get_catalog_version(self):
+        # одна узкая выборка: страница зависит от самого продукта и от каталога его магазина (категории)
+        row = Product.objects.filter(pk=self.kwargs['pk']).values_list("store_id", "updated").first()
+        if row is None:
+            return None
+        store_id, updated = row
+        return f"{updated.timestamp():.6f}_{self.kwargs['pk']}-{catalog.store_version(store_id)}"
+
 
 # корзина
+@non_atomic
 class OrderSummaryView(LoginRequiredMixin, View):
     def get(self, *args, **kwargs):
-        try:
-            order = Order.objects.get(user=self.request.user, ordered=False)
-            context = {
-                'object': order
-            }
-            return render(self.request, 'products/order_summary.html', context)
-        except ObjectDoesNotExist:
+        cart = get_cart(self.request)
+        if not cart.exists():
             messages.warning(self.request, "У вас нет активного заказа")
             return redirect("/")
+        context = {
+            'cart': cart
+        }
+        return render(self.request, 'products/order_summary.html', context)
 
 
 # страница с формой для оформления заказа
+@non_atomic
 class OrderFormView(LoginRequiredMixin, FormView):
     template_name = 'products/order.html'
     form_class = OrderForm
     success_url = reverse_lazy('products:store_list')
 
     def get(self, *args, **kwargs):
-        try:
-            order = Order.objects.get(user=self.request.user, ordered=False)
-            form = OrderForm()
-            context = {
-                'form': form,
-                'order': order
-            }
-            return render(self.request, "products/order.html", context)
-        except ObjectDoesNotExist:
+        cart = get_cart(self.request)
+        if not cart.exists():
             messages.info(self.request, "У вас нет активного заказа.")
-            return redirect("products:order")
+            return redirect("products:store_list")
+        form = OrderForm(initial={"idempotency_key": uuid.uuid4().hex})
+        context = {
+            'form': form,
+            'cart': cart
+        }
+        return render(self.request, "products/order.html", context)
 
     def post(self, *args, **kwargs):
         form = OrderForm(self.request.POST or None)
-        try:
-            order = Order.objects.get(user=self.request.user, ordered=False)
-            if form.is_valid():
-                name = form.cleaned_data.get('name')
-                phone = form.cleaned_data.get('phone')
-                address = form.cleaned_data.get('address')
-                if name and phone and address:
-                    order.name = name
-                    order.phone = phone
-                    order.address = address
-                    order.ordered = True
-                    order.save()
-                    order_products = order.products.all()
-                    order_products.update(ordered=True)
-                    for product in order_products:
-                        product.save()
-                else:
-                    messages.warning(self.request, "Заполните все поля.")
-                    return redirect("products:order")
-                messages.warning(self.request, "Спасибо за оформление заказа!")
-                return redirect("products:store_list")
-            messages.warning(self.request, "Удостоверьтесь что вы заполнили всё правильно.")
-            return redirect("products:order")
-        except ObjectDoesNotExist:
+        if find_order(self.request.user, self.request.POST.get('idempotency_key')) is not None:
+            # форму отправили повторно, а заказ уже оформлен первой отправкой
+            messages.warning(self.request, "Спасибо за оформление заказа!")
+            return redirect("products:store_list")
+        cart = get_cart(self.request)
+        if not cart.exists():
             messages.warning(self.request, "У вас нет активного заказа.")
             return redirect("products:order-summary")
+        if form.is_valid():
+            name = form.cleaned_data.get('name')
+            phone = form.cleaned_data.get('phone')
+            address = form.cleaned_data.get('address')
+            if name and phone and address:
+                order, created = checkout(cart, name, phone, address, form.cleaned_data.get('idempotency_key') or None)
+                if order is None:
+                    # в открытом заказе не осталось продуктов
+                    messages.warning(self.request, "У вас нет активного заказа.")
+                    return redirect("products:order-summary")
+            else:
+                messages.warning(self.request, "Заполните все поля.")
+                return redirect("products:order")
+            messages.warning(self.request, "Спасибо за оформление заказа!")
+            return redirect("products:store_list")
+        messages.warning(self.request, "Удостоверьтесь что вы заполнили всё правильно.")
+        return redirect("products:order")
 
 
 # страница с уже оформленными заказами (для курьеров)
-class OrderedList(LoginRequiredMixin, PermissionRequiredMixin, ListView):
+@non_atomic
+class OrderedList(LoginRequiredMixin, PermissionRequiredMixin, KeysetPaginationMixin, ListView):
     model = Order
     permission_required = 'products.view_orders_page'
     template_name = 'products/ordered.html'
     context_object_name = 'ordered_list'
 
     def get_queryset(self):
-        if Deliveryman.objects.filter(user=self.request.user).exists():
-            return Order.objects.filter(ordered=True, deliveryman=None).exclude(user=self.request.user)
+        orders = Order.objects.with_courier().filter(ordered=True, deliveryman=None)
+        if self.request.roles.is_courier:
+            return orders.exclude(user=self.request.user)
         else:
-            return Order.objects.filter(ordered=True, deliveryman=None)
+            return orders
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # заготовка карточки для заказов, пришедших по событиям (products/events.py)
+        context["card_placeholder"] = Order(pk=0)
+        return context
 
 
 # детали заказа
+@non_atomic
 class OrderDetail(DetailView):
     model = Order
     context_object_name = "order"
 
+    def get_queryset(self):
+        return Order.objects.with_lines(select_product=False).with_courier()
+
 
 # страница с уже оформленными заказами (для заказчиков)
-class OrderCustomerList(LoginRequiredMixin, ListView):
+@non_atomic
+class OrderCustomerList(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Order
+    keyset_descending = True
     template_name = 'products/order_customer_list.html'
     context_object_name = 'ordered_list'
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user, ordered=True)
+        return Order.objects.with_courier().filter(user=self.request.user, ordered=True)
 
 
 # страница с активными заказами (для курьеров)
-class DeliveryRunningOrderList(LoginRequiredMixin, PermissionRequiredMixin, ListView):
+@non_atomic
+class DeliveryRunningOrderList(LoginRequiredMixin, PermissionRequiredMixin, KeysetPaginationMixin, ListView):
     model = Order
     template_name = 'products/running_order_list.html'
     permission_required = 'products.view_orders_page'
     context_object_name = 'take_order_list'
 
     def get_queryset(self):
-        if Deliveryman.objects.filter(user=self.request.user).exists():
-            deliveryman = Deliveryman.objects.get(user=self.request.user)
-            return Order.objects.filter(deliveryman=deliveryman)
+        return Order.objects.with_courier().filter(deliveryman__user=self.request.user)
 
 
 # поиск
+@non_atomic
 class SearchProductsView(ListView):
     model = Product
     template_name = 'products/search_products.html'
     context_object_name = 'search_products'
+    paginate_by = 24
 
     def get_queryset(self):
-        query = self.request.GET.get('q')
-        search_products = Product.objects.filter(
-            Q(name__icontains=query) | Q(price__icontains=query)
-        )
-        return search_products
+        self.query = self.request.GET.get('q', '').strip()
+        store_slug = self.request.GET.get('store')
+        category_slug = self.request.GET.get('category')
+        self.store = Store.objects.filter(slug=store_slug).first() if store_slug else None
+        self.category = Category.objects.filter(slug=category_slug).first() if category_slug else None
+        return search_products(self.query, store=self.store, category=self.category)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        params = self.request.GET.copy()
+        params.pop('page', None)
+        context['query'] = self.query
+        context['store'] = self.store
+        context['category'] = self.category
+        context['querystring'] = params.urlencode()
+        return context
 
 
 # страница с формой на становление курьером
@@ -223,6 +294,7 @@ class DeliveryFormView(LoginRequiredMixin, FormView):
 
 
 # страница с запросами на становление курьером (для стаффа)
+@non_atomic
 class DeliveryAppList(LoginRequiredMixin, PermissionRequiredMixin, ListView):
     model = ApplicationForm
     permission_required = 'products.view_app_page'